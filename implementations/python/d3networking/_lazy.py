@@ -0,0 +1,30 @@
+import importlib
+
+# typing is deliberately not imported: this module is loaded by every subpackage and must stay cheap.
+
+
+def lazy_exports(package: str, exports: "dict[str, str]") -> tuple:
+    """ Build PEP 562 module hooks that import a package's exports on first access.
+
+    Use in a package's __init__ as:
+
+        __getattr__, __dir__, __all__ = lazy_exports(__name__, {"Name": ".module"})
+
+    :param package: Name of the package, usually __name__.
+    :param exports: Mapping between each exported name and the module, relative to the package, that defines it.
+    :return: The __getattr__ and __dir__ hooks and the __all__ list of the package.
+    """
+    def __getattr__(name: str):
+        module_name = exports.get(name)
+        if module_name is None:
+            raise AttributeError(f"module {package!r} has no attribute {name!r}")
+        module = importlib.import_module(module_name, package)
+        value = getattr(module, name)
+        # Cache the value so that the hook is only called once per name.
+        setattr(importlib.import_module(package), name, value)
+        return value
+
+    def __dir__() -> "list[str]":
+        return sorted(set(vars(importlib.import_module(package))) | set(exports))
+
+    return __getattr__, __dir__, list(exports)
@@ -0,0 +1,83 @@
+""" Micro-benchmark of the AvailablePayloadMessage codec.
+
+Compares the byte-per-byte codec the message module originally shipped with against the struct based codec.
+
+Run with ``python -m d3networking.bench.codec``.
+"""
+import argparse
+import os
+import timeit
+from typing import Callable, Dict
+
+from ..message.message import AvailablePayloadMessage, _append_bytes, _read_bytes
+
+
+def _legacy_as_bytes(msg: AvailablePayloadMessage) -> bytes:
+    unsigned_msg = bytearray()
+    unsigned_msg.append(msg.team_id)
+    unsigned_msg.append(msg.payload_size)
+    _append_bytes(unsigned_msg, msg.seq_num)
+    unsigned_msg = bytearray(bytes(unsigned_msg))
+    _append_bytes(unsigned_msg, msg.sig_size)
+    if msg.is_signed():
+        unsigned_msg += msg.signature
+
+    return bytes(unsigned_msg)
+
+
+def _legacy_from_bytes(msg_as_bytes: bytes) -> AvailablePayloadMessage:
+    msg_as_bytes = bytearray(msg_as_bytes)
+    sig_size = _read_bytes(msg_as_bytes, 6)
+    signature = bytearray()
+    if sig_size > 0:
+        signature = msg_as_bytes[10: 10 + sig_size]
+
+    return AvailablePayloadMessage(
+        team_id=msg_as_bytes[0],
+        payload_size=msg_as_bytes[1],
+        seq_num=_read_bytes(msg_as_bytes, 2),
+        sig_size=sig_size,
+        signature=signature
+    )
+
+
+def _rate(func: Callable[[], object], number: int) -> float:
+    """ Run a function a given amount of times and return how many calls were made per second.
+    """
+    elapsed = min(timeit.repeat(func, number=number, repeat=3))
+    return number / elapsed
+
+
+def run(number: int = 100_000) -> Dict[str, float]:
+    """ Measure the throughput of both codecs.
+
+    :param number: Amount of messages to encode or decode per measurement.
+    :return: A mapping between each measurement and its throughput in messages per second.
+    """
+    msg = AvailablePayloadMessage(team_id=3, payload_size=2, seq_num=123_456, sig_size=64,
+                                  signature=bytearray(os.urandom(64)))
+    datagram = msg.as_bytes()
+    assert _legacy_as_bytes(msg) == datagram
+    buffer = bytearray(1500)
+
+    return {
+        "legacy_encode": _rate(lambda: _legacy_as_bytes(msg), number),
+        "encode": _rate(lambda: msg.as_bytes(), number),
+        "encode_into": _rate(lambda: msg.pack_into(buffer), number),
+        "legacy_decode": _rate(lambda: _legacy_from_bytes(datagram), number),
+        "decode": _rate(lambda: AvailablePayloadMessage.from_bytes(datagram), number),
+        "decode_buffer": _rate(lambda: AvailablePayloadMessage.from_buffer(datagram), number),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=100_000, help="Messages per measurement.")
+    args = parser.parse_args()
+
+    for name, rate in run(args.number).items():
+        print(f"{name:>14}: {rate:>12,.0f} msgs/sec")
+
+
+if __name__ == "__main__":
+    main()
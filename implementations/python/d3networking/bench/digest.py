@@ -0,0 +1,93 @@
+""" Benchmark of the digest codec against one message per team.
+
+For a cycle in which every team broadcasts its state once, compares the datagrams and bytes on the wire, the
+signature verifications per record and the records processed per second by a client, when each team's message is
+received directly and when a gateway relays them all in digests.
+
+Run with ``python -m d3networking.bench.digest``.
+"""
+import argparse
+import socket
+import time
+from typing import Dict, List, Sequence
+
+from nacl.signing import SigningKey
+
+from ..message.digest import MAX_DIGEST_RECORDS
+from ..message.message import AvailablePayloadMessage
+from ..transport.transport import AvailablePayloadClient, AvailablePayloadServer
+
+GATEWAY_ID = 254
+
+
+def _measure(datagrams: List[List[bytes]], keys: Dict, cycles: int, records: int) -> Dict[str, float]:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    client = AvailablePayloadClient(keys, sock=sock)
+    client.verification_engine.cache_size = 0
+
+    accepted = 0
+    start = time.perf_counter()
+    for cycle in datagrams:
+        for datagram in cycle:
+            accepted += len(client.engine.receive(datagram))
+    elapsed = time.perf_counter() - start
+    client.close_connection()
+    assert accepted == cycles * records
+
+    datagrams_per_cycle = len(datagrams[0])
+    return {
+        "datagrams_per_cycle": datagrams_per_cycle,
+        "bytes_per_cycle": sum(len(datagram) for datagram in datagrams[0]),
+        "verifications_per_record": datagrams_per_cycle / records,
+        "records_per_sec": accepted / elapsed,
+    }
+
+
+def run(teams: Sequence[int] = (6, 24, 40, 80), cycles: int = 50) -> Dict[str, Dict[str, float]]:
+    """ Compare both codecs for several amounts of teams.
+
+    :param teams: Amounts of teams to measure.
+    :param cycles: Amount of cycles received by the client per measurement.
+    :return: A mapping between each measurement and its results.
+    """
+    results: Dict[str, Dict[str, float]] = {}
+    for team_count in teams:
+        signing_keys = {team_id: SigningKey.generate() for team_id in range(1, team_count + 1)}
+        gateway_key = SigningKey.generate()
+        keys = {team_id: key.verify_key for team_id, key in signing_keys.items()}
+        keys[GATEWAY_ID] = gateway_key.verify_key
+
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        servers = {team_id: AvailablePayloadServer(key, sock=sock) for team_id, key in signing_keys.items()}
+        gateway = AvailablePayloadServer(gateway_key, sock=sock, gateway_id=GATEWAY_ID)
+
+        direct: List[List[bytes]] = []
+        relayed: List[List[bytes]] = []
+        for cycle in range(cycles):
+            msgs = [AvailablePayloadMessage(team_id, cycle % 200) for team_id in signing_keys]
+            direct.append([servers[msg.team_id].engine.encode_message(msg) for msg in msgs])
+            relayed.append([
+                gateway.engine.encode_digest(msgs[start: start + MAX_DIGEST_RECORDS])
+                for start in range(0, len(msgs), MAX_DIGEST_RECORDS)
+            ])
+        sock.close()
+
+        results[f"direct_{team_count}_teams"] = _measure(direct, keys, cycles, team_count)
+        results[f"digest_{team_count}_teams"] = _measure(relayed, keys, cycles, team_count)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cycles", type=int, default=50, help="Cycles received per measurement.")
+    args = parser.parse_args()
+
+    for name, result in run(cycles=args.cycles).items():
+        print(f"{name:>16}: {result['datagrams_per_cycle']:>3} datagrams, {result['bytes_per_cycle']:>5} bytes, "
+              f"{result['verifications_per_record']:.3f} verifications/record, "
+              f"{result['records_per_sec']:>10,.0f} records/sec")
+
+
+if __name__ == "__main__":
+    main()
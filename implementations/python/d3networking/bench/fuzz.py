@@ -0,0 +1,211 @@
+""" Randomized robustness checks of the message codec and the receive path.
+
+Generates random messages and checks that they survive a round trip through every encoder and decoder, then feeds
+random, truncated, bit-flipped and oversized datagrams to the decoders and to a client. Decoders may only raise
+InvalidMessageException and the client may never raise. Every failure is reported with the seed and the input that
+triggered it, and the process exits with a non-zero status, so it can gate changes.
+
+Run with ``python -m d3networking.bench.fuzz``.
+"""
+import argparse
+import logging
+import random
+import socket
+import struct
+import sys
+from typing import Callable, Dict, List, Optional
+
+from nacl.signing import SigningKey
+
+from ..exceptions.exceptions import InvalidMessageException
+from ..message.batch import MessageBatch
+from ..message.digest import DigestMessage, DIGEST_MARKER, MAX_DIGEST_RECORDS
+from ..message.message import AvailablePayloadMessage, HEADER_SIZE, MAX_MESSAGE_SIZE, MAX_SIGNATURE_SIZE
+from ..processing.replay import ReplayWindow, SEQ_MODULUS
+from ..transport.transport import AvailablePayloadClient, AvailablePayloadServer
+
+
+def _random_message(rng: random.Random) -> AvailablePayloadMessage:
+    sig_size = rng.choice((0, 8, 16, 32, 64, rng.randint(0, MAX_SIGNATURE_SIZE)))
+    return AvailablePayloadMessage(
+        team_id=rng.randint(0, 254),
+        payload_size=rng.randint(0, 255),
+        seq_num=rng.randint(0, 2 ** 32 - 1),
+        sig_size=sig_size,
+        signature=bytearray(rng.randbytes(sig_size)),
+    )
+
+
+def _mutate(rng: random.Random, datagram: bytes) -> bytes:
+    """ Damage a datagram the way a hostile or broken sender would.
+    """
+    mutation = rng.randrange(7)
+    if mutation == 0:
+        return datagram[:rng.randint(0, len(datagram))]
+    if mutation == 1:
+        flipped = bytearray(datagram)
+        for _ in range(rng.randint(1, 4)):
+            if flipped:
+                flipped[rng.randrange(len(flipped))] ^= 1 << rng.randrange(8)
+        return bytes(flipped)
+    if mutation == 2:
+        return datagram[:6] + struct.pack('<I', rng.choice((2 ** 32 - 1, MAX_SIGNATURE_SIZE + 1, 10 ** 6))) + \
+            datagram[10:]
+    if mutation == 3:
+        return datagram + rng.randbytes(rng.randint(1, 1500 - len(datagram)))
+    if mutation == 4:
+        return bytes([DIGEST_MARKER]) + datagram[1:]
+    if mutation == 5:
+        # Consistent signature size, but larger than a message can hold.
+        size = rng.randint(MAX_MESSAGE_SIZE + 1, 1500)
+        return datagram[:2] + struct.pack('<II', rng.randrange(2 ** 32), size - HEADER_SIZE) + \
+            rng.randbytes(size - HEADER_SIZE)
+    return rng.randbytes(rng.randint(0, 1500))
+
+
+class Fuzzer:
+    """ Runs the checks and collects their failures.
+    """
+    def __init__(self, seed: int):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.failures: List[str] = []
+        self.checks: Dict[str, int] = {}
+
+    def check(self, name: str, func: Callable[[], Optional[str]], sample: bytes = b""):
+        """ Run a check, recording its failure if it returns an error or raises.
+        """
+        self.checks[name] = self.checks.get(name, 0) + 1
+        try:
+            error = func()
+        except Exception as exc:
+            error = f"raised {exc!r}"
+        if error is not None:
+            self.failures.append(f"{name}: {error} on {sample.hex()}")
+
+    def round_trips(self, iterations: int):
+        buffer = bytearray(1500)
+        for _ in range(iterations):
+            msg = _random_message(self.rng)
+            datagram = msg.as_bytes()
+
+            def decode() -> Optional[str]:
+                decoded = AvailablePayloadMessage.from_bytes(datagram)
+                if decoded != msg:
+                    return f"decoded as {decoded}"
+                if AvailablePayloadMessage.from_buffer(datagram).signature != msg.signature:
+                    return "from_buffer signature differs"
+                if msg.pack_into(buffer, 1) != len(datagram) or buffer[1:1 + len(datagram)] != datagram:
+                    return "pack_into differs from as_bytes"
+                batch = MessageBatch.from_datagrams([datagram], strict=True)
+                if batch.message(0) != msg:
+                    return "batch differs"
+                return None
+
+            self.check("round_trip", decode, datagram)
+
+            records = [
+                AvailablePayloadMessage(self.rng.randint(0, 255), self.rng.randint(0, 255), self.rng.randrange(2 ** 32))
+                for _ in range(self.rng.randint(0, MAX_DIGEST_RECORDS))
+            ]
+            digest = DigestMessage(self.rng.randint(0, 254), records, self.rng.randint(0, 2 ** 32 - 1), 64,
+                                   bytearray(self.rng.randbytes(64)))
+            encoded = digest.as_bytes()
+            self.check("digest_round_trip",
+                       lambda: None if DigestMessage.from_bytes(encoded) == digest else "digest differs", encoded)
+
+    def adversarial(self, iterations: int, client: AvailablePayloadClient, seeds: List[bytes]):
+        for _ in range(iterations):
+            datagram = _mutate(self.rng, self.rng.choice(seeds))
+
+            def decode() -> Optional[str]:
+                for decoder in (AvailablePayloadMessage.from_bytes, AvailablePayloadMessage.from_buffer,
+                                DigestMessage.from_bytes):
+                    try:
+                        msg = decoder(datagram)
+                    except InvalidMessageException:
+                        continue
+                    if isinstance(msg, AvailablePayloadMessage) and (
+                            len(datagram) < HEADER_SIZE + msg.sig_size or msg.sig_size > MAX_SIGNATURE_SIZE):
+                        return "accepted a signature overrunning the datagram"
+                MessageBatch.from_datagrams([datagram])
+                return None
+
+            self.check("adversarial_decode", decode, datagram)
+            for validate in (True, False):
+                self.check("adversarial_receive", lambda: (client.engine.receive(datagram, validate=validate), None)[1],
+                           datagram)
+
+    def replay_window(self, iterations: int):
+        window = ReplayWindow(64)
+        seen = set()
+        newest = None
+        for _ in range(iterations):
+            if newest is None or self.rng.random() < 0.5:
+                seq_num = self.rng.randrange(SEQ_MODULUS)
+            else:
+                seq_num = (newest + self.rng.randint(-80, 80)) % SEQ_MODULUS
+
+            def update() -> Optional[str]:
+                nonlocal newest
+                verdict = window.check(seq_num)
+                if seq_num in seen and verdict.name == "ACCEPTED":
+                    return "accepted a sequence number seen before"
+                window.update(seq_num)
+                seen.add(seq_num)
+                if verdict.name == "ACCEPTED":
+                    newest = seq_num
+                return None
+
+            self.check("replay_window", update, struct.pack('<I', seq_num))
+            if len(seen) > 10_000:
+                window, seen, newest = ReplayWindow(64), set(), None
+
+
+def run(iterations: int = 20_000, seed: Optional[int] = None) -> Dict[str, object]:
+    """ Run every check.
+
+    :param iterations: Amount of random inputs per check.
+    :param seed: Seed of the random generator. A random seed is picked if None.
+    :return: The seed, the amount of checks run and the failures.
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    fuzzer = Fuzzer(seed)
+
+    signing_key = SigningKey.generate()
+    server = AvailablePayloadServer(signing_key, sock=socket.socket(socket.AF_INET, socket.SOCK_DGRAM),
+                                    gateway_id=200)
+    msgs = [AvailablePayloadMessage(team_id, team_id) for team_id in range(1, 7)]
+    seeds = [server.engine.encode_message(msg) for msg in msgs] + [server.engine.encode_digest(msgs)]
+    server.close_connection()
+
+    client = AvailablePayloadClient({1: signing_key.verify_key, 200: signing_key.verify_key},
+                                    sock=socket.socket(socket.AF_INET, socket.SOCK_DGRAM))
+    logging.getLogger("d3networking").setLevel(logging.CRITICAL)
+
+    fuzzer.round_trips(iterations)
+    fuzzer.adversarial(iterations, client, seeds)
+    fuzzer.replay_window(iterations)
+    client.close_connection()
+
+    return {"seed": seed, "checks": fuzzer.checks, "failures": fuzzer.failures}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=20_000, help="Random inputs per check.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed to reproduce a run.")
+    args = parser.parse_args()
+
+    results = run(args.iterations, args.seed)
+    print(f"seed {results['seed']}: " + ", ".join(f"{name} {count}" for name, count in results["checks"].items()))
+    for failure in results["failures"][:20]:
+        print(f"FAIL {failure}")
+    if results["failures"]:
+        print(f"{len(results['failures'])} failures.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
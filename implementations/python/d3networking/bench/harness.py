@@ -0,0 +1,226 @@
+""" End-to-end throughput and latency benchmark of servers and clients.
+
+Runs N servers, one per team, and M clients in a single process. The traffic either goes through the loopback
+multicast group or through an in-process network made of UNIX datagram socket pairs. The benchmark sweeps the
+message rate, signing and the amount of teams and reports, for each run, the p50 and p99 end-to-end latency, the
+received messages per second, the CPU time per message and the drop rate as JSON.
+
+Run with ``python -m d3networking.bench.harness``.
+"""
+import argparse
+import itertools
+import json
+import socket
+import threading
+import time
+from dataclasses import dataclass, asdict
+from typing import Dict, List, Literal, Sequence, Tuple
+
+from nacl.signing import SigningKey
+
+from ..message.message import AvailablePayloadMessage
+from ..transport.transport import AvailablePayloadClient, AvailablePayloadServer
+
+
+class FakeNetwork:
+    """ In-process multicast group.
+
+    Every subscriber gets one end of a UNIX datagram socket pair, so clients keep using real sockets and select.
+    Datagrams sent on the network are copied to every subscriber and dropped when a subscriber's queue is full.
+    """
+    def __init__(self):
+        self._senders: List[socket.socket] = []
+        self._lock = threading.Lock()
+        self.drops = 0
+        """ Amount of datagrams dropped because a subscriber's queue was full.
+        """
+
+    def subscribe(self) -> socket.socket:
+        """ Create a socket receiving the network's traffic.
+
+        :return: The receiving end of a new socket pair.
+        """
+        receiver, sender = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+        sender.setblocking(False)
+        with self._lock:
+            self._senders.append(sender)
+        return receiver
+
+    def sendto(self, data: bytes, address: Tuple) -> int:
+        """ Send a datagram to every subscriber. Mimics socket.sendto.
+        """
+        with self._lock:
+            for sender in self._senders:
+                try:
+                    sender.send(data)
+                except BlockingIOError:
+                    self.drops += 1
+        return len(data)
+
+    def close(self):
+        """ Close the sending end of every subscriber.
+        """
+        with self._lock:
+            for sender in self._senders:
+                sender.close()
+            self._senders.clear()
+
+
+@dataclass
+class BenchConfig:
+    """ Parameters of a single benchmark run.
+    """
+    teams: int = 6
+    """ Amount of servers. Each server sends for its own team.
+    """
+    clients: int = 1
+    """ Amount of clients receiving every message.
+    """
+    rate: float = 1_000
+    """ Total amount of messages sent per second, shared between the teams.
+    """
+    duration: float = 2.0
+    """ Amount of seconds to send for.
+    """
+    signed: bool = True
+    """ Whether servers sign their messages and clients verify them.
+    """
+    network: Literal["inproc", "loopback"] = "inproc"
+    """ Whether to use the in-process network or the loopback multicast group.
+    """
+    proto: Literal[4, 6] = 4
+    """ The network protocol to use on loopback.
+    """
+
+
+def _percentile(sorted_values: Sequence[float], percentile: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(int(len(sorted_values) * percentile / 100), len(sorted_values) - 1)
+    return sorted_values[idx]
+
+
+def run(config: BenchConfig) -> Dict[str, object]:
+    """ Run a single benchmark.
+
+    :param config: Parameters of the run.
+    :return: The run's parameters and measurements.
+    """
+    network = FakeNetwork() if config.network == "inproc" else None
+    signing_keys = {team_id: SigningKey.generate() for team_id in range(1, config.teams + 1)}
+    validate_keys = {team_id: key.verify_key for team_id, key in signing_keys.items()}
+
+    servers = [
+        AvailablePayloadServer(signing_keys[team_id] if config.signed else None, proto=config.proto, sock=network)
+        for team_id in signing_keys
+    ]
+    clients = [
+        AvailablePayloadClient(validate_keys, proto=config.proto, rcvbuf_size=1 << 20,
+                               sock=network.subscribe() if network is not None else None)
+        for _ in range(config.clients)
+    ]
+
+    sent_at: Dict[Tuple[int, int], int] = {}
+    latencies: List[List[int]] = [[] for _ in clients]
+    sending = threading.Event()
+    sending.set()
+
+    def receive(client: AvailablePayloadClient, client_latencies: List[int]):
+        while True:
+            msgs = client.recv_many(timeout=0.1, validate=config.signed)
+            now = time.perf_counter_ns()
+            for msg in msgs:
+                start = sent_at.get((msg.team_id, msg.seq_num))
+                if start is not None:
+                    client_latencies.append(now - start)
+            if not msgs and not sending.is_set():
+                return
+
+    receivers = [
+        threading.Thread(target=receive, args=(client, client_latencies), daemon=True)
+        for client, client_latencies in zip(clients, latencies)
+    ]
+    for receiver in receivers:
+        receiver.start()
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    interval = 1 / config.rate
+    sent = 0
+    for team_id, server in itertools.cycle(enumerate(servers, start=1)):
+        next_send = wall_start + sent * interval
+        now = time.perf_counter()
+        if now - wall_start >= config.duration:
+            break
+        if next_send > now:
+            time.sleep(next_send - now)
+        sent_at[(team_id, server.seq_num)] = time.perf_counter_ns()
+        server.send_message(AvailablePayloadMessage(team_id=team_id, payload_size=sent % 256))
+        sent += 1
+    wall_elapsed = time.perf_counter() - wall_start
+
+    sending.clear()
+    for receiver in receivers:
+        receiver.join()
+    cpu_elapsed = time.process_time() - cpu_start
+
+    for client in clients:
+        client.close_connection()
+    if network is None:
+        for server in servers:
+            server.close_connection()
+    else:
+        network.close()
+
+    all_latencies = sorted(latency for client_latencies in latencies for latency in client_latencies)
+    received = len(all_latencies)
+    expected = sent * len(clients)
+
+    return {
+        **asdict(config),
+        "sent": sent,
+        "received": received,
+        "sent_per_sec": sent / wall_elapsed,
+        "received_per_sec": received / wall_elapsed,
+        "drop_rate": 1 - received / expected if expected else 0.0,
+        "latency_p50_us": _percentile(all_latencies, 50) / 1_000,
+        "latency_p99_us": _percentile(all_latencies, 99) / 1_000,
+        "cpu_us_per_msg": cpu_elapsed * 1_000_000 / max(sent + received, 1),
+    }
+
+
+def sweep(rates: Sequence[float], signing: Sequence[bool], teams: Sequence[int],
+          **config) -> List[Dict[str, object]]:
+    """ Run a benchmark for every combination of rate, signing and team count.
+
+    :param rates: Total message rates to measure.
+    :param signing: Signing settings to measure.
+    :param teams: Team counts to measure.
+    :param config: Other BenchConfig parameters shared by every run.
+    :return: The results of every run.
+    """
+    return [
+        run(BenchConfig(teams=team_count, rate=rate, signed=signed, **config))
+        for rate, signed, team_count in itertools.product(rates, signing, teams)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rates", type=float, nargs="+", default=[500, 2_000], help="Total messages per second.")
+    parser.add_argument("--teams", type=int, nargs="+", default=[6], help="Amounts of teams.")
+    parser.add_argument("--signing", choices=("on", "off", "both"), default="both", help="Whether to sign.")
+    parser.add_argument("--clients", type=int, default=1, help="Amount of clients.")
+    parser.add_argument("--duration", type=float, default=2.0, help="Seconds to send for, per run.")
+    parser.add_argument("--network", choices=("inproc", "loopback"), default="inproc", help="Network to use.")
+    parser.add_argument("--proto", type=int, choices=(4, 6), default=4, help="Network protocol on loopback.")
+    args = parser.parse_args()
+
+    signing = {"on": [True], "off": [False], "both": [True, False]}[args.signing]
+    results = sweep(args.rates, signing, args.teams, clients=args.clients, duration=args.duration,
+                    network=args.network, proto=args.proto)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+""" Performance regression gate of the message codec and the processing layer.
+
+Measures, for each operation of the receive and send paths, the time per message and the memory blocks allocated
+per message with tracemalloc, while the results are kept alive. Exits with a non-zero status when an operation goes
+over its budget, so it can gate changes. Time budgets depend on the machine and can be scaled.
+
+Run with ``python -m d3networking.bench.regression``.
+"""
+import argparse
+import gc
+import json
+import logging
+import socket
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, Tuple
+
+from nacl.signing import SigningKey
+
+from ..message.message import AvailablePayloadMessage
+from ..processing.processing import validate_msg, validate_seq_num
+from ..processing.replay import ReplayProtectionTable
+from ..transport.transport import AvailablePayloadClient, AvailablePayloadServer
+
+BUDGETS: Dict[str, Tuple[float, float]] = {
+    "encode": (1.0, 2_000),
+    "encode_into": (0.0, 2_000),
+    "decode": (3.0, 4_000),
+    "decode_buffer": (3.0, 5_000),
+    "validate_seq_num": (0.0, 500),
+    "replay_accept": (0.0, 4_000),
+    "reject_junk": (0.0, 4_000),
+    "reject_unknown_team": (0.0, 4_000),
+    "reject_replayed": (0.0, 10_000),
+    "validate_msg": (0.0, 400_000),
+}
+""" Budget of each operation, as (memory blocks allocated per message, nanoseconds per message).
+"""
+
+
+def _ns_per_call(func: Callable[[], object], number: int) -> float:
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter_ns() - start) / number)
+    return best
+
+
+def _blocks_per_call(func: Callable[[], object], number: int) -> float:
+    """ Memory blocks allocated by each call and still alive afterwards, with every result kept alive.
+    """
+    results = [None] * number
+    func()
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for idx in range(number):
+        results[idx] = func()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    ignored = (tracemalloc.Filter(False, tracemalloc.__file__),)
+    diff = after.filter_traces(ignored).compare_to(before.filter_traces(ignored), "filename")
+    return max(sum(stat.count_diff for stat in diff), 0) / number
+
+
+def _operations() -> Dict[str, Tuple[Callable[[], object], int]]:
+    """ The measured operations and the amount of calls to measure each with.
+    """
+    signing_key = SigningKey.generate()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server = AvailablePayloadServer(signing_key, sock=sock)
+    msg = AvailablePayloadMessage(team_id=3, payload_size=2)
+    datagram = server.engine.encode_message(msg)
+    server.close_connection()
+    buffer = bytearray(1500)
+
+    client = AvailablePayloadClient({3: signing_key.verify_key},
+                                    sock=socket.socket(socket.AF_INET, socket.SOCK_DGRAM))
+    client.drop_logger.logger.setLevel(logging.CRITICAL)
+    client.engine.receive_message(datagram)
+    junk = b"\x03" * 9
+    unknown = bytes([9]) + datagram[1:]
+
+    replay = ReplayProtectionTable()
+    seq_nums = iter(range(10 ** 9))
+    unsigned = msg.as_unsigned_bytes()
+    signature = bytes(msg.signature)
+
+    return {
+        "encode": (msg.as_bytes, 20_000),
+        "encode_into": (lambda: msg.pack_into(buffer), 20_000),
+        "decode": (lambda: AvailablePayloadMessage.from_bytes(datagram), 20_000),
+        "decode_buffer": (lambda: AvailablePayloadMessage.from_buffer(datagram), 20_000),
+        "validate_seq_num": (lambda: validate_seq_num(5, 4), 20_000),
+        "replay_accept": (lambda: replay.accept(3, next(seq_nums)), 20_000),
+        "reject_junk": (lambda: client.engine.receive_message(junk), 20_000),
+        "reject_unknown_team": (lambda: client.engine.receive_message(unknown), 20_000),
+        "reject_replayed": (lambda: client.engine.receive_message(datagram), 20_000),
+        "validate_msg": (lambda: validate_msg(unsigned, signature, signing_key.verify_key), 500),
+    }
+
+
+def run(time_scale: float = 1.0) -> Dict[str, Dict[str, object]]:
+    """ Measure every operation and compare it to its budget.
+
+    :param time_scale: Multiplier applied to the time budgets, for slower or faster machines.
+    :return: A mapping between each operation and its measurements, budgets and whether it is within budget.
+    """
+    results: Dict[str, Dict[str, object]] = {}
+    for name, (func, number) in _operations().items():
+        blocks_budget, ns_budget = BUDGETS[name]
+        blocks = _blocks_per_call(func, number)
+        ns = _ns_per_call(func, number)
+        results[name] = {
+            "blocks_per_msg": round(blocks, 2),
+            "ns_per_msg": round(ns),
+            "blocks_budget": blocks_budget,
+            "ns_budget": ns_budget * time_scale,
+            "ok": blocks <= blocks_budget + 0.05 and ns <= ns_budget * time_scale,
+        }
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--time-scale", type=float, default=1.0, help="Multiplier applied to the time budgets.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    args = parser.parse_args()
+
+    results = run(args.time_scale)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, result in results.items():
+            status = "ok" if result["ok"] else "OVER BUDGET"
+            print(f"{name:>20}: {result['blocks_per_msg']:>5.2f} blocks/msg (budget {result['blocks_budget']:.0f}), "
+                  f"{result['ns_per_msg']:>8,} ns/msg (budget {result['ns_budget']:,.0f})  {status}")
+
+    if not all(result["ok"] for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+""" Benchmark of the server send pipeline.
+
+Measures signed messages per second for the original encode-and-sign path, the header template path, the header
+template with signatures computed in advance, and batched sends. Time is only counted while inside the send calls,
+so the presigned measurement reflects a crane that sends at a steady pace.
+
+Run with ``python -m d3networking.bench.server``.
+"""
+import argparse
+import time
+from typing import Dict
+
+from nacl.signing import SigningKey
+
+from ..message.message import AvailablePayloadMessage
+from ..transport.transport import AvailablePayloadServer
+
+
+def _legacy_encode(server: AvailablePayloadServer, msg: AvailablePayloadMessage) -> bytes:
+    msg.seq_num = server.seq_num
+    signed_msg = server.signing_key.sign(msg.as_unsigned_bytes())
+    msg.sig_size = len(bytearray(len(signed_msg.signature)))
+    msg.signature = bytearray(signed_msg.signature)
+    server.seq_num += 1
+    return msg.as_bytes()
+
+
+def _send_rate(server: AvailablePayloadServer, number: int, pace: float, legacy: bool = False) -> float:
+    msg = AvailablePayloadMessage(team_id=1, payload_size=2)
+    busy = 0.0
+    for _ in range(number):
+        start = time.perf_counter()
+        if legacy:
+            server._socket.sendto(_legacy_encode(server, msg), server.destination)
+        else:
+            server.send_message(msg)
+        busy += time.perf_counter() - start
+        if pace:
+            time.sleep(pace)
+
+    return number / busy
+
+
+def run(number: int = 2_000, pace: float = 0.0005, proto: int = 4) -> Dict[str, float]:
+    """ Measure the send throughput.
+
+    :param number: Amount of messages sent per measurement.
+    :param pace: Amount of seconds slept between two sends.
+    :param proto: The network protocol to use (IPv4 or IPv6).
+    :return: A mapping between each measurement and its throughput in signed messages per second.
+    """
+    signing_key = SigningKey.generate()
+    results: Dict[str, float] = {}
+
+    server = AvailablePayloadServer(signing_key, proto=proto)
+    results["legacy"] = _send_rate(server, number, pace, legacy=True)
+    results["template"] = _send_rate(server, number, pace)
+    server.close_connection()
+
+    server = AvailablePayloadServer(signing_key, proto=proto, presign_depth=32)
+    results["presigned"] = _send_rate(server, number, pace)
+    server.close_connection()
+
+    server = AvailablePayloadServer(signing_key, proto=proto)
+    msgs = [AvailablePayloadMessage(team_id=1, payload_size=2) for _ in range(32)]
+    start = time.perf_counter()
+    sent = 0
+    while sent < number:
+        sent += server.send_many(msgs)
+    results["send_many"] = sent / (time.perf_counter() - start)
+    server.close_connection()
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--number", type=int, default=2_000, help="Messages per measurement.")
+    parser.add_argument("--pace", type=float, default=0.0005, help="Seconds slept between two sends.")
+    parser.add_argument("--proto", type=int, choices=(4, 6), default=4, help="Network protocol to use.")
+    args = parser.parse_args()
+
+    for name, rate in run(args.number, args.pace, args.proto).items():
+        print(f"{name:>10}: {rate:>12,.0f} signed msgs/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+""" In-memory simulation of a site, driving protocol engines without any socket.
+
+Every team signs its state once per cycle and every vehicle receives the datagrams through a lossy network that
+also replays old datagrams. Time is simulated, so a cycle of the site runs as fast as the engines process it. The
+vehicles share a verification engine, as they receive the same signed bytes, so the cryptography is done once per
+datagram and the measurement is dominated by the protocol logic.
+
+Run with ``python -m d3networking.bench.simulator``.
+"""
+import argparse
+import logging
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional
+
+from nacl.signing import SigningKey
+
+from ..message.message import AvailablePayloadMessage
+from ..processing.engine import ProtocolEngine
+from ..processing.verification import VerificationEngine
+
+CYCLE_NS = 100_000_000
+
+
+def run(teams: int = 40, vehicles: int = 1000, cycles: int = 5, loss: float = 0.01, replay: float = 0.01,
+        seed: Optional[int] = None) -> Dict[str, object]:
+    """ Simulate a site.
+
+    :param teams: Amount of teams broadcasting their state, at most 254.
+    :param vehicles: Amount of vehicles receiving every datagram.
+    :param cycles: Amount of broadcast cycles.
+    :param loss: Probability that a vehicle misses a datagram.
+    :param replay: Probability that a vehicle also receives a datagram of the previous cycle.
+    :param seed: Seed of the simulated network. A random seed is picked if None.
+    :return: The datagrams processed, their throughput and the amount of messages accepted and events per kind.
+    """
+    if not 0 < teams < 255:
+        raise ValueError("Team identifiers fit in a byte and 255 is reserved.")
+    rng = random.Random(seed)
+
+    signing_keys = {team_id: SigningKey.generate() for team_id in range(teams)}
+    senders = {team_id: ProtocolEngine(signing_key=key) for team_id, key in signing_keys.items()}
+    validate_keys = {team_id: key.verify_key for team_id, key in signing_keys.items()}
+    verification_engine = VerificationEngine(cache_size=2 * teams)
+    receivers: List[ProtocolEngine] = [
+        ProtocolEngine(validate_keys, verification_engine=verification_engine, event_log_size=4 * teams)
+        for _ in range(vehicles)
+    ]
+    # Drops are expected, they are counted in the events instead.
+    logging.getLogger("d3networking").setLevel(logging.CRITICAL)
+
+    processed = 0
+    accepted = 0
+    events: Counter = Counter()
+    previous: List[bytes] = []
+    elapsed = 0
+    for cycle in range(cycles):
+        now = cycle * CYCLE_NS
+        datagrams = [
+            sender.encode_message(AvailablePayloadMessage(team_id, rng.randrange(4)))
+            for team_id, sender in senders.items()
+        ]
+
+        start = time.perf_counter_ns()
+        for receiver in receivers:
+            for datagram in datagrams:
+                if rng.random() >= loss:
+                    accepted += len(receiver.receive(datagram, now))
+                    processed += 1
+                if previous and rng.random() < replay:
+                    receiver.receive(rng.choice(previous), now)
+                    processed += 1
+            events.update(event.kind for event in receiver.events())
+        elapsed += time.perf_counter_ns() - start
+        previous = datagrams
+
+    return {
+        "teams": teams,
+        "vehicles": vehicles,
+        "datagrams": processed,
+        "datagrams_per_sec": processed / (elapsed / 1e9) if elapsed else 0.0,
+        "accepted": accepted,
+        "events": dict(events),
+        "verifications": verification_engine.misses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--teams", type=int, default=40, help="Teams broadcasting their state.")
+    parser.add_argument("--vehicles", type=int, default=1000, help="Vehicles receiving every datagram.")
+    parser.add_argument("--cycles", type=int, default=5, help="Broadcast cycles.")
+    parser.add_argument("--loss", type=float, default=0.01, help="Probability of missing a datagram.")
+    parser.add_argument("--replay", type=float, default=0.01, help="Probability of receiving an old datagram.")
+    parser.add_argument("--seed", type=int, default=None, help="Seed of the simulated network.")
+    args = parser.parse_args()
+
+    result = run(args.teams, args.vehicles, args.cycles, args.loss, args.replay, args.seed)
+    print(f"{result['teams']} teams, {result['vehicles']} vehicles: {result['datagrams']:,} datagrams, "
+          f"{result['datagrams_per_sec']:,.0f} datagrams/sec, {result['accepted']:,} accepted, "
+          f"{result['verifications']} signatures verified")
+    for kind, count in sorted(result["events"].items()):
+        print(f"{kind:>16}: {count:,}")
+
+
+if __name__ == "__main__":
+    main()
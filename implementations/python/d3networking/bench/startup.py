@@ -0,0 +1,88 @@
+""" Startup time benchmark of the d3networking modules.
+
+Imports a module in a fresh interpreter with ``python -X importtime`` and reports the module's cumulative import
+time along with the slowest imports it pulls in. Exits with a non-zero status when the import time exceeds the
+budget, so it can gate changes.
+
+Run with ``python -m d3networking.bench.startup``.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULE = "d3networking.cli.cli"
+DEFAULT_BUDGET_MS = 80.0
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[str, int, int]]:
+    """ Parse the output of -X importtime.
+
+    :return: (module, self time, cumulative time) tuples, with times in microseconds.
+    """
+    imports: List[Tuple[str, int, int]] = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((name.strip(), int(self_us), int(cumulative_us)))
+    return imports
+
+
+def measure(module: str = DEFAULT_MODULE) -> Tuple[int, List[Tuple[str, int, int]]]:
+    """ Import a module in a fresh interpreter.
+
+    :param module: The module to import.
+    :return: The module's cumulative import time in microseconds and every import it triggered.
+    """
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            capture_output=True, text=True, check=True)
+    imports = _parse_importtime(result.stderr)
+    cumulative = next(cumulative_us for name, _, cumulative_us in imports if name == module)
+    return cumulative, imports
+
+
+def run(module: str = DEFAULT_MODULE, repeat: int = 5, top: int = 10) -> Dict[str, object]:
+    """ Measure a module's import time several times.
+
+    :param module: The module to import.
+    :param repeat: Amount of fresh interpreters to measure.
+    :param top: Amount of slowest imports to report.
+    :return: The median import time in milliseconds and the slowest imports of the last run.
+    """
+    samples: List[int] = []
+    imports: List[Tuple[str, int, int]] = []
+    for _ in range(repeat):
+        cumulative, imports = measure(module)
+        samples.append(cumulative)
+
+    slowest = sorted(imports, key=lambda entry: entry[1], reverse=True)[:top]
+    return {
+        "module": module,
+        "median_ms": statistics.median(samples) / 1_000,
+        "samples_ms": [sample / 1_000 for sample in samples],
+        "slowest_self_ms": {name: self_us / 1_000 for name, self_us, _ in slowest},
+        "imported_modules": len(imports),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE, help="Module to import.")
+    parser.add_argument("--repeat", type=int, default=5, help="Amount of fresh interpreters to measure.")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS, help="Maximum median import time.")
+    args = parser.parse_args()
+
+    result = run(args.module, args.repeat)
+    result["budget_ms"] = args.budget_ms
+    print(json.dumps(result, indent=2))
+
+    if result["median_ms"] > args.budget_ms:
+        print(f"Import time of {args.module} exceeds its {args.budget_ms} ms budget.", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+""" Benchmark of the signature verification engine.
+
+Measures verifications per second with the cache disabled at several thread pool sizes, then with every message
+already in the cache.
+
+Run with ``python -m d3networking.bench.verification``.
+"""
+import argparse
+import time
+from typing import Dict, List, Sequence
+
+from nacl.signing import SigningKey
+
+from ..message.message import AvailablePayloadMessage
+from ..processing.verification import VerificationEngine, VerificationRequest
+
+
+def _make_requests(amount: int, teams: int) -> List[VerificationRequest]:
+    signing_keys = [SigningKey.generate() for _ in range(teams)]
+    requests: List[VerificationRequest] = []
+    for seq_num in range(amount):
+        team_id = seq_num % teams
+        unsigned = AvailablePayloadMessage(team_id=team_id, payload_size=2, seq_num=seq_num).as_unsigned_bytes()
+        signing_key = signing_keys[team_id]
+        requests.append((team_id, unsigned, signing_key.sign(unsigned).signature, signing_key.verify_key))
+
+    return requests
+
+
+def _rate(engine: VerificationEngine, requests: Sequence[VerificationRequest]) -> float:
+    start = time.perf_counter()
+    results = engine.verify_many(requests)
+    elapsed = time.perf_counter() - start
+    assert all(results)
+
+    return len(requests) / elapsed
+
+
+def run(amount: int = 5_000, teams: int = 6, workers: Sequence[int] = (1, 4, 8)) -> Dict[str, float]:
+    """ Measure the verification throughput.
+
+    :param amount: Amount of distinct signed messages to verify per measurement.
+    :param teams: Amount of distinct signing keys.
+    :param workers: Thread pool sizes to measure.
+    :return: A mapping between each measurement and its throughput in verifications per second.
+    """
+    requests = _make_requests(amount, teams)
+    results: Dict[str, float] = {}
+
+    for worker_count in workers:
+        engine = VerificationEngine(cache_size=0, workers=worker_count)
+        results[f"uncached_{worker_count}_workers"] = _rate(engine, requests)
+        engine.close()
+
+    engine = VerificationEngine(cache_size=amount)
+    engine.verify_many(requests)
+    results["cached"] = _rate(engine, requests)
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--amount", type=int, default=5_000, help="Signed messages per measurement.")
+    parser.add_argument("--teams", type=int, default=6, help="Amount of signing keys.")
+    args = parser.parse_args()
+
+    for name, rate in run(args.amount, args.teams).items():
+        print(f"{name:>20}: {rate:>12,.0f} verifications/sec")
+
+
+if __name__ == "__main__":
+    main()
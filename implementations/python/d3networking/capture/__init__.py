@@ -0,0 +1,8 @@
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "CaptureWriter": ".capture",
+    "read_capture": ".capture",
+    "record": ".capture",
+    "Replayer": ".replay",
+})
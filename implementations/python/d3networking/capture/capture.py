@@ -0,0 +1,197 @@
+""" Recording of the raw multicast stream.
+
+Two formats are supported:
+
+- ``d3cap``, a compact append-only log. The file starts with the magic ``D3CP`` and a 16 bit version, then holds one
+  record per datagram: a 64 bit timestamp in nanoseconds since the epoch, a 16 bit length and the datagram.
+- ``pcap``, with nanosecond timestamps. Each datagram is wrapped in IPv4 or IPv6 and UDP headers addressed to the
+  multicast group so that it can be inspected with the usual tools.
+
+Run ``python -m d3networking.capture.capture OUTPUT`` to record the live stream.
+"""
+import argparse
+import socket
+import struct
+import time
+from pathlib import Path
+from typing import BinaryIO, Iterator, Literal, Optional, Tuple, Union
+
+from ..transport.transport import AvailablePayloadClient, PORT, V4_MULTICAST_GRP, V6_MULTICAST_GRP
+
+CaptureFormat = Literal["d3cap", "pcap"]
+
+D3CAP_MAGIC = b"D3CP"
+D3CAP_VERSION = 1
+PCAP_MAGIC_NS = 0xA1B23C4D
+LINKTYPE_RAW = 101
+
+_D3CAP_HEADER = struct.Struct('<4sHH')
+_D3CAP_RECORD = struct.Struct('<QH')
+_PCAP_HEADER = struct.Struct('<IHHiIII')
+_PCAP_RECORD = struct.Struct('<IIII')
+_IPV4_HEADER = struct.Struct('!BBHHHBBH4s4s')
+_IPV6_HEADER = struct.Struct('!IHBB16s16s')
+_UDP_HEADER = struct.Struct('!HHHH')
+
+
+def _wrap_ip_udp(datagram: bytes, proto: Literal[4, 6]) -> bytes:
+    """ Wrap a datagram in IP and UDP headers sent from the unspecified address to the multicast group.
+    """
+    udp = _UDP_HEADER.pack(PORT, PORT, _UDP_HEADER.size + len(datagram), 0) + datagram
+    if proto == 6:
+        return _IPV6_HEADER.pack(6 << 28, len(udp), socket.IPPROTO_UDP, 1, bytes(16),
+                                 socket.inet_pton(socket.AF_INET6, V6_MULTICAST_GRP)) + udp
+    return _IPV4_HEADER.pack(0x45, 0, _IPV4_HEADER.size + len(udp), 0, 0, 1, socket.IPPROTO_UDP, 0, bytes(4),
+                             socket.inet_aton(V4_MULTICAST_GRP)) + udp
+
+
+def _unwrap_ip_udp(packet: bytes) -> bytes:
+    """ Extract the UDP payload of a raw IP packet.
+    """
+    if packet[0] >> 4 == 6:
+        return packet[_IPV6_HEADER.size + _UDP_HEADER.size:]
+    header_size = (packet[0] & 0x0F) * 4
+    return packet[header_size + _UDP_HEADER.size:]
+
+
+class CaptureWriter:
+    """ Appends datagrams with their timestamps to a capture file.
+    """
+    def __init__(self, path: Path, capture_format: CaptureFormat = "d3cap", proto: Literal[4, 6] = 6):
+        """ Create a capture file
+
+        :param path: Where to write the capture. An existing file is replaced.
+        :param capture_format: Either "d3cap" or "pcap".
+        :param proto: IP version of the headers added to pcap records.
+        """
+        self.capture_format = capture_format
+        self.proto = proto
+        self.written = 0
+        """ Amount of datagrams written.
+        """
+        self._stream: BinaryIO = open(path, "wb")
+        if capture_format == "d3cap":
+            self._stream.write(_D3CAP_HEADER.pack(D3CAP_MAGIC, D3CAP_VERSION, 0))
+        elif capture_format == "pcap":
+            self._stream.write(_PCAP_HEADER.pack(PCAP_MAGIC_NS, 2, 4, 0, 0, 65535, LINKTYPE_RAW))
+        else:
+            self._stream.close()
+            raise ValueError(f"Unsupported capture format: {capture_format}.")
+
+    def write(self, datagram: Union[bytes, memoryview], timestamp_ns: Optional[int] = None):
+        """ Append a datagram.
+
+        :param datagram: The raw datagram.
+        :param timestamp_ns: When the datagram was received, in nanoseconds since the epoch. Defaults to now.
+        :return: None
+        """
+        if timestamp_ns is None:
+            timestamp_ns = time.time_ns()
+
+        if self.capture_format == "d3cap":
+            self._stream.write(_D3CAP_RECORD.pack(timestamp_ns, len(datagram)))
+            self._stream.write(datagram)
+        else:
+            packet = _wrap_ip_udp(bytes(datagram), self.proto)
+            seconds, nanoseconds = divmod(timestamp_ns, 1_000_000_000)
+            self._stream.write(_PCAP_RECORD.pack(seconds, nanoseconds, len(packet), len(packet)))
+            self._stream.write(packet)
+        self.written += 1
+
+    def flush(self):
+        self._stream.flush()
+
+    def close(self):
+        self._stream.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def read_capture(path: Path) -> Iterator[Tuple[int, bytes]]:
+    """ Read the datagrams of a capture file of either format.
+
+    A truncated last record, e.g. from a recorder that was killed, is ignored.
+
+    :param path: The capture file.
+    :return: An iterator of (timestamp in nanoseconds since the epoch, datagram) tuples.
+    """
+    with open(path, "rb") as stream:
+        magic = stream.read(4)
+        if magic == D3CAP_MAGIC:
+            stream.read(_D3CAP_HEADER.size - 4)
+            while True:
+                header = stream.read(_D3CAP_RECORD.size)
+                if len(header) < _D3CAP_RECORD.size:
+                    return
+                timestamp_ns, size = _D3CAP_RECORD.unpack(header)
+                datagram = stream.read(size)
+                if len(datagram) < size:
+                    return
+                yield timestamp_ns, datagram
+        elif len(magic) == 4 and struct.unpack('<I', magic)[0] == PCAP_MAGIC_NS:
+            stream.read(_PCAP_HEADER.size - 4)
+            while True:
+                header = stream.read(_PCAP_RECORD.size)
+                if len(header) < _PCAP_RECORD.size:
+                    return
+                seconds, nanoseconds, size, _ = _PCAP_RECORD.unpack(header)
+                packet = stream.read(size)
+                if len(packet) < size:
+                    return
+                yield seconds * 1_000_000_000 + nanoseconds, _unwrap_ip_udp(packet)
+        else:
+            raise IOError("Unsupported capture file.")
+
+
+def record(client: AvailablePayloadClient, writer: CaptureWriter, duration: Optional[float] = None,
+           max_datagrams: Optional[int] = None) -> int:
+    """ Record every datagram received on the multicast group, valid or not.
+
+    :param client: A client joined to the multicast group. Its validation is bypassed.
+    :param writer: Where to write the datagrams.
+    :param duration: Amount of seconds to record for. Records forever if None.
+    :param max_datagrams: Stop after this amount of datagrams. Unlimited if None.
+    :return: The amount of datagrams recorded.
+    """
+    deadline = None if duration is None else time.monotonic() + duration
+    recorded = 0
+    while max_datagrams is None or recorded < max_datagrams:
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+        datagrams = client.recv_raw_many(timeout=timeout)
+        timestamp_ns = time.time_ns()
+        for datagram in datagrams:
+            writer.write(datagram, timestamp_ns)
+            recorded += 1
+    writer.flush()
+    return recorded
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record the multicast stream to a capture file.")
+    parser.add_argument("output", type=Path, help="Capture file to write.")
+    parser.add_argument("--format", choices=("d3cap", "pcap"), default="d3cap", help="Capture format.")
+    parser.add_argument("--proto", type=int, choices=(4, 6), default=6, help="Network protocol to use.")
+    parser.add_argument("--scope-id", type=int, default=0, help="Scope id of the network interface to use.")
+    parser.add_argument("--duration", type=float, default=None, help="Seconds to record for.")
+    args = parser.parse_args()
+
+    client = AvailablePayloadClient({}, scope_id=args.scope_id, proto=args.proto)
+    with CaptureWriter(args.output, args.format, proto=args.proto) as writer:
+        try:
+            recorded = record(client, writer, duration=args.duration)
+        except KeyboardInterrupt:
+            recorded = writer.written
+    client.close_connection()
+    print(f"Recorded {recorded} datagrams to {args.output}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+""" Offline replay of capture files.
+
+A capture is either sent again to a socket, e.g. a loopback multicast group to exercise a real client, or fed
+straight into a client's decoding, verification and sequence number pipeline without going through the network.
+Replay runs at the captured pace, N times faster, or as fast as possible, and reports the achieved throughput.
+
+Run ``python -m d3networking.capture.replay CAPTURE`` to replay a capture into the pipeline.
+"""
+import argparse
+import json
+import socket
+import time
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, List, Optional, Tuple, Union
+
+from ..crypto.key_storage.storage import load_keymap
+from ..transport.transport import AvailablePayloadClient, PORT, V4_MULTICAST_GRP, V6_MULTICAST_GRP
+from .capture import read_capture
+
+
+@dataclass
+class ReplayReport:
+    """ Outcome of a replay.
+    """
+    datagrams: int
+    """ Amount of datagrams replayed.
+    """
+    accepted: int
+    """ Amount of datagrams accepted by the pipeline. Equal to datagrams when replaying to a socket.
+    """
+    elapsed: float
+    """ Seconds spent replaying.
+    """
+    capture_duration: float
+    """ Seconds between the first and the last captured datagram.
+    """
+
+    @property
+    def throughput(self) -> float:
+        """ Datagrams replayed per second.
+        """
+        return self.datagrams / self.elapsed if self.elapsed > 0 else 0.0
+
+    def as_dict(self) -> dict:
+        return dict(asdict(self), throughput=self.throughput)
+
+
+class Replayer:
+    """ Replays a capture file.
+    """
+    def __init__(self, path: Path, speed: Optional[float] = 1.0, preload: bool = True):
+        """ Instantiate a Replayer
+
+        :param path: The capture file, in either format.
+        :param speed: Pace multiplier: 1 replays at the captured pace, 10 ten times faster. None replays as fast
+        as possible.
+        :param preload: Whether to read the whole capture in memory first, so that disk reads do not limit the
+        throughput at maximum speed.
+        """
+        if speed is not None and speed <= 0:
+            raise ValueError("The speed has to be positive.")
+        self.path = path
+        self.speed = speed
+        self._records: Optional[List[Tuple[int, bytes]]] = list(read_capture(path)) if preload else None
+
+    def _iter_records(self):
+        return iter(self._records) if self._records is not None else read_capture(self.path)
+
+    def _replay(self, handle: Callable[[bytes], bool]) -> ReplayReport:
+        """ Pace the captured datagrams and hand them to a callable.
+
+        :param handle: Called with every datagram, returns whether it was accepted.
+        :return: The replay's report.
+        """
+        datagrams = accepted = 0
+        first_ts = last_ts = None
+        start = time.perf_counter()
+        for timestamp_ns, datagram in self._iter_records():
+            if first_ts is None:
+                first_ts = last_ts = timestamp_ns
+            last_ts = max(last_ts, timestamp_ns)
+            if self.speed is not None:
+                delay = (timestamp_ns - first_ts) / 1e9 / self.speed - (time.perf_counter() - start)
+                if delay > 0:
+                    time.sleep(delay)
+            datagrams += 1
+            if handle(datagram):
+                accepted += 1
+        elapsed = time.perf_counter() - start
+
+        capture_duration = (last_ts - first_ts) / 1e9 if first_ts is not None else 0.0
+        return ReplayReport(datagrams, accepted, elapsed, capture_duration)
+
+    def replay_into(self, client: AvailablePayloadClient, validate: bool = True) -> ReplayReport:
+        """ Feed the capture straight into a client's pipeline, bypassing the network.
+
+        :param client: The client whose validation and replay protection state is used.
+        :param validate: Whether to verify the signatures or not.
+        :return: The replay's report.
+        """
+        return self._replay(lambda datagram: bool(client.engine.receive(datagram, validate=validate)))
+
+    def replay_to_socket(self, sock: socket.socket, address: Union[Tuple[str, int], Tuple[str, int, int, int]]) \
+            -> ReplayReport:
+        """ Send the capture to an address, e.g. the loopback multicast group.
+
+        :param sock: The socket to send from.
+        :param address: Where to send the datagrams.
+        :return: The replay's report.
+        """
+        def send(datagram: bytes) -> bool:
+            sock.sendto(datagram, address)
+            return True
+
+        return self._replay(send)
+
+
+def offline_client(validate_keys, **client_options) -> AvailablePayloadClient:
+    """ Create a client that is not bound to the multicast group, to replay captures into.
+
+    :param validate_keys: Keymap used to verify the signatures.
+    :param client_options: Further AvailablePayloadClient options.
+    :return: The client.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    return AvailablePayloadClient(validate_keys, proto=4, sock=sock, **client_options)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a capture file.")
+    parser.add_argument("capture", type=Path, help="Capture file to replay.")
+    parser.add_argument("--speed", type=float, default=None,
+                        help="Pace multiplier. Replays as fast as possible when omitted.")
+    parser.add_argument("--keymap", type=Path, default=None,
+                        help="Keymap used to verify the signatures. Signatures are not verified when omitted.")
+    parser.add_argument("--send", choices=("4", "6"), default=None,
+                        help="Send the capture to the multicast group over IPv4 or IPv6 instead of the pipeline.")
+    parser.add_argument("--scope-id", type=int, default=0, help="Scope id of the interface to send IPv6 on.")
+    args = parser.parse_args()
+
+    replayer = Replayer(args.capture, speed=args.speed)
+    if args.send == "4":
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+            report = replayer.replay_to_socket(sock, (V4_MULTICAST_GRP, PORT))
+    elif args.send == "6":
+        with socket.socket(socket.AF_INET6, socket.SOCK_DGRAM) as sock:
+            sock.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_LOOP, 1)
+            report = replayer.replay_to_socket(sock, (V6_MULTICAST_GRP, PORT, 0, args.scope_id))
+    else:
+        keymap = load_keymap(args.keymap) if args.keymap is not None else {}
+        client = offline_client(keymap)
+        report = replayer.replay_into(client, validate=args.keymap is not None)
+        client.close_connection()
+
+    print(json.dumps(report.as_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    main()
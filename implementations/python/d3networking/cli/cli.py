@@ -1,11 +1,13 @@
-from pathlib import Path
-from typing import Dict
+from typing import TYPE_CHECKING, Dict
 
 import click
-from d3networking.crypto.key_generator.key_generator import KeyGenerator
-from d3networking.crypto.key_storage.key_pair import print_keypair, KeyPair
-from d3networking.crypto.key_storage.storage import store_keymap
-from nacl.signing import VerifyKey
+
+if TYPE_CHECKING:
+    from d3networking.crypto.key_storage.key_pair import KeyPair
+    from nacl.signing import VerifyKey
+
+# Only click is imported at module load. The crypto stack is imported inside the commands that need it so that the
+# CLI starts quickly on embedded computers.
 
 
 def _bad_key_err() -> None:
@@ -28,7 +30,10 @@ def generate_keypair():
     Keep the private key private and share your public key with the recipients
     of your messages.
     """
-    keys: KeyPair = KeyGenerator.generate_keypair()
+    from d3networking.crypto.key_generator.key_generator import KeyGenerator
+    from d3networking.crypto.key_storage.key_pair import print_keypair
+
+    keys: "KeyPair" = KeyGenerator.generate_keypair()
     print_keypair(keys)
 
 
@@ -40,7 +45,13 @@ def store_sign_keys(amount, path):
     
     Keys should be provided in hexadecimal encoding.
     """
-    keys: Dict[int, VerifyKey] = {}
+    from pathlib import Path
+
+    from nacl.signing import VerifyKey
+
+    from d3networking.crypto.key_storage.storage import store_keymap
+
+    keys: Dict[int, "VerifyKey"] = {}
 
     for i in range(1, amount + 1):
         key_as_str = input(f"Key for team {i}: ")
@@ -55,8 +66,97 @@ def store_sign_keys(amount, path):
     store_keymap(keys, store_path=Path(path), overwrite=True)
 
 
+@click.command()
+@click.argument("count", type=click.IntRange(min=1, max=256))
+@click.option("--out-dir", type=click.Path(file_okay=False), required=True,
+              help="Directory where each private key is written, one file per team.")
+@click.option("--keystore", type=click.Path(dir_okay=False), required=True,
+              help="Keystore where every public key is written.")
+@click.option("--first-team", type=click.IntRange(min=0, max=255), default=1, help="Identifier of the first team.")
+@click.option("--workers", type=click.IntRange(min=1), default=4, help="Amount of threads generating keys.")
+@click.option("--overwrite", is_flag=True, help="Replace existing private key files and keystore.")
+def generate_keypairs(count, out_dir, keystore, first_team, workers, overwrite):
+    """Generate COUNT keypairs for consecutive teams without any prompt.
+
+    Each private key is written, hex encoded, to OUT_DIR/team_<id>.key and
+    readable only by its owner. Every public key is written to the keystore
+    in a single atomic write, once every private key is written. Nothing is
+    left behind if a file cannot be written.
+    """
+    from pathlib import Path
+
+    from d3networking.crypto.key_generator.key_generator import KeyGenerator
+    from d3networking.crypto.key_storage.keystore import write_keystore
+    from d3networking.crypto.key_storage.storage import store_private_key
+
+    if first_team + count - 1 > 255:
+        raise click.BadParameter("Team identifiers must fit on 8 bits.", param_hint="count")
+
+    keystore_path = Path(keystore)
+    out_path = Path(out_dir)
+    key_paths = {team_id: out_path / f"team_{team_id}.key" for team_id in range(first_team, first_team + count)}
+    if not overwrite:
+        for path in (keystore_path, *key_paths.values()):
+            if path.exists():
+                raise click.ClickException(f"{path} already exists. Use --overwrite to replace it.")
+
+    out_path.mkdir(parents=True, exist_ok=True)
+    keypairs = KeyGenerator.generate_keypairs(count, workers=workers)
+    keymap = {}
+    written = []
+    target = keystore_path
+    try:
+        for (team_id, target), keypair in zip(key_paths.items(), keypairs):
+            store_private_key(keypair.private_key, target, overwrite=overwrite)
+            written.append(target)
+            keymap[team_id] = keypair.public_key
+        target = keystore_path
+        write_keystore(keymap, keystore_path, overwrite=True)
+    except OSError as error:
+        # Private keys without their public keys in the keystore are useless, remove them.
+        for key_path in written:
+            key_path.unlink()
+        raise click.ClickException(f"{target}: {error}")
+
+    click.echo(f"Generated {count} keypairs in {out_path.resolve()} and stored their public keys at "
+               f"{keystore_path.resolve()}.")
+
+
+@click.command()
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+@click.argument("keystore", type=click.Path(dir_okay=False))
+@click.option("--format", "file_format", type=click.Choice(["csv", "json"]), default=None,
+              help="Format of SOURCE. Guessed from its extension by default.")
+@click.option("--overwrite", is_flag=True, help="Replace the keystore if it already exists.")
+def import_keymap(source, keystore, file_format, overwrite):
+    """Import hex encoded public keys with their team ids from a CSV or JSON file.
+
+    CSV files hold one "team_id,public_key" row per team. JSON files hold an
+    object mapping team ids to public keys. The keystore is written in a
+    single atomic write.
+    """
+    from pathlib import Path
+
+    from d3networking.crypto.key_storage.keystore import write_keystore
+    from d3networking.crypto.key_storage.storage import import_keymap as read_keymap
+
+    keystore_path = Path(keystore)
+    if keystore_path.exists() and not overwrite:
+        raise click.ClickException(f"{keystore_path} already exists. Use --overwrite to replace it.")
+
+    try:
+        keymap = read_keymap(Path(source), file_format)
+    except IOError as error:
+        raise click.ClickException(str(error))
+
+    write_keystore(keymap, keystore_path, overwrite=True)
+    click.echo(f"Imported {len(keymap)} keys to {keystore_path.resolve()}.")
+
+
 app.add_command(generate_keypair)
 app.add_command(store_sign_keys)
+app.add_command(generate_keypairs)
+app.add_command(import_keymap)
 
 
 def main():
@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
 from nacl.signing import SigningKey, VerifyKey
 from ..key_storage.key_pair import KeyPair
 
@@ -15,3 +18,19 @@ class KeyGenerator:
         pubic_key: VerifyKey = private_key.verify_key
 
         return KeyPair(private_key=private_key, public_key=pubic_key)
+
+    @staticmethod
+    def generate_keypairs(amount: int, workers: int = 4) -> List[KeyPair]:
+        """
+        Generates several key pairs in parallel.
+
+        PyNaCl releases the GIL while generating keys, so the pairs are generated on a thread pool.
+        :param amount: The amount of key pairs to generate.
+        :param workers: The amount of threads to use.
+        :return: A list of KeyPair objects.
+        """
+        if workers <= 1 or amount < 2:
+            return [KeyGenerator.generate_keypair() for _ in range(amount)]
+
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(lambda _: KeyGenerator.generate_keypair(), range(amount)))
@@ -0,0 +1,8 @@
+from ..._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "KeyPair": ".key_pair",
+    "KeyStore": ".keystore",
+    "load_keymap": ".storage",
+    "store_keymap": ".storage",
+})
@@ -25,6 +25,6 @@ def print_keypair(keypair: KeyPair):
     output.
     :return: None
     """
-    print(f"Private key: {keypair.private_key.encode(encoder=HexEncoder)}")
-    print(f"Public key: {keypair.public_key.encode(encoder=HexEncoder)}")
+    print(f"Private key: {keypair.private_key.encode(encoder=HexEncoder).decode()}")
+    print(f"Public key: {keypair.public_key.encode(encoder=HexEncoder).decode()}")
     print("Keep the private key PRIVATE.")
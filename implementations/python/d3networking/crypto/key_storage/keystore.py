@@ -0,0 +1,287 @@
+import mmap
+import os
+import struct
+import tempfile
+import time
+import zlib
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from nacl.bindings import crypto_sign_PUBLICKEYBYTES
+
+from nacl.signing import VerifyKey
+
+from ..signature.schemes import CheckKey, KEY_TYPE_ED25519, MacKey, scheme_for_key_type
+
+KEYSTORE_MAGIC = b"D3KS"
+KEYSTORE_VERSION = 1
+MAX_TEAM_ID = 255
+
+_HEADER = struct.Struct('<4sBBHII')
+_INDEX = struct.Struct(f'<{MAX_TEAM_ID + 1}I')
+_OFFSET = struct.Struct('<I')
+_ENTRY = struct.Struct('<BB')
+_MAX_KEY_SIZE = 0xFF
+
+
+def is_keystore(store_path: Path) -> bool:
+    """ Check whether a file uses the versioned keystore format.
+
+    :param store_path: The file to check.
+    :return: Whether the file starts with the keystore magic.
+    """
+    with open(store_path, "rb") as stream:
+        return stream.read(len(KEYSTORE_MAGIC)) == KEYSTORE_MAGIC
+
+
+def _entry_bytes(key: Union[CheckKey, bytes]) -> bytes:
+    if isinstance(key, MacKey):
+        scheme_for_key_type(key.key_type)
+        key_type, key_bytes = key.key_type, bytes(key.secret)
+    else:
+        key_type, key_bytes = KEY_TYPE_ED25519, bytes(key.encode() if isinstance(key, VerifyKey) else key)
+        if len(key_bytes) != crypto_sign_PUBLICKEYBYTES:
+            raise ValueError(f"Ed25519 keys are {crypto_sign_PUBLICKEYBYTES} bytes long, not {len(key_bytes)}.")
+    if len(key_bytes) > _MAX_KEY_SIZE:
+        raise ValueError(f"Keys are at most {_MAX_KEY_SIZE} bytes long, not {len(key_bytes)}.")
+    return _ENTRY.pack(key_type, len(key_bytes)) + key_bytes
+
+
+def write_keystore(keymap: Dict[int, Union[CheckKey, bytes]], store_path: Path, overwrite: bool = False):
+    """ Write a keymap in the versioned keystore format.
+
+    The file holds a header (magic, version, amount of keys, checksum and body size), then an index of 256 offsets
+    mapping each team identifier to its entry (0 when absent), then the entries themselves. The checksum is a CRC32
+    of everything after the header. Each entry holds the key type, which sets the signature scheme of the team,
+    then the key: an Ed25519 verify key, or a MacKey's shared secret. The file is created readable by its owner only
+    since it may hold secrets.
+    Secrets are at most 255 bytes long.
+
+    The file is written to a temporary file first and renamed over the destination, so readers never see a
+    partially written keystore.
+
+    :param keymap: Mapping between team identifiers (0 to 255) and their keys. Raw bytes are stored as Ed25519 keys.
+    :param store_path: Where to write the keystore.
+    :param overwrite: Whether to replace the file if it already exists. Default is False
+    :return: None
+    """
+    if not overwrite and store_path.exists():
+        raise IOError("Provided store path already exists.")
+
+    offsets = [0] * (MAX_TEAM_ID + 1)
+    entries = bytearray()
+    for team_id, key in sorted(keymap.items()):
+        if not 0 <= team_id <= MAX_TEAM_ID:
+            raise ValueError(f"Team identifier {team_id} does not fit on 8 bits.")
+        offsets[team_id] = _HEADER.size + _INDEX.size + len(entries)
+        entries += _entry_bytes(key)
+
+    body = _INDEX.pack(*offsets) + entries
+    header = _HEADER.pack(KEYSTORE_MAGIC, KEYSTORE_VERSION, 0, len(keymap), zlib.crc32(body), len(body))
+
+    directory = store_path.resolve().parent
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{store_path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as stream:
+            stream.write(header + body)
+            stream.flush()
+            os.fsync(stream.fileno())
+        os.replace(tmp_path, store_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class KeyStore(Mapping):
+    """ Read-only, memory-mapped view of a keystore file.
+
+    Looking up a team is a single read in the index, so sparse team identifiers up to 255 are supported at no cost.
+    Keys are only built the first time a team is looked up, then cached: a VerifyKey for Ed25519 entries, a MacKey for
+    the shared secrets of the other schemes.
+
+    The file is checked for changes at most once per poll interval, on lookup. When it changed, the new file is
+    validated and mapped in place of the old one, so a running client picks up new keys without restarting. A file
+    that fails validation is ignored and the previous keys are kept. Keystores must be replaced, not modified in
+    place, since the mapped file is read directly; write_keystore takes care of that.
+
+    Entries of a key type this version does not know are skipped, as if the team had no key. Entries that do not fit
+    in the file, or Ed25519 keys of the wrong size, fail the validation of the whole file.
+
+    Lookups may run on several threads while a reload happens. Each lookup reads a single version of the file: the
+    previous mapping is never closed by a reload, it is released once no lookup uses it anymore.
+
+    A KeyStore can be given anywhere a keymap dictionary is expected, e.g. to AvailablePayloadClient.
+    """
+    def __init__(self, store_path: Path, poll_interval: Optional[float] = 1.0):
+        """ Open a keystore
+
+        :param store_path: The keystore file.
+        :param poll_interval: Minimum amount of seconds between two checks for changes. Set to None to never reload.
+        """
+        self.store_path = Path(store_path)
+        self.poll_interval = poll_interval
+        self.reloads = 0
+        """ Amount of times the file was reloaded after a change.
+        """
+        self._map: Optional[mmap.mmap] = None
+        self._keys: Dict[int, CheckKey] = {}
+        self._teams: Tuple[int, ...] = ()
+        self._mtime_ns = 0
+        self._next_poll = 0.0
+        self._load()
+
+    def _load(self):
+        if not self.store_path.exists():
+            raise IOError("Provided store path does not exist.")
+
+        with open(self.store_path, "rb") as stream:
+            mtime_ns = os.fstat(stream.fileno()).st_mtime_ns
+            new_map = mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            teams = self._validate(new_map)
+        except IOError:
+            new_map.close()
+            raise
+
+        # Lookups in progress may still read the previous mapping, it is unmapped when they drop it.
+        self._map = new_map
+        self._keys = {}
+        self._teams = teams
+        self._mtime_ns = mtime_ns
+
+    @staticmethod
+    def _validate(store_map: mmap.mmap) -> Tuple[int, ...]:
+        """ Check a mapped file before using it.
+
+        :param store_map: The mapped file.
+        :return: The teams whose key can be used, in order.
+        """
+        if len(store_map) < _HEADER.size + _INDEX.size:
+            raise IOError("Bad format for provided store path file.")
+        magic, version, _, _, checksum, body_size = _HEADER.unpack_from(store_map)
+        if magic != KEYSTORE_MAGIC:
+            raise IOError("Bad format for provided store path file.")
+        if version != KEYSTORE_VERSION:
+            raise IOError(f"Unsupported keystore version {version}.")
+        if len(store_map) != _HEADER.size + body_size:
+            raise IOError("Keystore size does not match its header.")
+        if zlib.crc32(memoryview(store_map)[_HEADER.size:]) != checksum:
+            raise IOError("Keystore checksum does not match its contents.")
+
+        teams = []
+        for team_id, offset in enumerate(_INDEX.unpack_from(store_map, _HEADER.size)):
+            if offset == 0:
+                continue
+            if not _HEADER.size + _INDEX.size <= offset <= len(store_map) - _ENTRY.size:
+                raise IOError(f"Entry of team {team_id} is outside of the keystore.")
+            key_type, key_size = _ENTRY.unpack_from(store_map, offset)
+            if offset + _ENTRY.size + key_size > len(store_map):
+                raise IOError(f"Key of team {team_id} is outside of the keystore.")
+            if key_type == KEY_TYPE_ED25519 and key_size != crypto_sign_PUBLICKEYBYTES:
+                raise IOError(f"Ed25519 key of team {team_id} is {key_size} bytes long.")
+            try:
+                scheme_for_key_type(key_type)
+            except ValueError:
+                continue  # Written for a scheme this version does not know, the team cannot be validated.
+            teams.append(team_id)
+        return tuple(teams)
+
+    def reload_if_changed(self) -> bool:
+        """ Reload the file if it was modified since it was loaded.
+
+        :return: Whether the file was reloaded.
+        """
+        try:
+            mtime_ns = os.stat(self.store_path).st_mtime_ns
+        except OSError:
+            return False
+        if mtime_ns == self._mtime_ns:
+            return False
+
+        try:
+            self._load()
+        except (IOError, ValueError):
+            return False
+        self.reloads += 1
+        return True
+
+    def _poll(self):
+        if self.poll_interval is None:
+            return
+        now = time.monotonic()
+        if now >= self._next_poll:
+            self._next_poll = now + self.poll_interval
+            self.reload_if_changed()
+
+    @staticmethod
+    def _entry(store_map: mmap.mmap, team_id: int) -> Optional[Tuple[int, bytes]]:
+        """ Read a team's entry from one version of the file.
+
+        :param store_map: The mapping to read, taken once by the caller.
+        :param team_id: A team identifier.
+        :return: The key type and the key's bytes, or None if the team has no key.
+        """
+        if not 0 <= team_id <= MAX_TEAM_ID:
+            return None
+        offset = _OFFSET.unpack_from(store_map, _HEADER.size + team_id * _OFFSET.size)[0]
+        if offset == 0:
+            return None
+        key_type, key_size = _ENTRY.unpack_from(store_map, offset)
+        start = offset + _ENTRY.size
+        return key_type, store_map[start: start + key_size]
+
+    def raw_key(self, team_id: int) -> Optional[bytes]:
+        """ Raw bytes of a team's key.
+
+        :param team_id: A team identifier.
+        :return: The key's bytes, or None if the team has no key.
+        """
+        entry = self._entry(self._map, team_id)
+        return entry[1] if entry is not None else None
+
+    def key_type(self, team_id: int) -> Optional[int]:
+        """ Type of a team's key, which sets the team's signature scheme.
+
+        :param team_id: A team identifier.
+        :return: The key type, or None if the team has no key.
+        """
+        entry = self._entry(self._map, team_id)
+        return entry[0] if entry is not None else None
+
+    def __getitem__(self, team_id: int) -> CheckKey:
+        self._poll()
+        # The cache and the mapping are replaced together on reload, both are read once.
+        keys, store_map = self._keys, self._map
+        key = keys.get(team_id)
+        if key is not None:
+            return key
+
+        entry = self._entry(store_map, team_id)
+        if entry is None:
+            raise KeyError(team_id)
+        key_type, key_bytes = entry
+        try:
+            scheme_for_key_type(key_type)
+        except ValueError:
+            # Written for a scheme this version does not know, the team cannot be validated.
+            raise KeyError(team_id)
+        key = VerifyKey(key_bytes) if key_type == KEY_TYPE_ED25519 else MacKey(key_type, key_bytes)
+        keys[team_id] = key
+        return key
+
+    def __iter__(self) -> Iterator[int]:
+        self._poll()
+        return iter(self._teams)
+
+    def __len__(self) -> int:
+        self._poll()
+        return len(self._teams)
+
+    def close(self):
+        """ Unmap the file. The keystore must not be used anymore.
+        """
+        store_map, self._map = self._map, None
+        if store_map is not None:
+            store_map.close()
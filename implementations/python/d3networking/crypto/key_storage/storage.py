@@ -1,18 +1,14 @@
+import csv
+import json
+import os
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Optional, Tuple
 
-from nacl.signing import VerifyKey
+from nacl.signing import SigningKey, VerifyKey
 from nacl.encoding import HexEncoder
-from nacl.exceptions import TypeError
+from nacl.exceptions import TypeError as NaclTypeError
 
-
-def _add_public_key_to_file(public_key: VerifyKey, store_path: Path):
-    if not store_path.exists():
-        raise IOError("Provided store path does not exist.")
-    with open(store_path, "wb") as stream:
-        stream.write(public_key.encode())
-
-    print(f"Added public key to {str(store_path.resolve())}.")
+from .keystore import KeyStore, is_keystore, write_keystore
 
 
 def _validate_not_exists(path: Path):
@@ -36,6 +32,26 @@ def store_public_key(public_key: VerifyKey, store_path: Path, overwrite: bool =
     print(f"Public key saved at {str(store_path.resolve())}.")
 
 
+def store_private_key(private_key: SigningKey, store_path: Path, overwrite: bool = False):
+    """ Writes a single private key to a file, hex encoded, readable only by its owner.
+
+    :param private_key: The private key to store.
+    :param store_path: The path towards where the private key should be saved.
+    :param overwrite: If the file already exists, whether to overwrite the file's
+    contents with the key. Default is False
+    :return: None
+    """
+    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+    if not overwrite:
+        flags |= os.O_EXCL
+    try:
+        fd = os.open(store_path, flags, 0o600)
+    except FileExistsError:
+        raise IOError("Provided store path already exists.")
+    with os.fdopen(fd, "wb") as stream:
+        stream.write(private_key.encode(encoder=HexEncoder))
+
+
 def load_public_key(store_path: Path) -> VerifyKey:
     """ Load a single public key from a file.
     :param store_path: A binary file where the key is stored.
@@ -62,7 +78,10 @@ def store_keymap(keymap: Dict[int, VerifyKey], store_path: Path, overwrite: bool
             2: VerifyKey
         }
 
-    There should be an entry for each team identifier you plan to receive messages from.
+    There should be an entry for each team identifier you plan to receive messages from. Team identifiers do not
+    need to be contiguous.
+
+    The keys are written in the versioned keystore format, see keystore.write_keystore.
 
     :param keymap: The keymap to store.
     :param store_path: A path towards a file where the keys will be stored.
@@ -72,12 +91,7 @@ def store_keymap(keymap: Dict[int, VerifyKey], store_path: Path, overwrite: bool
     if not overwrite:
         _validate_not_exists(store_path)
 
-    if store_path.exists():
-        store_path.unlink()
-    store_path.touch()
-
-    for _, value in sorted(keymap.items()):
-        _add_public_key_to_file(value, store_path)
+    write_keystore(keymap, store_path, overwrite=True)
 
     print(f"Stored keymap at {str(store_path.resolve())}")
 
@@ -86,20 +100,29 @@ def load_keymap(store_path: Path, keys_amount: int = 6, key_size: int = 32) -> D
     """
     Load keymap from a binary file.
 
-    See the store_keymap documentation for more information on the file structure.
+    See the store_keymap documentation for more information on the file structure. Use keystore.KeyStore instead to
+    look keys up lazily and pick up changes to the file without restarting.
 
-    This method assumes that the keys are stored in order starting with team identifier 1.
+    Files written before the versioned keystore format hold raw keys back to back. For those files, this method
+    assumes that the keys are stored in order starting with team identifier 1. Keystore entries of a key type this
+    version does not know are skipped.
 
     :param store_path: Where to load the keymap from. Must be a binary file.
-    :param keys_amount: The amount of keys to load from the file. The method makes
-    no checks on the validity of this value. Default is 6 as there are 6 teams.
-    :param key_size: The size of each key stored in the file. Defaults to 32 bytes as
-    it is the size of an Ed25519 verify key.
+    :param keys_amount: The amount of keys to load from a raw keys file. The method makes
+    no checks on the validity of this value. Default is 6 as there are 6 teams. Ignored for keystore files.
+    :param key_size: The size of each key stored in a raw keys file. Defaults to 32 bytes as
+    it is the size of an Ed25519 verify key. Ignored for keystore files.
     :return: A dictionary that maps each VerifyKey with its corresponding team id.
     """
     if not store_path.exists():
         raise IOError("Provided store path does not exist.")
 
+    if is_keystore(store_path):
+        keystore = KeyStore(store_path, poll_interval=None)
+        keymap = dict(keystore)
+        keystore.close()
+        return keymap
+
     keymap: Dict[int, VerifyKey] = {}
 
     with open(store_path, "rb") as stream:
@@ -107,7 +130,73 @@ def load_keymap(store_path: Path, keys_amount: int = 6, key_size: int = 32) -> D
             for i in range(1, keys_amount + 1):
                 key_bytes = stream.read(key_size)
                 keymap[i] = VerifyKey(key_bytes)
-        except TypeError:
+        except (NaclTypeError, TypeError):
             raise IOError("Bad format for provided store path file.")
     
     return keymap
+
+
+def _parse_key(team_id, key_as_str) -> Tuple[int, VerifyKey]:
+    try:
+        team_id = int(team_id)
+        key = VerifyKey(bytes.fromhex(str(key_as_str).strip()))
+    except (NaclTypeError, TypeError, ValueError):
+        raise IOError(f"Bad key format for team {team_id}.")
+    if not 0 <= team_id <= 255:
+        raise IOError(f"Team identifier {team_id} does not fit on 8 bits.")
+    return team_id, key
+
+
+def import_keymap(source_path: Path, file_format: Optional[str] = None) -> Dict[int, VerifyKey]:
+    """ Read a keymap of hex encoded public keys from a CSV or JSON file.
+
+    CSV files hold one ``team_id,public_key`` row per team, with an optional header row. JSON files hold either an
+    object mapping team identifiers to keys, e.g. ``{"1": "ab01..."}``, or a list of
+    ``{"team_id": 1, "public_key": "ab01..."}`` objects.
+
+    :param source_path: The file to read.
+    :param file_format: Either "csv" or "json". Guessed from the file extension if None.
+    :return: A dictionary that maps each VerifyKey with its corresponding team id.
+    """
+    if not source_path.exists():
+        raise IOError("Provided source path does not exist.")
+    if file_format is None:
+        file_format = source_path.suffix.lstrip(".").lower()
+
+    entries = []
+    if file_format == "csv":
+        with open(source_path, newline="") as stream:
+            for row in csv.reader(stream):
+                if not row or row[0].strip().startswith("#"):
+                    continue
+                if len(row) < 2:
+                    raise IOError(f"Bad CSV row: {row}.")
+                if not row[0].strip().isdigit():
+                    continue  # Header row
+                entries.append((row[0], row[1]))
+    elif file_format == "json":
+        with open(source_path) as stream:
+            try:
+                document = json.load(stream)
+            except json.JSONDecodeError:
+                raise IOError("Bad format for provided source path file.")
+        if isinstance(document, dict):
+            entries = list(document.items())
+        elif isinstance(document, list):
+            try:
+                entries = [(entry["team_id"], entry["public_key"]) for entry in document]
+            except (KeyError, TypeError):
+                raise IOError("Bad format for provided source path file.")
+        else:
+            raise IOError("Bad format for provided source path file.")
+    else:
+        raise IOError(f"Unsupported keymap format: {file_format}.")
+
+    keymap: Dict[int, VerifyKey] = {}
+    for team_id, key_as_str in entries:
+        team_id, key = _parse_key(team_id, key_as_str)
+        if team_id in keymap:
+            raise IOError(f"Duplicate key for team {team_id}.")
+        keymap[team_id] = key
+
+    return keymap
@@ -0,0 +1,11 @@
+from ..._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "MacKey": ".schemes",
+    "SignatureScheme": ".schemes",
+    "register_scheme": ".schemes",
+    "registered_schemes": ".schemes",
+    "scheme_for_key": ".schemes",
+    "scheme_for_key_type": ".schemes",
+    "scheme_for_size": ".schemes",
+})
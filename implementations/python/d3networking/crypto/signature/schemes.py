@@ -0,0 +1,208 @@
+import hashlib
+import hmac
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Dict, List, Union
+
+from nacl.exceptions import BadSignatureError
+from nacl.signing import SigningKey, VerifyKey
+
+KEY_TYPE_ED25519 = 1
+""" Ed25519 key. Keystores hold the 32 bytes verify key.
+"""
+KEY_TYPE_HMAC_SHA256 = 2
+""" Secret shared between a team and its vehicles, used with HMAC-SHA256.
+"""
+KEY_TYPE_BLAKE2B = 3
+""" Secret shared between a team and its vehicles, used with keyed BLAKE2b.
+"""
+KEY_TYPE_BLAKE2B_64 = 4
+""" Secret shared between a team and its vehicles, used with keyed BLAKE2b truncated to 64 bits.
+"""
+
+
+@dataclass(frozen=True)
+class MacKey:
+    """ Secret key of a message authentication code scheme.
+
+    The same key signs and verifies, so it must only be shared between a team and the vehicles.
+    """
+    key_type: int
+    """ Key type of the scheme the key is used with, e.g. KEY_TYPE_HMAC_SHA256.
+    """
+    secret: bytes
+    """ The shared secret.
+    """
+
+    @staticmethod
+    def generate(key_type: int, size: int = 32):
+        """ Generate a random key.
+
+        :param key_type: Key type of the scheme the key is used with.
+        :param size: Size of the secret in bytes.
+        :return: A new MacKey.
+        """
+        return MacKey(key_type, os.urandom(size))
+
+
+SignKey = Union[SigningKey, MacKey]
+CheckKey = Union[VerifyKey, MacKey]
+
+
+class SignatureScheme(ABC):
+    """ A way to sign the header of messages.
+
+    Schemes are identified on the wire by the size of their signature, and in keystores by their key type.
+    """
+    name: str
+    key_type: int
+    sig_size: int
+
+    @abstractmethod
+    def sign(self, key: SignKey, msg: Union[bytes, memoryview]) -> bytes:
+        """ Sign a message.
+
+        :param key: The key used to sign.
+        :param msg: The unsigned bytes message representation.
+        :return: The signature, sig_size bytes long.
+        """
+
+    @abstractmethod
+    def verify(self, key: CheckKey, msg: Union[bytes, memoryview], signature: Union[bytes, memoryview]) -> bool:
+        """ Validate that a message is properly signed.
+
+        :param key: The key used to verify.
+        :param msg: The unsigned bytes message representation.
+        :param signature: The message's signature.
+        :return: Whether the message is properly signed or not.
+        """
+
+
+class Ed25519Scheme(SignatureScheme):
+    """ Ed25519 signatures. Vehicles only hold the teams' public keys.
+    """
+    name = "ed25519"
+    key_type = KEY_TYPE_ED25519
+    sig_size = 64
+
+    def sign(self, key: SigningKey, msg: Union[bytes, memoryview]) -> bytes:
+        return key.sign(bytes(msg)).signature
+
+    def verify(self, key: VerifyKey, msg: Union[bytes, memoryview], signature: Union[bytes, memoryview]) -> bool:
+        try:
+            key.verify(bytes(msg), bytes(signature))
+        except BadSignatureError:
+            return False
+
+        return True
+
+
+class HmacSha256Scheme(SignatureScheme):
+    """ HMAC-SHA256 with a per-team shared secret.
+    """
+    name = "hmac-sha256"
+    key_type = KEY_TYPE_HMAC_SHA256
+    sig_size = 32
+
+    def sign(self, key: MacKey, msg: Union[bytes, memoryview]) -> bytes:
+        return hmac.digest(key.secret, msg, "sha256")
+
+    def verify(self, key: MacKey, msg: Union[bytes, memoryview], signature: Union[bytes, memoryview]) -> bool:
+        return hmac.compare_digest(hmac.digest(key.secret, msg, "sha256"), signature)
+
+
+class Blake2bScheme(SignatureScheme):
+    """ Keyed BLAKE2b with a per-team shared secret of at most 64 bytes.
+    """
+    def __init__(self, name: str, key_type: int, sig_size: int):
+        """ Instantiate a Blake2bScheme
+
+        :param name: Name of the scheme.
+        :param key_type: Key type of the scheme in keystores.
+        :param sig_size: Size of the digest in bytes, from 1 to 64.
+        """
+        self.name = name
+        self.key_type = key_type
+        self.sig_size = sig_size
+
+    def sign(self, key: MacKey, msg: Union[bytes, memoryview]) -> bytes:
+        return hashlib.blake2b(msg, key=key.secret, digest_size=self.sig_size).digest()
+
+    def verify(self, key: MacKey, msg: Union[bytes, memoryview], signature: Union[bytes, memoryview]) -> bool:
+        return hmac.compare_digest(self.sign(key, msg), signature)
+
+
+ED25519 = Ed25519Scheme()
+HMAC_SHA256 = HmacSha256Scheme()
+BLAKE2B = Blake2bScheme("blake2b", KEY_TYPE_BLAKE2B, 16)
+BLAKE2B_64 = Blake2bScheme("blake2b-64", KEY_TYPE_BLAKE2B_64, 8)
+""" Truncated MAC for the slowest boards. 64 bits are enough against forgeries of a short lived drop point state.
+"""
+
+_schemes_by_size: Dict[int, SignatureScheme] = {}
+_schemes_by_key_type: Dict[int, SignatureScheme] = {}
+
+
+def register_scheme(scheme: SignatureScheme):
+    """ Make a signature scheme available to servers, clients and keystores.
+
+    :param scheme: The scheme. Its signature size and key type must not be used by another scheme.
+    :return: None
+    """
+    for registry, identifier in ((_schemes_by_size, scheme.sig_size), (_schemes_by_key_type, scheme.key_type)):
+        registered = registry.get(identifier)
+        if registered is not None and registered is not scheme:
+            raise ValueError(f"Scheme {scheme.name} conflicts with scheme {registered.name}.")
+    _schemes_by_size[scheme.sig_size] = scheme
+    _schemes_by_key_type[scheme.key_type] = scheme
+
+
+for _scheme in (ED25519, HMAC_SHA256, BLAKE2B, BLAKE2B_64):
+    register_scheme(_scheme)
+
+
+def registered_schemes() -> List[SignatureScheme]:
+    """ Every scheme available to servers, clients and keystores.
+
+    :return: The schemes, from the largest signature to the smallest.
+    """
+    return [_schemes_by_size[sig_size] for sig_size in sorted(_schemes_by_size, reverse=True)]
+
+
+def scheme_for_size(sig_size: int) -> SignatureScheme:
+    """ The scheme producing signatures of a given size.
+
+    :param sig_size: Size of the signature in bytes.
+    :return: The scheme.
+    """
+    scheme = _schemes_by_size.get(sig_size)
+    if scheme is None:
+        raise ValueError(f"No signature scheme uses {sig_size} bytes signatures.")
+    return scheme
+
+
+def scheme_for_key_type(key_type: int) -> SignatureScheme:
+    """ The scheme a keystore key type is used with.
+
+    :param key_type: The key type.
+    :return: The scheme.
+    """
+    scheme = _schemes_by_key_type.get(key_type)
+    if scheme is None:
+        raise ValueError(f"Unsupported key type {key_type}.")
+    return scheme
+
+
+def scheme_for_key(key: Union[SignKey, CheckKey]) -> SignatureScheme:
+    """ The scheme a key is used with.
+
+    The scheme of a team is set by its key, never by the signature size of a received message, so that a message
+    cannot downgrade its team to a weaker scheme.
+
+    :param key: An Ed25519 signing or verify key, or a MacKey.
+    :return: The scheme.
+    """
+    if isinstance(key, MacKey):
+        return scheme_for_key_type(key.key_type)
+    return ED25519
@@ -0,0 +1,7 @@
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "AvailablePayloadMessage": ".message",
+    "DigestMessage": ".digest",
+    "MessageBatch": ".batch",
+})
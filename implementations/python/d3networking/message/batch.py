@@ -0,0 +1,238 @@
+from array import array
+from typing import Dict, Iterable, Iterator, Union
+
+from .message import AvailablePayloadMessage, HEADER_SIZE, MAX_SIGNATURE_SIZE, _HEADER
+from ..exceptions.exceptions import InvalidMessageException
+from ..processing.replay import SEQ_MODULUS
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+_U32 = 'I' if array('I').itemsize == 4 else 'L'
+_NUMPY_TYPES = {'B': 'u1', 'I': 'u4', 'L': 'u4', 'Q': 'u8'}
+_HALF_SEQ_SPACE = SEQ_MODULUS // 2
+
+
+class MessageBatch:
+    """ Columnar store of AvailablePayloadMessage fields.
+
+    Each field is kept in its own typed array and all signatures are stored back to back in a single blob. Decoding
+    datagrams into a batch does not create an AvailablePayloadMessage object per message, which keeps the memory
+    footprint of large message logs down to the size of the messages themselves.
+
+    Aggregations use numpy when it is installed (see the ``batch`` extra) and fall back to plain Python loops
+    otherwise.
+    """
+    __slots__ = ("team_id", "payload_size", "seq_num", "sig_size", "sig_offsets", "signatures")
+
+    def __init__(self):
+        self.team_id: array = array('B')
+        """ Team identifiers as 8 bit unsigned integers.
+        """
+        self.payload_size: array = array('B')
+        """ Payload sizes as 8 bit unsigned integers.
+        """
+        self.seq_num: array = array(_U32)
+        """ Sequence numbers as 32 bit unsigned integers.
+        """
+        self.sig_size: array = array(_U32)
+        """ Signature sizes as 32 bit unsigned integers.
+        """
+        self.sig_offsets: array = array('Q', [0])
+        """ Offset of each signature in the signatures blob. Signature i spans sig_offsets[i] to sig_offsets[i + 1].
+        """
+        self.signatures: bytearray = bytearray()
+        """ Every signature of the batch, stored back to back.
+        """
+
+    @staticmethod
+    def from_datagrams(datagrams: Iterable[Union[bytes, bytearray, memoryview]], strict: bool = False):
+        """ Decode a group of datagrams into a new batch.
+
+        :param datagrams: Bytes representations of messages.
+        :param strict: Whether to raise an InvalidMessageException on a malformed datagram instead of skipping it.
+        :return: A MessageBatch holding every well formed datagram.
+        """
+        batch = MessageBatch()
+        for datagram in datagrams:
+            if not batch.append_datagram(datagram) and strict:
+                raise InvalidMessageException("Malformed datagram in batch.")
+
+        return batch
+
+    def append_datagram(self, datagram: Union[bytes, bytearray, memoryview]) -> bool:
+        """ Decode a datagram at the end of the batch.
+
+        :param datagram: Bytes representation of a message.
+        :return: Whether the datagram was well formed and added to the batch.
+        """
+        view = memoryview(datagram)
+        if len(view) < HEADER_SIZE:
+            return False
+
+        team_id, payload_size, seq_num, sig_size = _HEADER.unpack_from(view)
+        if sig_size > MAX_SIGNATURE_SIZE or len(view) < HEADER_SIZE + sig_size:
+            return False
+
+        self.team_id.append(team_id)
+        self.payload_size.append(payload_size)
+        self.seq_num.append(seq_num)
+        self.sig_size.append(sig_size)
+        self.signatures += view[HEADER_SIZE: HEADER_SIZE + sig_size]
+        self.sig_offsets.append(len(self.signatures))
+
+        return True
+
+    def append(self, msg: AvailablePayloadMessage):
+        """ Add a message at the end of the batch.
+
+        :param msg: The message to add.
+        :return: None
+        """
+        self.team_id.append(msg.team_id)
+        self.payload_size.append(msg.payload_size)
+        self.seq_num.append(msg.seq_num)
+        self.sig_size.append(msg.sig_size)
+        if msg.is_signed():
+            self.signatures += msg.signature
+        self.sig_offsets.append(len(self.signatures))
+
+    def __len__(self) -> int:
+        return len(self.team_id)
+
+    def signature(self, idx: int) -> memoryview:
+        """ Signature of a message of the batch.
+
+        :param idx: Index of the message in the batch.
+        :return: A view on the signature in the signatures blob.
+        """
+        return memoryview(self.signatures)[self.sig_offsets[idx]: self.sig_offsets[idx + 1]]
+
+    def message(self, idx: int) -> AvailablePayloadMessage:
+        """ Build an AvailablePayloadMessage from a message of the batch.
+
+        :param idx: Index of the message in the batch.
+        :return: A new message object holding a copy of the signature.
+        """
+        return AvailablePayloadMessage(
+            team_id=self.team_id[idx],
+            payload_size=self.payload_size[idx],
+            seq_num=self.seq_num[idx],
+            sig_size=self.sig_size[idx],
+            signature=bytearray(self.signature(idx))
+        )
+
+    def messages(self) -> Iterator[AvailablePayloadMessage]:
+        """ Iterate over the batch as AvailablePayloadMessage objects.
+        """
+        for idx in range(len(self)):
+            yield self.message(idx)
+
+    def as_numpy(self) -> Dict[str, "numpy.ndarray"]:
+        """ Zero-copy numpy views of the batch columns.
+
+        The views are invalidated as soon as the batch is appended to.
+
+        :return: A mapping between each column name and its numpy view.
+        """
+        if numpy is None:
+            raise ImportError("numpy is required. Install the d3networking[batch] extra.")
+
+        return {
+            name: numpy.frombuffer(getattr(self, name), dtype=_NUMPY_TYPES[getattr(self, name).typecode])
+            for name in ("team_id", "payload_size", "seq_num", "sig_size", "sig_offsets")
+        }
+
+    def filter_teams(self, team_ids: Iterable[int]):
+        """ Select the messages sent by a group of teams.
+
+        :param team_ids: Identifiers of the teams to keep.
+        :return: A new MessageBatch holding only the messages of the provided teams.
+        """
+        wanted = set(team_ids)
+        batch = MessageBatch()
+        if numpy is not None:
+            columns = self.as_numpy()
+            keep = numpy.isin(columns["team_id"], list(wanted))
+            for name in ("team_id", "payload_size", "seq_num", "sig_size"):
+                getattr(batch, name).frombytes(columns[name][keep].tobytes())
+
+            # Each signature byte is kept along with its message.
+            sig_sizes = numpy.diff(columns["sig_offsets"].astype('i8'))
+            blob = numpy.frombuffer(self.signatures, dtype='u1')
+            batch.signatures = bytearray(blob[numpy.repeat(keep, sig_sizes)].tobytes())
+            batch.sig_offsets.frombytes(numpy.cumsum(sig_sizes[keep], dtype='u8').tobytes())
+            return batch
+
+        for idx, team_id in enumerate(self.team_id):
+            if team_id in wanted:
+                batch.team_id.append(team_id)
+                batch.payload_size.append(self.payload_size[idx])
+                batch.seq_num.append(self.seq_num[idx])
+                batch.sig_size.append(self.sig_size[idx])
+                batch.signatures += self.signature(idx)
+                batch.sig_offsets.append(len(batch.signatures))
+
+        return batch
+
+    def _max_by_team(self, column: array) -> Dict[int, int]:
+        if numpy is not None:
+            teams = numpy.frombuffer(self.team_id, dtype='u1')
+            values = numpy.frombuffer(column, dtype=_NUMPY_TYPES[column.typecode]).astype('i8')
+            result = numpy.full(256, -1, dtype='i8')
+            numpy.maximum.at(result, teams, values)
+            present = numpy.flatnonzero(result >= 0)
+            return dict(zip(present.tolist(), result[present].tolist()))
+
+        result: Dict[int, int] = {}
+        for team_id, value in zip(self.team_id, column):
+            if value > result.get(team_id, -1):
+                result[team_id] = value
+        return result
+
+    def max_payload_by_team(self) -> Dict[int, int]:
+        """ Largest payload size reported by each team in the batch.
+
+        :return: A mapping between each team identifier and its largest payload size.
+        """
+        return self._max_by_team(self.payload_size)
+
+    def latest_seq_by_team(self) -> Dict[int, int]:
+        """ Latest sequence number sent by each team in the batch.
+
+        Sequence numbers are compared as the replay windows do, modulo SEQ_MODULUS: a number is newer than another if
+        it is less than half the sequence space ahead of it. A team that wrapped around from INT_MAX_VAL to 0 within
+        the batch reports a number after the wrap. Each number is measured from the first number of its team in the
+        batch, so when a team's numbers span half the sequence space or more, the latest one is the number furthest
+        ahead of that first number. Both the numpy and the pure Python paths follow these rules.
+
+        :return: A mapping between each team identifier and its latest sequence number.
+        """
+        if numpy is not None:
+            teams = numpy.frombuffer(self.team_id, dtype='u1')
+            seq_nums = numpy.frombuffer(self.seq_num, dtype=_NUMPY_TYPES[self.seq_num.typecode]).astype('i8')
+            seq_nums %= SEQ_MODULUS
+            present, first = numpy.unique(teams, return_index=True)
+            # Each number is measured from the team's first number of the batch, from -half to +half the space.
+            reference = numpy.zeros(256, dtype='i8')
+            reference[present] = seq_nums[first]
+            ahead = (seq_nums - reference[teams]) % SEQ_MODULUS
+            ahead[ahead >= _HALF_SEQ_SPACE] -= SEQ_MODULUS
+            furthest = numpy.full(256, -SEQ_MODULUS, dtype='i8')
+            numpy.maximum.at(furthest, teams, ahead)
+            latest = (reference[present] + furthest[present]) % SEQ_MODULUS
+            return dict(zip(present.tolist(), latest.tolist()))
+
+        references: Dict[int, int] = {}
+        furthest_ahead: Dict[int, int] = {}
+        for team_id, seq_num in zip(self.team_id, self.seq_num):
+            seq_num %= SEQ_MODULUS
+            reference = references.setdefault(team_id, seq_num)
+            ahead = (seq_num - reference) % SEQ_MODULUS
+            if ahead >= _HALF_SEQ_SPACE:
+                ahead -= SEQ_MODULUS
+            if ahead > furthest_ahead.get(team_id, -SEQ_MODULUS):
+                furthest_ahead[team_id] = ahead
+        return {team_id: (references[team_id] + ahead) % SEQ_MODULUS for team_id, ahead in furthest_ahead.items()}
@@ -0,0 +1,130 @@
+import struct
+from dataclasses import dataclass, field
+from typing import List, NamedTuple, Union
+
+from .message import AvailablePayloadMessage, MAX_MESSAGE_SIZE
+from ..exceptions.exceptions import InvalidMessageException
+
+DIGEST_MARKER = 0xFF
+""" First byte of a digest. Team identifier 255 is reserved so that a digest is never mistaken for a message.
+"""
+DIGEST_VERSION = 1
+MAX_DIGEST_RECORDS = 40
+DIGEST_HEADER_SIZE = 12
+RECORD_SIZE = 6
+
+_DIGEST_HEADER = struct.Struct('<BBBBII')
+_RECORD = struct.Struct('<BBI')
+
+
+class DigestHeader(NamedTuple):
+    """ Header of an encoded digest.
+    """
+    gateway_id: int
+    count: int
+    """ Amount of records.
+    """
+    seq_num: int
+    sig_size: int
+
+    @property
+    def signed_size(self) -> int:
+        """ Amount of bytes covered by the signature: the header and the records.
+        """
+        return DIGEST_HEADER_SIZE + RECORD_SIZE * self.count
+
+
+def unpack_digest_header(data: Union[bytes, bytearray, memoryview]) -> DigestHeader:
+    """ Read and check the header of an encoded digest, without decoding its records.
+
+    :param data: Bytes representation of a digest.
+    :return: The digest's header.
+    """
+    if len(data) < DIGEST_HEADER_SIZE:
+        raise InvalidMessageException("Digest is shorter than its header.")
+
+    marker, version, gateway_id, count, seq_num, sig_size = _DIGEST_HEADER.unpack_from(data)
+    if marker != DIGEST_MARKER:
+        raise InvalidMessageException("Message is not a digest.")
+    if version != DIGEST_VERSION:
+        raise InvalidMessageException(f"Unsupported digest version {version}.")
+    if count > MAX_DIGEST_RECORDS:
+        raise InvalidMessageException("Digest holds too many records.")
+    header = DigestHeader(gateway_id, count, seq_num, sig_size)
+    if len(data) != header.signed_size + sig_size:
+        raise InvalidMessageException("Digest size does not match its header.")
+    return header
+
+
+def is_digest(data: Union[bytes, bytearray, memoryview]) -> bool:
+    """ Check whether a datagram holds a digest rather than a single message.
+
+    :param data: A received datagram.
+    :return: Whether the datagram starts with the digest marker.
+    """
+    return len(data) > 0 and data[0] == DIGEST_MARKER
+
+
+@dataclass(slots=True)
+class DigestMessage:
+    """ Latest state of several teams relayed by a gateway under a single signature.
+
+    A digest holds a 12 bytes header (marker, version, gateway identifier, amount of records, sequence number and
+    signature size), up to 40 records of 6 bytes (team identifier, payload size and the team's own sequence number)
+    and the gateway's signature over everything before it.
+    """
+    gateway_id: int
+    """ Identifier of the gateway. The gateway signs with the key registered under this identifier.
+    """
+    records: List[AvailablePayloadMessage] = field(default_factory=list)
+    """ Relayed state of each team, as unsigned messages.
+    """
+    seq_num: int = 0
+    """ Sequence number of the gateway.
+    """
+    sig_size: int = 0
+    signature: Union[bytearray, memoryview] = field(default_factory=bytearray)
+
+    def as_unsigned_bytes(self) -> bytes:
+        """ Bytes covered by the signature: the header, including the signature size, and the records.
+
+        :return: A bytes representation of the digest without its signature.
+        """
+        if len(self.records) > MAX_DIGEST_RECORDS:
+            raise ValueError(f"A digest holds at most {MAX_DIGEST_RECORDS} records.")
+
+        buffer = bytearray(DIGEST_HEADER_SIZE + RECORD_SIZE * len(self.records))
+        _DIGEST_HEADER.pack_into(buffer, 0, DIGEST_MARKER, DIGEST_VERSION, self.gateway_id, len(self.records),
+                                 self.seq_num, self.sig_size)
+        for idx, record in enumerate(self.records):
+            _RECORD.pack_into(buffer, DIGEST_HEADER_SIZE + idx * RECORD_SIZE, record.team_id, record.payload_size,
+                              record.seq_num)
+        return bytes(buffer)
+
+    def as_bytes(self) -> bytes:
+        """ Bytes representation of the digest, signature included.
+
+        :return: The digest represented by at most 508 bytes.
+        """
+        datagram = self.as_unsigned_bytes() + self.signature[:self.sig_size]
+        if len(datagram) > MAX_MESSAGE_SIZE:
+            raise ValueError("Digest does not fit in a 508 bytes UDP payload.")
+        return datagram
+
+    def is_signed(self) -> bool:
+        return self.sig_size > 0
+
+    @staticmethod
+    def from_bytes(data: Union[bytes, bytearray, memoryview]):
+        """ Creates a DigestMessage object from a group of bytes.
+
+        :param data: Bytes representation of a digest.
+        :return: The group of bytes interpreted as a DigestMessage object.
+        """
+        header = unpack_digest_header(data)
+        records = [
+            AvailablePayloadMessage(*_RECORD.unpack_from(data, DIGEST_HEADER_SIZE + idx * RECORD_SIZE))
+            for idx in range(header.count)
+        ]
+        return DigestMessage(header.gateway_id, records, header.seq_num, header.sig_size,
+                             bytearray(data[header.signed_size:]))
@@ -1,6 +1,30 @@
+import struct
 from dataclasses import dataclass, field
+from typing import Union
+
 from ..exceptions.exceptions import InvalidMessageException
 
+HEADER_SIZE = 10
+""" Size of the fixed part of a message (team id, payload size, sequence number and signature length).
+"""
+UNSIGNED_HEADER_SIZE = 6
+""" Size of the part of a message covered by the signature.
+"""
+MAX_MESSAGE_SIZE = 508
+""" Largest UDP payload guaranteed to be delivered without fragmentation.
+"""
+MAX_SIGNATURE_SIZE = MAX_MESSAGE_SIZE - HEADER_SIZE
+""" Largest signature that fits in a message.
+"""
+
+SEQ_NUM_OFFSET = 2
+""" Position of the sequence number in the bytes representation of a message.
+"""
+
+_HEADER = struct.Struct('<BBII')
+_UNSIGNED_HEADER = struct.Struct('<BBI')
+_SEQ_NUM = struct.Struct('<I')
+
 
 def _append_bytes(msg_as_bytes: bytearray, data: int, size: int = 4):
     """
@@ -40,7 +64,7 @@ def _read_bytes(msg_as_bytes: bytearray, start_idx: int, size: int = 4) -> int:
     return value
 
 
-@dataclass
+@dataclass(slots=True)
 class AvailablePayloadMessage:
     """ Messages that are send by the server to communicate the size of the available payload.
     """
@@ -56,8 +80,8 @@ class AvailablePayloadMessage:
     sig_size: int = 0
     """ Size of the signature. There is no signature if the size is 0.
     """
-    signature: bytearray = field(default_factory=bytearray)
-    """ Bytearray representation of the signature.
+    signature: Union[bytearray, memoryview] = field(default_factory=bytearray)
+    """ Bytearray representation of the signature. Messages decoded with from_buffer hold a memoryview instead.
     """
 
     def as_bytes(self) -> bytes:
@@ -68,16 +92,42 @@ class AvailablePayloadMessage:
 
         :return: The current object represented by a group of 10 to 508 bytes.
         """
+        if self.encoded_size() > MAX_MESSAGE_SIZE:
+            raise ValueError("Message does not fit in a 508 bytes UDP payload.")
+
+        header = _HEADER.pack(self.team_id, self.payload_size, self.seq_num, self.sig_size)
+        if self.is_signed():
+            return header + self.signature
+
+        return header
+
+    def encoded_size(self) -> int:
+        """ Size of the bytes representation of the message.
 
-        unsigned_msg = bytearray(self.as_unsigned_bytes())
-        _append_bytes(unsigned_msg, self.sig_size)  # 4 bytes signature length
+        :return: The amount of bytes written by as_bytes or pack_into.
+        """
         if self.is_signed():
-            unsigned_msg += self.signature
+            return HEADER_SIZE + len(self.signature)
+        return HEADER_SIZE
+
+    def pack_into(self, buffer: Union[bytearray, memoryview], offset: int = 0) -> int:
+        """ Write the bytes representation of the message into a caller supplied buffer.
+
+        Avoids allocating a new bytes object for each message sent.
 
-        if len(unsigned_msg) > 508:
+        :param buffer: A writable buffer large enough to hold the message.
+        :param offset: Where to start writing in the buffer.
+        :return: The amount of bytes written.
+        """
+        size = self.encoded_size()
+        if size > MAX_MESSAGE_SIZE:
             raise ValueError("Message does not fit in a 508 bytes UDP payload.")
 
-        return bytes(unsigned_msg)
+        _HEADER.pack_into(buffer, offset, self.team_id, self.payload_size, self.seq_num, self.sig_size)
+        if size > HEADER_SIZE:
+            buffer[offset + HEADER_SIZE: offset + size] = self.signature
+
+        return size
 
     def as_unsigned_bytes(self) -> bytes:
         """
@@ -91,12 +141,7 @@ class AvailablePayloadMessage:
 
         :return: A bytes representation of a part of the message.
         """
-        msg_as_bytes: bytearray = bytearray()
-        msg_as_bytes.append(self.team_id)
-        msg_as_bytes.append(self.payload_size)
-        _append_bytes(msg_as_bytes, self.seq_num)  # 4 bytes sequence number
-
-        return bytes(msg_as_bytes)
+        return _UNSIGNED_HEADER.pack(self.team_id, self.payload_size, self.seq_num)
 
     def is_signed(self) -> bool:
         """ Checks if the size of the signature is greater than 0.
@@ -107,30 +152,49 @@ class AvailablePayloadMessage:
         return False
 
     @staticmethod
-    def from_bytes(msg_as_bytes: bytes):
+    def from_bytes(msg_as_bytes: Union[bytes, bytearray, memoryview]):
         """
         Creates a Message object from a group of bytes.
 
         :param msg_as_bytes: Bytes representation of a message.
         :return: The group of bytes interpreted as an AvailablePayloadMessage object.
         """
-        msg_as_bytes = bytearray(msg_as_bytes)
-        team_id = msg_as_bytes[0]
-        payload_size = msg_as_bytes[1]
-        seq_num = _read_bytes(msg_as_bytes, 2)
-        sig_size = _read_bytes(msg_as_bytes, 6)
-        signature = bytearray()
+        size = len(msg_as_bytes)
+        if size < HEADER_SIZE:
+            raise InvalidMessageException("Message is shorter than its header.")
+
+        team_id, payload_size, seq_num, sig_size = _HEADER.unpack_from(msg_as_bytes)
+        if sig_size > MAX_SIGNATURE_SIZE:
+            raise InvalidMessageException("Signature does not fit in a 508 bytes message.")
+        if size < HEADER_SIZE + sig_size:
+            raise InvalidMessageException("Signature does not fit in message length.")
+
+        # Only the signature is copied, the message itself can be a view on a reused buffer.
+        return AvailablePayloadMessage(team_id, payload_size, seq_num, sig_size,
+                                       bytearray(msg_as_bytes[HEADER_SIZE: HEADER_SIZE + sig_size]))
+
+    @staticmethod
+    def from_buffer(buffer: Union[bytes, bytearray, memoryview]):
+        """
+        Creates a Message object from a buffer without copying it.
+
+        The signature of the returned message is a memoryview slice of the buffer. The buffer must therefore not be
+        modified while the message is in use. Use from_bytes when the message needs to outlive the buffer.
+
+        :param buffer: Bytes representation of a message.
+        :return: The buffer interpreted as an AvailablePayloadMessage object.
+        """
+        view = memoryview(buffer)
+        if len(view) < HEADER_SIZE:
+            raise InvalidMessageException("Message is shorter than its header.")
+
+        team_id, payload_size, seq_num, sig_size = _HEADER.unpack_from(view)
+        if sig_size > MAX_SIGNATURE_SIZE:
+            raise InvalidMessageException("Signature does not fit in a 508 bytes message.")
+        signature = view[HEADER_SIZE:HEADER_SIZE]
         if sig_size > 0:
-            if len(msg_as_bytes) < 10 + sig_size:
+            if len(view) < HEADER_SIZE + sig_size:
                 raise InvalidMessageException("Signature does not fit in message length.")
-            signature = msg_as_bytes[10: 10 + sig_size]
-
-        msg_from_bytes = AvailablePayloadMessage(
-            team_id=team_id,
-            payload_size=payload_size,
-            seq_num=seq_num,
-            sig_size=sig_size,
-            signature=signature
-        )
+            signature = view[HEADER_SIZE: HEADER_SIZE + sig_size]
 
-        return msg_from_bytes
+        return AvailablePayloadMessage(team_id, payload_size, seq_num, sig_size, signature)
@@ -0,0 +1,6 @@
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "Metrics": ".metrics",
+    "RateLimitedLogger": ".metrics",
+})
@@ -0,0 +1,208 @@
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+_BUCKETS = 64
+
+
+class Histogram:
+    """ Histogram of durations in nanoseconds with power of two buckets.
+
+    Bucket i counts the values whose bit length is i, so recording a value is a constant time operation with no
+    allocation.
+    """
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self):
+        self.counts: List[int] = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+
+    def record(self, value_ns: int):
+        """ Record a duration.
+
+        :param value_ns: The duration in nanoseconds.
+        :return: None
+        """
+        self.counts[min(value_ns.bit_length(), _BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += value_ns
+
+    def percentile(self, percentile: float) -> int:
+        """ Upper bound of the bucket holding a percentile.
+
+        :param percentile: A percentile from 0 to 100.
+        :return: The percentile in nanoseconds, rounded up to a power of two. 0 if the histogram is empty.
+        """
+        if self.count == 0:
+            return 0
+        threshold = self.count * percentile / 100
+        seen = 0
+        for bucket, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= threshold and bucket_count:
+                return (1 << bucket) - 1
+        return (1 << (_BUCKETS - 1)) - 1
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ns": self.total / self.count if self.count else 0.0,
+            "p50_ns": self.percentile(50),
+            "p99_ns": self.percentile(99),
+        }
+
+
+class Metrics:
+    """ Counters and timing histograms for the hot paths of clients and servers.
+
+    Counters are plain dictionary increments, without locks. Each client or server is expected to be driven by a
+    single thread, which makes them exact; readers on other threads may see slightly stale values.
+
+    Timings use perf_counter_ns and are only taken for one message out of sample_every, so instrumentation can stay
+    enabled in production.
+    """
+    def __init__(self, sample_every: int = 16):
+        """ Instantiate a Metrics
+
+        :param sample_every: Time one message out of this amount. Set to 1 to time every message and 0 to never time.
+        """
+        self.sample_every = sample_every
+        self.counters: Dict[Tuple[str, int], int] = defaultdict(int)
+        """ Counters keyed on (name, team id). The team id is -1 when unknown.
+        """
+        self.histograms: Dict[str, Histogram] = defaultdict(Histogram)
+        """ Timing histograms keyed on the name of the timed stage.
+        """
+        self._until_sample = 0
+
+    def count(self, name: str, team_id: int = -1):
+        """ Increment a counter.
+
+        :param name: Name of the counter, e.g. a drop reason.
+        :param team_id: Team the counter applies to. -1 when unknown.
+        :return: None
+        """
+        self.counters[(name, team_id)] += 1
+
+    def timestamp(self) -> int:
+        """ Start timing a message if it is sampled.
+
+        :return: The current perf_counter_ns if the message is sampled, 0 otherwise.
+        """
+        if self.sample_every <= 0:
+            return 0
+        if self._until_sample > 0:
+            self._until_sample -= 1
+            return 0
+        self._until_sample = self.sample_every - 1
+        return time.perf_counter_ns()
+
+    def elapsed(self, name: str, start: int) -> int:
+        """ Record the time elapsed since a timestamp, if the timestamp was sampled.
+
+        :param name: Name of the timed stage.
+        :param start: A value returned by timestamp or elapsed.
+        :return: The current perf_counter_ns if the start was sampled, 0 otherwise. Use it to time the next stage.
+        """
+        if not start:
+            return 0
+        now = time.perf_counter_ns()
+        self.histograms[name].record(now - start)
+        return now
+
+    def total(self, name: str) -> int:
+        """ Sum of a counter across every team.
+
+        :param name: Name of the counter.
+        :return: The counter's total.
+        """
+        return sum(value for (counter_name, _), value in list(self.counters.items()) if counter_name == name)
+
+    def as_dict(self) -> Dict[str, object]:
+        """ Snapshot of every metric.
+
+        :return: The counters, grouped by name then by team, and the histograms' summaries.
+        """
+        counters: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for (name, team_id), value in list(self.counters.items()):
+            counters[name][str(team_id)] = value
+        return {
+            "counters": dict(counters),
+            "histograms": {name: histogram.as_dict() for name, histogram in list(self.histograms.items())},
+        }
+
+    def to_json(self) -> str:
+        """ Export every metric as a JSON document.
+        """
+        return json.dumps(self.as_dict())
+
+    def to_prometheus(self, prefix: str = "d3networking") -> str:
+        """ Export every metric in the Prometheus text exposition format.
+
+        :param prefix: Prefix of every metric name.
+        :return: The metrics as text.
+        """
+        lines: List[str] = []
+        typed = set()
+        for (name, team_id), value in sorted(self.counters.items()):
+            if name not in typed:
+                typed.add(name)
+                lines.append(f'# TYPE {prefix}_{name}_total counter')
+            lines.append(f'{prefix}_{name}_total{{team="{team_id}"}} {value}')
+        for name, histogram in sorted(self.histograms.items()):
+            lines.append(f'# TYPE {prefix}_{name}_ns histogram')
+            # Every bucket is exported, empty or not, so each scrape has the same series. The last bucket also
+            # counts larger values, it is only exported as +Inf.
+            cumulative = 0
+            for bucket, bucket_count in enumerate(histogram.counts[:-1]):
+                cumulative += bucket_count
+                lines.append(f'{prefix}_{name}_ns_bucket{{le="{(1 << bucket) - 1}"}} {cumulative}')
+            lines.append(f'{prefix}_{name}_ns_bucket{{le="+Inf"}} {histogram.count}')
+            lines.append(f'{prefix}_{name}_ns_sum {histogram.total}')
+            lines.append(f'{prefix}_{name}_ns_count {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+class RateLimitedLogger:
+    """ Logs each kind of event at most once per interval.
+
+    Replaces printing every dropped packet, which turns a flood of junk traffic into a flood of writes. The amount
+    of suppressed events is reported with the next logged event of the same kind.
+    """
+    def __init__(self, logger: logging.Logger, interval: float = 10.0, level: int = logging.WARNING):
+        """ Instantiate a RateLimitedLogger
+
+        :param logger: Where to log.
+        :param interval: Minimum amount of seconds between two logs of the same kind.
+        :param level: Logging level of the events.
+        """
+        self.logger = logger
+        self.interval = interval
+        self.level = level
+        self._next_log: Dict[str, float] = {}
+        self._suppressed: Dict[str, int] = defaultdict(int)
+
+    def log(self, kind: str, message: str, now: Optional[float] = None):
+        """ Log an event unless an event of the same kind was logged recently.
+
+        :param kind: Kind of the event, e.g. a drop reason.
+        :param message: The message to log.
+        :param now: Current time on the monotonic clock. Defaults to now.
+        :return: None
+        """
+        if now is None:
+            now = time.monotonic()
+        if now < self._next_log.get(kind, 0.0):
+            self._suppressed[kind] += 1
+            return
+        if not self.logger.isEnabledFor(self.level):
+            return
+
+        self._next_log[kind] = now + self.interval
+        suppressed = self._suppressed.pop(kind, 0)
+        if suppressed:
+            message = f"{message} ({suppressed} similar events suppressed)"
+        self.logger.log(self.level, message)
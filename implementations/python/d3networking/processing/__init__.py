@@ -0,0 +1,10 @@
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "ProtocolEngine": ".engine",
+    "ProtocolEvent": ".engine",
+    "validate_msg": ".processing",
+    "validate_seq_num": ".processing",
+    "ReplayProtectionTable": ".replay",
+    "VerificationEngine": ".verification",
+})
@@ -0,0 +1,337 @@
+import logging
+import struct
+from collections import deque
+from typing import TYPE_CHECKING, Callable, Deque, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from ..crypto.signature.schemes import CheckKey, SignKey, scheme_for_key
+from ..exceptions.exceptions import InvalidMessageException
+from ..message.digest import DigestMessage, DIGEST_HEADER_SIZE, DIGEST_MARKER, MAX_DIGEST_RECORDS, _RECORD, \
+    RECORD_SIZE, unpack_digest_header
+from ..message.message import AvailablePayloadMessage, _HEADER, _SEQ_NUM, HEADER_SIZE, MAX_SIGNATURE_SIZE, \
+    SEQ_NUM_OFFSET, UNSIGNED_HEADER_SIZE
+from ..metrics.metrics import Metrics, RateLimitedLogger
+from .processing import INT_MAX_VAL
+from .replay import ReplayProtectionTable
+from .verification import VerificationEngine
+
+if TYPE_CHECKING:
+    from ..transport.presign import Presigner
+
+_logger = logging.getLogger(__name__)
+
+_SEQ_AND_SIG_SIZE = struct.Struct('<II')
+_DIGEST_REPLAY_OFFSET = 256  # Gateways' digests are tracked apart from the teams' own messages.
+
+Datagram = Union[bytes, bytearray, memoryview]
+
+
+class ProtocolEvent(NamedTuple):
+    """ Something that happened to a received datagram, other than a message being accepted.
+    """
+    timestamp: Optional[int]
+    """ Timestamp the datagram was given with, None if it was given without one.
+    """
+    kind: str
+    """ What happened, e.g. the reason the datagram was dropped. Same name as the metrics counter.
+    """
+    team_id: int
+    """ Team, or gateway, that sent the datagram. -1 if unknown.
+    """
+
+
+class ProtocolEngine:
+    """ Protocol logic of D3 networking, without any I/O.
+
+    The engine is given received datagrams as bytes and returns the messages they hold once parsed, verified and
+    checked against replays. It also turns messages to send into signed datagrams. It never touches a socket or a
+    clock: timestamps are given by the caller, so the same engine serves the socket clients and servers, captures
+    replayed offline and simulated networks driven in tight loops.
+    """
+    def __init__(self, validate_keys: Optional[Dict[int, CheckKey]] = None, signing_key: Optional[SignKey] = None,
+                 gateway_id: Optional[int] = None, verification_engine: Optional[VerificationEngine] = None,
+                 replay_window: int = 64, metrics: Optional[Metrics] = None, presigner: Optional["Presigner"] = None,
+                 event_log_size: int = 0):
+        """ Instantiate a ProtocolEngine
+
+        :param validate_keys: Mapping between team identifiers and their public keys, or their shared secrets for
+        teams using a MAC scheme. Used to verify received messages. Nothing can be verified if this is None.
+        :param signing_key: The key used to sign sent messages: an Ed25519 SigningKey or a MacKey. Messages won't be
+        signed if this is None.
+        :param gateway_id: Identifier to sign digests under. Digests cannot be encoded if this is None.
+        :param verification_engine: Engine used to verify signatures. A default engine with a cache of verified
+        messages is created if this is None.
+        :param replay_window: Amount of sequence numbers remembered for each team to detect replayed messages.
+        :param metrics: Where to count messages and time the receive path. A new Metrics is created if this is None.
+        :param presigner: Signs upcoming sequence numbers in advance with the signing key. Messages are signed when
+        they are encoded if this is None.
+        :param event_log_size: Amount of latest events kept until they are read with events. Events are only
+        counted in the metrics if this is 0.
+        """
+        self.validate_keys: Dict[int, CheckKey] = validate_keys if validate_keys is not None else {}
+        self.verification_engine = verification_engine or VerificationEngine()
+        self.replay_protection = ReplayProtectionTable(window_size=replay_window)
+        self.metrics = metrics or Metrics()
+        self.drop_logger = RateLimitedLogger(_logger)
+        """ Logs dropped messages. Each drop reason is logged at most once per interval.
+        """
+        self.last_accepted: Dict[int, int] = {}
+        """ Timestamp of the latest message accepted for each team, among the datagrams given with a timestamp.
+        """
+        self._events: Optional[Deque[ProtocolEvent]] = deque(maxlen=event_log_size) if event_log_size > 0 else None
+
+        self.signing_key = signing_key
+        self.gateway_id = gateway_id
+        self.seq_num = 0
+        """ Sequence number of the next encoded message or digest.
+        """
+        self._scheme = scheme_for_key(signing_key) if signing_key is not None else None
+        self._presigner = presigner
+        self._template = bytearray(HEADER_SIZE + (self._scheme.sig_size if self._scheme is not None else 0))
+        self._template_key: Optional[Tuple[int, int]] = None
+
+    def events(self) -> List[ProtocolEvent]:
+        """ Take the events that happened since the last call.
+
+        :return: The events, oldest first. Only the latest ones are kept, up to the event log size.
+        """
+        if self._events is None:
+            return []
+        events = list(self._events)
+        self._events.clear()
+        return events
+
+    def receive(self, data: Datagram, timestamp: Optional[int] = None,
+                validate: bool = True) -> List[AvailablePayloadMessage]:
+        """ Parse and validate a datagram holding either a single message or a gateway's digest.
+
+        :param data: The datagram's payload.
+        :param timestamp: When the datagram was received, in nanoseconds on any monotonic clock. Used for the events,
+        last_accepted and the rate limit of the drop logs.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :return: The valid messages held by the datagram.
+        """
+        if len(data) and data[0] == DIGEST_MARKER:
+            return self.receive_digest(data, timestamp, validate)
+
+        msg = self.receive_message(data, timestamp, validate)
+        return [msg] if msg is not None else []
+
+    def receive_digest(self, data: Datagram, timestamp: Optional[int] = None, validate: bool = True,
+                       record_filter: Optional[Callable[[int], bool]] = None) -> List[AvailablePayloadMessage]:
+        """ Parse and validate a gateway's digest, then unpack the records it holds.
+
+        The digest goes through the same stages as a single message, with the gateway's key and its own replay
+        window. Each record then goes through the replay window of its team, so a relayed state is only accepted if
+        the team's own messages did not already bring a newer one.
+
+        :param data: The datagram's payload.
+        :param timestamp: When the datagram was received, in nanoseconds.
+        :param validate: Whether to drop the digest if it has no valid signature or not.
+        :param record_filter: Called with the team of each record. Records it returns False for are skipped without
+        touching their team's replay window, e.g. the teams handled by another engine. Every record is kept if None.
+        :return: The messages of the records that are newer than every message already accepted for their team.
+        """
+        start = self.metrics.timestamp()
+        try:
+            gateway_id, _, seq_num, sig_size = header = unpack_digest_header(data)
+        except InvalidMessageException:
+            gateway_id = data[2] if len(data) >= DIGEST_HEADER_SIZE else -1
+            self._drop("invalid_format", gateway_id, "Digest dropped because of invalid message format.", timestamp)
+            return []
+        signed_size = header.signed_size
+
+        verify_key = self.validate_keys.get(gateway_id)
+        if validate:
+            if verify_key is None:
+                self._drop("unknown_team", gateway_id, "Digest dropped because its gateway is unknown.", timestamp)
+                return []
+            if sig_size == 0:
+                self._drop("unsigned", gateway_id, "Digest dropped because it was not signed.", timestamp)
+                return []
+            if sig_size != scheme_for_key(verify_key).sig_size:
+                self._drop("bad_signature", gateway_id, "Digest dropped because the signature was not valid.",
+                           timestamp)
+                return []
+
+        replay_id = _DIGEST_REPLAY_OFFSET + gateway_id
+        if not self.replay_protection.check(replay_id, seq_num):
+            self.replay_protection.accept(replay_id, seq_num)
+            self._drop("expired", gateway_id, "Digest dropped because it was expired.", timestamp)
+            return []
+
+        if validate:
+            view = memoryview(data)
+            if not self.verification_engine.verify(replay_id, view[:signed_size], view[signed_size:], verify_key):
+                self._drop("bad_signature", gateway_id, "Digest dropped because the signature was not valid.",
+                           timestamp)
+                return []
+        self.replay_protection.accept(replay_id, seq_num)
+
+        msgs: List[AvailablePayloadMessage] = []
+        for offset in range(DIGEST_HEADER_SIZE, signed_size, RECORD_SIZE):
+            team_id, payload_size, record_seq_num = _RECORD.unpack_from(data, offset)
+            if record_filter is not None and not record_filter(team_id):
+                continue
+            if not self.replay_protection.accept(team_id, record_seq_num):
+                # Relayed states are repeated until they change, stale records are expected.
+                self.metrics.count("stale_record", team_id)
+                if self._events is not None:
+                    self._events.append(ProtocolEvent(timestamp, "stale_record", team_id))
+                continue
+            self.metrics.count("accepted", team_id)
+            if timestamp is not None:
+                self.last_accepted[team_id] = timestamp
+            msgs.append(AvailablePayloadMessage(team_id, payload_size, record_seq_num))
+
+        self.metrics.elapsed("end_to_end", start)
+        return msgs
+
+    def receive_message(self, data: Datagram, timestamp: Optional[int] = None,
+                        validate: bool = True) -> Union[AvailablePayloadMessage, None]:
+        """ Parse and validate a datagram holding a single message.
+
+        The checks are ordered from the cheapest to the most expensive, and all but the last one read the raw
+        datagram: length, known team, signature size, then the team's replay window. Junk and replayed datagrams are
+        therefore dropped without decoding them or touching the cryptography. The signature is then verified over a
+        view of the signed header of the datagram, and the replay window is only updated for authentic messages.
+
+        :param data: The datagram's payload.
+        :param timestamp: When the datagram was received, in nanoseconds.
+        :param validate: Whether to drop the message if it has no valid signature or not.
+        :return: The message if it is valid, None otherwise.
+        """
+        start = self.metrics.timestamp()
+        size = len(data)
+        if size < HEADER_SIZE:
+            return self._drop("invalid_format", -1, "Message dropped because of invalid message format.", timestamp)
+
+        team_id = data[0]
+        verify_key = self.validate_keys.get(team_id)
+        if validate and verify_key is None:
+            return self._drop("unknown_team", team_id, "Message dropped because its team is unknown.", timestamp)
+
+        seq_num, sig_size = _SEQ_AND_SIG_SIZE.unpack_from(data, SEQ_NUM_OFFSET)
+        if sig_size > MAX_SIGNATURE_SIZE or size < HEADER_SIZE + sig_size:
+            return self._drop("invalid_format", team_id, "Message dropped because of invalid message format.",
+                              timestamp)
+
+        if validate:
+            if sig_size == 0:
+                return self._drop("unsigned", team_id, "Message dropped because it was not signed.", timestamp)
+            if sig_size != scheme_for_key(verify_key).sig_size:
+                # The team's key sets its scheme, a message cannot pick another one.
+                return self._drop("bad_signature", team_id, "Message dropped because the signature was not valid.",
+                                  timestamp)
+
+        if not self.replay_protection.check(team_id, seq_num):
+            # Expired or replayed message. Accepting it again only counts it, as it is rejected.
+            self.replay_protection.accept(team_id, seq_num)
+            return self._drop("expired", team_id, "Message dropped because it was expired.", timestamp)
+        checked = self.metrics.elapsed("prefilter", start)
+
+        if validate:
+            view = memoryview(data)
+            if not self.verification_engine.verify(team_id, view[:UNSIGNED_HEADER_SIZE],
+                                                   view[HEADER_SIZE: HEADER_SIZE + sig_size], verify_key):
+                return self._drop("bad_signature", team_id, "Message dropped because the signature was not valid.",
+                                  timestamp)
+        verified = self.metrics.elapsed("verify", checked)
+
+        parsed_message = AvailablePayloadMessage.from_bytes(data)
+        self.replay_protection.accept(team_id, seq_num)
+        self.metrics.elapsed("decode", verified)
+
+        self.metrics.count("accepted", team_id)
+        if timestamp is not None:
+            self.last_accepted[team_id] = timestamp
+        self.metrics.elapsed("end_to_end", start)
+        return parsed_message
+
+    def _drop(self, reason: str, team_id: int, message: str, timestamp: Optional[int]) -> None:
+        """ Count a dropped message and log it without flooding the logs.
+
+        :param reason: Why the message was dropped. Used as the counter name.
+        :param team_id: Team that sent the message, -1 if unknown.
+        :param message: Human readable description of the drop.
+        :param timestamp: When the datagram was received, in nanoseconds. The logger's clock is used if None.
+        :return: None, so it can be returned in place of the message.
+        """
+        self.metrics.count(reason, team_id)
+        self.drop_logger.log(reason, message, timestamp / 1e9 if timestamp is not None else None)
+        if self._events is not None:
+            self._events.append(ProtocolEvent(timestamp, reason, team_id))
+        return None
+
+    def _next_seq_num(self):
+        self.seq_num += 1
+        self.seq_num %= INT_MAX_VAL + 1
+
+    def _sign(self, template: bytearray) -> bytes:
+        if self._presigner is not None:
+            return self._presigner.signature(template[0], template[1], self.seq_num)
+        return self._scheme.sign(self.signing_key, template[:UNSIGNED_HEADER_SIZE])
+
+    def encode_message(self, msg: AvailablePayloadMessage) -> bytes:
+        """ Sign a message with the next sequence number and return its bytes representation.
+
+        Signed messages are written in a header template that is only rebuilt when the team or the payload size
+        changes. Otherwise, only the sequence number and the signature are patched in place.
+
+        :param msg: An unsigned message ready to be sent. Its sequence number and signature are set.
+        :return: The datagram to send.
+        """
+        msg.seq_num = self.seq_num
+        if self.signing_key is None:
+            datagram = msg.as_bytes()
+        else:
+            template = self._template
+            if self._template_key != (msg.team_id, msg.payload_size):
+                _HEADER.pack_into(template, 0, msg.team_id, msg.payload_size, self.seq_num, self._scheme.sig_size)
+                self._template_key = (msg.team_id, msg.payload_size)
+            else:
+                _SEQ_NUM.pack_into(template, SEQ_NUM_OFFSET, self.seq_num)
+
+            start = self.metrics.timestamp()
+            signature = self._sign(template)
+            self.metrics.elapsed("sign", start)
+            template[HEADER_SIZE:] = signature
+            msg.sig_size = len(signature)
+            msg.signature = bytearray(signature)
+            datagram = bytes(template)
+
+        self._next_seq_num()
+        self.metrics.count("sent", msg.team_id)
+
+        return datagram
+
+    def encode_digest(self, records: Sequence[AvailablePayloadMessage]) -> bytes:
+        """ Sign a digest of records with the next sequence number and return its bytes representation.
+
+        :param records: At most MAX_DIGEST_RECORDS messages, relayed with their own sequence numbers.
+        :return: The datagram to send.
+        """
+        if self.gateway_id is None:
+            raise RuntimeError("The engine is not a gateway.")
+
+        digest = DigestMessage(self.gateway_id, list(records), self.seq_num)
+        if self.signing_key is not None:
+            digest.sig_size = self._scheme.sig_size
+            start = self.metrics.timestamp()
+            digest.signature = self._scheme.sign(self.signing_key, digest.as_unsigned_bytes())
+            self.metrics.elapsed("sign", start)
+
+        self._next_seq_num()
+        self.metrics.count("sent_digest", self.gateway_id)
+
+        return digest.as_bytes()
+
+    def encode_digests(self, msgs: Sequence[AvailablePayloadMessage]) -> List[bytes]:
+        """ Pack messages by groups of up to MAX_DIGEST_RECORDS in signed digests.
+
+        :param msgs: Validated messages of other teams, relayed with their own sequence numbers.
+        :return: The datagrams to send, in order.
+        """
+        return [
+            self.encode_digest(msgs[start: start + MAX_DIGEST_RECORDS])
+            for start in range(0, len(msgs), MAX_DIGEST_RECORDS)
+        ]
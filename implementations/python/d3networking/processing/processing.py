@@ -1,22 +1,29 @@
+from typing import Union
+
 from nacl.signing import VerifyKey
-from nacl.exceptions import BadSignatureError
-from ..message.message import AvailablePayloadMessage
 
+from ..crypto.signature.schemes import MacKey, scheme_for_key
+
+INT_MAX_VAL = 2_147_483_647
+""" Largest sequence number. Sequence numbers wrap around to 0 after this value.
+"""
 
-def validate_msg(msg: bytes, signature: bytes, verify_key: VerifyKey) -> bool:
+
+def validate_msg(msg: bytes, signature: bytes, verify_key: Union[VerifyKey, MacKey]) -> bool:
     """ Validate that the message is properly signed.
 
+    The signature scheme is the one of the key: Ed25519 for a VerifyKey, the MacKey's scheme otherwise.
+
     :param msg: The message to validate. Use the unsigned bytes message representation.
     :param signature: The message's signature.
-    :param verify_key: The message's public key.
+    :param verify_key: The message's public key, or the team's shared secret.
     :return: Whether the message is properly signed or not.
     """
-    try:
-        verify_key.verify(msg, signature)
-    except BadSignatureError:
+    scheme = scheme_for_key(verify_key)
+    if len(signature) != scheme.sig_size:
         return False
 
-    return True
+    return scheme.verify(verify_key, msg, signature)
 
 
 def validate_seq_num(seq_num: int, old_seq_num: int) -> bool:
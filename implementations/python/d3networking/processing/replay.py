@@ -0,0 +1,193 @@
+from enum import Enum
+from typing import Dict, Optional
+
+from .processing import INT_MAX_VAL
+
+SEQ_MODULUS = INT_MAX_VAL + 1
+""" Sequence numbers wrap around to 0 after INT_MAX_VAL.
+"""
+_HALF_SEQ_SPACE = SEQ_MODULUS // 2
+
+
+class ReplayVerdict(Enum):
+    """ Outcome of a sequence number check.
+    """
+    ACCEPTED = "accepted"
+    """ The sequence number is newer than every sequence number seen so far.
+    """
+    REORDERED = "reordered"
+    """ The sequence number is older than the newest one, but inside the window and never seen.
+    """
+    DUPLICATE = "duplicate"
+    """ The sequence number was already seen.
+    """
+    TOO_OLD = "too_old"
+    """ The sequence number is older than the window.
+    """
+
+
+class ReplayWindow:
+    """ Sliding window of recently seen sequence numbers for a single sender.
+
+    Works like the IPsec and DTLS anti-replay windows: the newest sequence number is kept along with a bitmap of the
+    sequence numbers seen just before it. Bit i of the bitmap is set if newest - i was seen. Every operation is O(1).
+
+    Sequence numbers are compared using serial number arithmetic modulo 2^31, so the window keeps working when the
+    sender wraps around from INT_MAX_VAL to 0.
+    """
+    __slots__ = ("size", "newest", "bitmap", "_mask")
+
+    def __init__(self, size: int = 64):
+        """ Instantiate a ReplayWindow
+
+        :param size: Amount of sequence numbers remembered, including the newest one.
+        """
+        if size < 1:
+            raise ValueError("size must be at least 1")
+        self.size = size
+        self.newest: int = -1
+        """ Newest sequence number seen. -1 if nothing was seen yet.
+        """
+        self.bitmap: int = 0
+        self._mask = (1 << size) - 1
+
+    def check(self, seq_num: int) -> ReplayVerdict:
+        """ Check a sequence number against the window without updating it.
+
+        :param seq_num: The sequence number to check.
+        :return: Whether the sequence number is new, reordered, a duplicate or too old.
+        """
+        if self.newest < 0:
+            return ReplayVerdict.ACCEPTED
+
+        diff = (seq_num - self.newest) % SEQ_MODULUS
+        if diff == 0:
+            return ReplayVerdict.DUPLICATE
+        if diff < _HALF_SEQ_SPACE:
+            return ReplayVerdict.ACCEPTED
+
+        behind = SEQ_MODULUS - diff
+        if behind >= self.size:
+            return ReplayVerdict.TOO_OLD
+        if (self.bitmap >> behind) & 1:
+            return ReplayVerdict.DUPLICATE
+
+        return ReplayVerdict.REORDERED
+
+    def update(self, seq_num: int):
+        """ Mark a sequence number as seen. The sequence number should have been checked first.
+
+        :param seq_num: The sequence number to mark.
+        :return: None
+        """
+        seq_num %= SEQ_MODULUS
+        if self.newest < 0:
+            self.newest = seq_num
+            self.bitmap = 1
+            return
+
+        diff = (seq_num - self.newest) % SEQ_MODULUS
+        if diff < _HALF_SEQ_SPACE:
+            self.bitmap = ((self.bitmap << diff) | 1) & self._mask if diff < self.size else 1
+            self.newest = seq_num
+            return
+
+        behind = SEQ_MODULUS - diff
+        if behind < self.size:
+            self.bitmap |= 1 << behind
+
+
+class ReplayProtectionTable:
+    """ Per-team replay protection.
+
+    Each team gets its own ReplayWindow so that the counters of different teams never interfere with each other.
+    The counters are exclusive: every checked message increments exactly one of them.
+    """
+    def __init__(self, window_size: int = 64, accept_reordered: bool = False):
+        """ Instantiate a ReplayProtectionTable
+
+        :param window_size: Size of the window kept for each team.
+        :param accept_reordered: Whether to accept messages that arrive after a newer message of the same team.
+        When False, only the newest state of each team is ever accepted.
+        """
+        self.window_size = window_size
+        self.accept_reordered = accept_reordered
+        self._windows: Dict[int, ReplayWindow] = {}
+        self.accepted = 0
+        """ Amount of messages newer than every previous message of their team.
+        """
+        self.reordered = 0
+        """ Amount of messages received after a newer message of their team, but not seen before.
+        """
+        self.duplicate = 0
+        """ Amount of messages whose sequence number was already seen.
+        """
+        self.too_old = 0
+        """ Amount of messages older than the window of their team.
+        """
+        self.last_seq_num = -1
+        """ Sequence number of the latest message accepted, whatever its team. -1 if nothing was accepted yet.
+        """
+
+    def window(self, team_id: int) -> Optional[ReplayWindow]:
+        """ The window of a team.
+
+        :param team_id: A team identifier.
+        :return: The team's window, or None if nothing was received from the team yet.
+        """
+        return self._windows.get(team_id)
+
+    def check(self, team_id: int, seq_num: int) -> bool:
+        """ Check whether a message would be accepted, without updating the window or the counters.
+
+        :param team_id: Identifier of the team that sent the message.
+        :param seq_num: The message's sequence number.
+        :return: Whether the message would be accepted.
+        """
+        window = self._windows.get(team_id)
+        if window is None:
+            return True
+        return self._is_accepted(window.check(seq_num))
+
+    def _is_accepted(self, verdict: ReplayVerdict) -> bool:
+        return verdict is ReplayVerdict.ACCEPTED or (verdict is ReplayVerdict.REORDERED and self.accept_reordered)
+
+    def accept(self, team_id: int, seq_num: int) -> bool:
+        """ Check a message, count it and update the team's window if it is accepted.
+
+        :param team_id: Identifier of the team that sent the message.
+        :param seq_num: The message's sequence number.
+        :return: Whether the message is accepted.
+        """
+        window = self._windows.get(team_id)
+        if window is None:
+            window = self._windows[team_id] = ReplayWindow(self.window_size)
+
+        verdict = window.check(seq_num)
+        if verdict is ReplayVerdict.ACCEPTED:
+            self.accepted += 1
+        elif verdict is ReplayVerdict.REORDERED:
+            self.reordered += 1
+        elif verdict is ReplayVerdict.DUPLICATE:
+            self.duplicate += 1
+        else:
+            self.too_old += 1
+
+        if not self._is_accepted(verdict):
+            return False
+
+        window.update(seq_num)
+        self.last_seq_num = seq_num
+        return True
+
+    def reset(self, team_id: Optional[int] = None):
+        """ Forget the sequence numbers of a team, for instance after it restarted.
+
+        :param team_id: The team to forget. Every team is forgotten if None.
+        :return: None
+        """
+        if team_id is None:
+            self._windows.clear()
+            self.last_seq_num = -1
+        else:
+            self._windows.pop(team_id, None)
@@ -0,0 +1,127 @@
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List, Mapping, Optional, Sequence, Tuple, Union
+
+from .processing import validate_msg
+from ..crypto.signature.schemes import CheckKey
+from ..message.message import AvailablePayloadMessage
+
+VerificationRequest = Tuple[int, bytes, bytes, Optional[CheckKey]]
+""" A signature to verify as a (team id, unsigned message bytes, signature, verify key) tuple.
+"""
+
+
+class VerificationEngine:
+    """ Verifies message signatures with a cache of already verified messages.
+
+    Cranes re-broadcast the exact same signed bytes until their payload changes. Successful verifications are kept
+    in a bounded LRU cache keyed on (team id, unsigned bytes, signature) so that a repeated packet skips the
+    cryptography entirely. Failed verifications are never cached.
+
+    Batches of signatures can be verified across a thread pool since PyNaCl releases the GIL while verifying.
+    """
+    def __init__(self, cache_size: int = 1024, workers: int = 1):
+        """ Instantiate a VerificationEngine
+
+        :param cache_size: Maximum amount of verified messages to remember. Set to 0 to disable the cache.
+        :param workers: Amount of threads used by verify_many. Batches are verified on the calling thread if this is 1.
+        """
+        self.cache_size = cache_size
+        self.hits = 0
+        """ Amount of verifications answered from the cache.
+        """
+        self.misses = 0
+        """ Amount of verifications that required the cryptography.
+        """
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._workers = workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        if workers > 1:
+            self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="d3-verify")
+
+    def _lookup(self, cache_key: Tuple[int, bytes, bytes], verify_key: CheckKey) -> bool:
+        with self._lock:
+            cached_key = self._cache.get(cache_key)
+            if cached_key is not None and cached_key is verify_key:
+                self._cache.move_to_end(cache_key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def _store(self, cache_key: Tuple[int, bytes, bytes], verify_key: CheckKey):
+        if self.cache_size <= 0:
+            return
+        with self._lock:
+            self._cache[cache_key] = verify_key
+            self._cache.move_to_end(cache_key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def verify(self, team_id: int, msg: Union[bytes, memoryview], signature: Union[bytes, memoryview],
+               verify_key: Optional[CheckKey]) -> bool:
+        """ Validate that a message is properly signed, using the cache when possible.
+
+        :param team_id: Identifier of the team that sent the message.
+        :param msg: The unsigned bytes message representation.
+        :param signature: The message's signature.
+        :param verify_key: The team's public key or shared secret. The message is considered invalid if this is None.
+        :return: Whether the message is properly signed or not.
+        """
+        if verify_key is None:
+            return False
+
+        cache_key = (team_id, bytes(msg), bytes(signature))
+        if self._lookup(cache_key, verify_key):
+            return True
+
+        if not validate_msg(cache_key[1], cache_key[2], verify_key):
+            return False
+
+        self._store(cache_key, verify_key)
+        return True
+
+    def verify_many(self, requests: Sequence[VerificationRequest]) -> List[bool]:
+        """ Verify a batch of signatures in one call.
+
+        :param requests: The signatures to verify.
+        :return: Whether each signature is valid, in the same order as the requests.
+        """
+        if self._executor is None or len(requests) < 2:
+            return [self.verify(*request) for request in requests]
+
+        chunk_size = -(-len(requests) // self._workers)
+        chunks = [requests[start: start + chunk_size] for start in range(0, len(requests), chunk_size)]
+        results: List[bool] = []
+        for chunk_results in self._executor.map(lambda chunk: [self.verify(*request) for request in chunk], chunks):
+            results += chunk_results
+
+        return results
+
+    def verify_messages(self, msgs: Iterable[AvailablePayloadMessage],
+                        validate_keys: Mapping[int, CheckKey]) -> List[bool]:
+        """ Verify the signatures of a batch of messages.
+
+        :param msgs: The messages to verify.
+        :param validate_keys: Mapping between team identifiers and their public keys.
+        :return: Whether each message is properly signed, in the same order as the messages.
+        """
+        return self.verify_many([
+            (msg.team_id, msg.as_unsigned_bytes(), msg.signature, validate_keys.get(msg.team_id))
+            for msg in msgs
+        ])
+
+    def clear(self):
+        """ Forget every cached verification. Call this when the verify keys change.
+        """
+        with self._lock:
+            self._cache.clear()
+
+    def close(self):
+        """ Stop the worker threads.
+        """
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
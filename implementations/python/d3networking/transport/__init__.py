@@ -1 +1,9 @@
-from .transport import AvailablePayloadClient, AvailablePayloadServer, AvailablePayloadMessage
\ No newline at end of file
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "AvailablePayloadClient": ".transport",
+    "AvailablePayloadServer": ".transport",
+    "AvailablePayloadMessage": ".transport",
+    "AsyncAvailablePayloadClient": ".async_transport",
+    "AsyncAvailablePayloadServer": ".async_transport",
+})
@@ -0,0 +1,172 @@
+import asyncio
+from typing import Dict, Literal, Optional, Union
+
+from .transport import AvailablePayloadClient, AvailablePayloadServer
+from ..crypto.signature.schemes import CheckKey, SignKey
+from ..message.message import AvailablePayloadMessage
+from ..processing.verification import VerificationEngine
+
+
+class AsyncAvailablePayloadClient:
+    """ asyncio implementation of the D3 networking client.
+
+    Joins the multicast group like AvailablePayloadClient does and validates messages the same way, but never blocks
+    the event loop: the event loop watches the client's socket and drains it with recv_many once it is readable. Use
+    as an async context manager, then either iterate over the client with ``async for`` or call ``recv``.
+
+    The event loop must support add_reader, which every loop does on Unix.
+    """
+    def __init__(self, validate_keys: Dict[int, CheckKey], scope_id: int = 0, proto: Literal[4, 6] = 6,
+                 validate: bool = True, queue_size: int = 1024,
+                 verification_engine: Optional[VerificationEngine] = None):
+        """ Instantiate an AsyncAvailablePayloadClient
+
+        :param validate_keys: Mapping between team identifiers and their public keys, or their shared secrets for
+        teams using a MAC scheme. This is used to validate message signatures.
+        :param scope_id: Scope id of the network interface to use.
+        :param proto: The network protocol to use (IPv4 or IPv6).
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :param queue_size: Maximum amount of valid messages waiting to be read. Messages are dropped when full.
+        :param verification_engine: Engine used to verify signatures.
+        """
+        self._client = AvailablePayloadClient(validate_keys, scope_id=scope_id, proto=proto,
+                                              verification_engine=verification_engine)
+        self.validate = validate
+        self.dropped = 0
+        """ Amount of valid messages dropped because they were not read fast enough.
+        """
+        # Holds valid messages, then a None once the client is closed.
+        self._queue: "asyncio.Queue[Optional[AvailablePayloadMessage]]" = asyncio.Queue(maxsize=queue_size)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._closed = False
+
+    @property
+    def client(self) -> AvailablePayloadClient:
+        """ The underlying client, which holds the keys and the validation state.
+        """
+        return self._client
+
+    async def start(self):
+        """ Start receiving datagrams on the event loop.
+        """
+        if self._loop is None and not self._closed:
+            self._loop = asyncio.get_running_loop()
+            self._loop.add_reader(self._client.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        for msg in self._client.recv_many(timeout=0, validate=self.validate):
+            try:
+                self._queue.put_nowait(msg)
+            except asyncio.QueueFull:
+                self.dropped += 1
+
+    def close(self):
+        """ Close the connection to the multicast group.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._loop is not None:
+            self._loop.remove_reader(self._client.fileno())
+        self._client.close_connection()
+        # Make room for the end of stream marker so waiting consumers are always woken up.
+        while self._queue.full():
+            self._queue.get_nowait()
+        self._queue.put_nowait(None)
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    async def recv(self, timeout: Optional[float] = None) -> Union[AvailablePayloadMessage, None]:
+        """ Wait for the next valid message.
+
+        Invalid datagrams are dropped and do not count as a received message.
+
+        :param timeout: Maximum amount of seconds to wait. Waits forever if None, and only takes a waiting message if
+        0.
+        :return: The next valid message, or None if the timeout expired or the client was closed.
+        """
+        await self.start()
+        try:
+            if timeout is not None and timeout <= 0:
+                msg = self._queue.get_nowait()
+            else:
+                msg = await asyncio.wait_for(self._queue.get(), timeout)
+        except (asyncio.QueueEmpty, asyncio.TimeoutError):
+            return None
+
+        if msg is None:
+            # Leave the marker for the other consumers.
+            self._queue.put_nowait(None)
+        return msg
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> AvailablePayloadMessage:
+        msg = await self.recv()
+        if msg is None:
+            raise StopAsyncIteration
+        return msg
+
+
+class AsyncAvailablePayloadServer:
+    """ asyncio implementation of the D3 networking server.
+
+    Messages are signed like AvailablePayloadServer does and handed to the event loop without blocking.
+    """
+    def __init__(self, signing_key: Union[SignKey, None], proto: Literal[4, 6] = 6):
+        """ Instantiate an AsyncAvailablePayloadServer
+
+        :param signing_key: The key used to sign messages: an Ed25519 SigningKey or a MacKey. Messages won't be signed
+        if this is set to None.
+        :param proto: The network protocol to use (IPv4 or IPv6).
+        """
+        self._server = AvailablePayloadServer(signing_key, proto=proto)
+        self._server._socket.setblocking(False)
+        self._transport: Optional[asyncio.DatagramTransport] = None
+
+    @property
+    def server(self) -> AvailablePayloadServer:
+        """ The underlying server, which holds the signing key and the sequence number.
+        """
+        return self._server
+
+    async def start(self):
+        """ Attach the socket to the event loop.
+        """
+        if self._transport is None:
+            loop = asyncio.get_running_loop()
+            self._transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol,
+                                                                     sock=self._server._socket)
+
+    def close(self):
+        """ Close the socket.
+        """
+        if self._transport is not None:
+            self._transport.close()
+        else:
+            self._server._socket.close()
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def send(self, msg: AvailablePayloadMessage):
+        """ Queue a message to be sent on the multicast group.
+
+        The server must be started first.
+
+        :param msg: An unsigned message ready to be sent. This method takes care of signing the message.
+        :return: None
+        """
+        if self._transport is None:
+            raise RuntimeError("Server must be started before sending.")
+        self._transport.sendto(self._server.engine.encode_message(msg), self._server.destination)
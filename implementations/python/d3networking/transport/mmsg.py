@@ -0,0 +1,118 @@
+""" Batched datagram sending with the Linux sendmmsg system call.
+
+Python's socket module does not expose sendmmsg, so it is called through ctypes. Platforms without sendmmsg fall
+back to one sendto per datagram.
+"""
+import ctypes
+import ctypes.util
+import os
+import socket
+import struct
+import sys
+from typing import Sequence, Tuple
+
+Datagram = Tuple[bytes, Tuple]
+""" A datagram to send as a (payload, destination address) tuple.
+"""
+
+
+class _IoVec(ctypes.Structure):
+    _fields_ = [("iov_base", ctypes.c_void_p), ("iov_len", ctypes.c_size_t)]
+
+
+class _MsgHdr(ctypes.Structure):
+    _fields_ = [
+        ("msg_name", ctypes.c_void_p),
+        ("msg_namelen", ctypes.c_uint32),
+        ("msg_iov", ctypes.POINTER(_IoVec)),
+        ("msg_iovlen", ctypes.c_size_t),
+        ("msg_control", ctypes.c_void_p),
+        ("msg_controllen", ctypes.c_size_t),
+        ("msg_flags", ctypes.c_int),
+    ]
+
+
+class _MMsgHdr(ctypes.Structure):
+    _fields_ = [("msg_hdr", _MsgHdr), ("msg_len", ctypes.c_uint)]
+
+
+def _load_sendmmsg():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        func = libc.sendmmsg
+    except (OSError, AttributeError):
+        return None
+    func.argtypes = [ctypes.c_int, ctypes.c_void_p, ctypes.c_uint, ctypes.c_int]
+    func.restype = ctypes.c_int
+    return func
+
+
+_sendmmsg = _load_sendmmsg()
+
+
+def _sockaddr(family: int, address: Tuple) -> bytes:
+    """ Build the C sockaddr structure of a destination address.
+
+    The host is resolved with getaddrinfo, like sendto does, so host names and scoped IPv6 addresses are accepted.
+    """
+    resolved = socket.getaddrinfo(address[0], address[1], family, socket.SOCK_DGRAM)[0][4]
+    host, port = resolved[0].split('%', 1)[0], resolved[1]
+    if family == socket.AF_INET6:
+        flowinfo = address[2] if len(address) > 2 else resolved[2]
+        scope_id = address[3] if len(address) > 3 else resolved[3]
+        return (struct.pack('=H', family) + struct.pack('!HI', port, flowinfo)
+                + socket.inet_pton(family, host) + struct.pack('=I', scope_id))
+    return struct.pack('=H', family) + struct.pack('!H', port) + socket.inet_pton(family, host) + bytes(8)
+
+
+def has_sendmmsg() -> bool:
+    """ Whether datagrams are sent with a single sendmmsg call on this platform.
+    """
+    return _sendmmsg is not None
+
+
+def send_datagrams(sock: socket.socket, datagrams: Sequence[Datagram]) -> int:
+    """ Send a group of datagrams, in a single system call when possible.
+
+    :param sock: A UDP socket, or any object with a sendto method. Every destination must belong to the socket's
+    address family.
+    :param datagrams: The datagrams to send with their destination. Host names are resolved like sendto does.
+    :return: The amount of datagrams sent.
+    """
+    if _sendmmsg is None or len(datagrams) < 2 or not isinstance(sock, socket.socket):
+        for payload, address in datagrams:
+            sock.sendto(payload, address)
+        return len(datagrams)
+
+    amount = len(datagrams)
+    headers = (_MMsgHdr * amount)()
+    iovecs = (_IoVec * amount)()
+    keep_alive = []
+    names = {}  # Datagrams usually share a few destinations, each is only resolved once.
+    for idx, (payload, address) in enumerate(datagrams):
+        payload_buffer = ctypes.create_string_buffer(bytes(payload), len(payload))
+        name = names.get(address)
+        if name is None:
+            name = names[address] = _sockaddr(sock.family, address)
+        name_buffer = ctypes.create_string_buffer(name, len(name))
+        keep_alive += (payload_buffer, name_buffer)
+        iovecs[idx].iov_base = ctypes.cast(payload_buffer, ctypes.c_void_p)
+        iovecs[idx].iov_len = len(payload)
+        header = headers[idx].msg_hdr
+        header.msg_name = ctypes.cast(name_buffer, ctypes.c_void_p)
+        header.msg_namelen = len(name)
+        header.msg_iov = ctypes.pointer(iovecs[idx])
+        header.msg_iovlen = 1
+
+    sent = 0
+    while sent < amount:
+        result: int = _sendmmsg(sock.fileno(), ctypes.addressof(headers) + sent * ctypes.sizeof(_MMsgHdr),
+                                amount - sent, 0)
+        if result < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, os.strerror(errno))
+        sent += result
+
+    return sent
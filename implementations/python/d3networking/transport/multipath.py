@@ -0,0 +1,206 @@
+import selectors
+import socket
+import struct
+import time
+from collections import deque
+from typing import Deque, Dict, List, Literal, Optional, Sequence, Set, Tuple, Union
+
+from nacl.signing import SigningKey, VerifyKey
+
+from .transport import AvailablePayloadClient, AvailablePayloadServer
+from ..message.message import AvailablePayloadMessage
+from ..metrics.metrics import Metrics
+from ..processing.engine import ProtocolEngine
+from ..processing.verification import VerificationEngine
+
+Interface = Tuple[Literal[4, 6], int]
+""" A (protocol, interface index) pair. Index 0 lets the system pick the interface.
+"""
+
+DUAL_STACK: Sequence[Interface] = ((6, 0), (4, 0))
+""" Both multicast groups on the default interface.
+"""
+
+
+class DatagramDeduplicator:
+    """ Remembers the hashes of recently seen datagrams.
+
+    The same signed datagram reaches a host once per family and interface it listens on. Hashing the raw bytes is
+    much cheaper than decoding and verifying the copies.
+    """
+    def __init__(self, size: int = 1024):
+        """ Instantiate a DatagramDeduplicator
+
+        :param size: Amount of datagram hashes remembered.
+        """
+        self.size = size
+        self.duplicates = 0
+        """ Amount of datagrams recognized as copies.
+        """
+        self._seen: Set[int] = set()
+        self._order: Deque[int] = deque()
+
+    def is_duplicate(self, datagram: Union[bytes, memoryview]) -> bool:
+        """ Check whether a datagram was seen recently and remember it.
+
+        :param datagram: The raw datagram.
+        :return: Whether an identical datagram was seen recently.
+        """
+        digest = hash(bytes(datagram))
+        if digest in self._seen:
+            self.duplicates += 1
+            return True
+
+        self._seen.add(digest)
+        self._order.append(digest)
+        if len(self._order) > self.size:
+            self._seen.discard(self._order.popleft())
+        return False
+
+
+class MultiPathPayloadClient:
+    """ Client listening to both multicast groups on several interfaces from a single thread.
+
+    One socket is opened per protocol and joined to the group on every requested interface of that protocol. All
+    sockets are multiplexed with a selector. Copies of a datagram arriving through several paths are dropped before
+    being decoded. Signature verification, replay protection and metrics are shared by every path.
+    """
+    def __init__(self, validate_keys: Dict[int, VerifyKey], interfaces: Sequence[Interface] = DUAL_STACK,
+                 verification_engine: Optional[VerificationEngine] = None, metrics: Optional[Metrics] = None,
+                 dedup_size: int = 1024, **client_options):
+        """ Instantiate a MultiPathPayloadClient
+
+        :param validate_keys: Mapping between team identifiers and their public keys.
+        :param interfaces: (protocol, interface index) pairs to listen on.
+        :param verification_engine: Engine used to verify signatures, shared by every path.
+        :param metrics: Where to count messages, shared by every path.
+        :param dedup_size: Amount of recent datagrams remembered to drop copies.
+        :param client_options: Other AvailablePayloadClient options applied to every socket.
+        """
+        if not interfaces:
+            raise ValueError("At least one interface is required.")
+
+        self.engine = ProtocolEngine(validate_keys, verification_engine=verification_engine,
+                                     replay_window=client_options.pop("replay_window", 64), metrics=metrics)
+        """ Parses and validates the datagrams of every path.
+        """
+        self.validate_keys = validate_keys
+        self.verification_engine = self.engine.verification_engine
+        self.metrics = self.engine.metrics
+        self.replay_protection = self.engine.replay_protection
+        self.deduplicator = DatagramDeduplicator(dedup_size)
+        self._selector = selectors.DefaultSelector()
+        self._clients: Dict[int, AvailablePayloadClient] = {}
+        self._pending: Deque[AvailablePayloadMessage] = deque()
+
+        for proto, scope_id in interfaces:
+            client = self._clients.get(proto)
+            if client is not None:
+                client._join_multicast_grp(proto, scope_id)
+                continue
+
+            client = AvailablePayloadClient(validate_keys, scope_id=scope_id, proto=proto, engine=self.engine,
+                                            **client_options)
+            self._clients[proto] = client
+            self._selector.register(client, selectors.EVENT_READ, client)
+
+    @property
+    def clients(self) -> List[AvailablePayloadClient]:
+        """ The client of each protocol.
+        """
+        return list(self._clients.values())
+
+    def recv_many(self, max_msgs: int = 64, timeout: Optional[float] = None,
+                  validate: bool = True) -> List[AvailablePayloadMessage]:
+        """ Receive the datagrams waiting on every path.
+
+        :param max_msgs: Maximum amount of datagrams to read from each socket.
+        :param timeout: Maximum amount of seconds to wait for a first datagram. Waits forever if None.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :return: The valid messages. Empty if the timeout expired.
+        """
+        msgs: List[AvailablePayloadMessage] = []
+        events = self._selector.select(timeout)
+        now = time.monotonic_ns()
+        for key, _ in events:
+            client: AvailablePayloadClient = key.data
+            for datagram in client.recv_raw_many(max_msgs, timeout=0):
+                if self.deduplicator.is_duplicate(datagram):
+                    self.metrics.count("duplicate_path", datagram[0] if len(datagram) else -1)
+                    continue
+                msgs += self.engine.receive(datagram, now, validate)
+
+        return msgs
+
+    def recv_message(self, timeout: Optional[float] = None,
+                     validate: bool = True) -> Union[AvailablePayloadMessage, None]:
+        """ Receive a single message from any path.
+
+        Extra messages received in the same batch are kept for the next calls.
+
+        :param timeout: Maximum amount of seconds to wait. Waits forever if None.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :return: The message if a valid one was received, None otherwise.
+        """
+        if not self._pending:
+            self._pending.extend(self.recv_many(timeout=timeout, validate=validate))
+        return self._pending.popleft() if self._pending else None
+
+    def close_connection(self):
+        """ Close every socket.
+        """
+        self._selector.close()
+        for client in self._clients.values():
+            client.close_connection()
+
+
+class MultiPathPayloadServer:
+    """ Server sending every message to several multicast groups and interfaces.
+
+    The message is signed once and the exact same bytes are sent on every path, so clients listening on several
+    paths recognize the copies.
+    """
+    def __init__(self, signing_key: Union[SigningKey, None], interfaces: Sequence[Interface] = DUAL_STACK,
+                 presign_depth: int = 0):
+        """ Instantiate a MultiPathPayloadServer
+
+        :param signing_key: The key used to sign messages. Messages won't be signed if this is set to None.
+        :param interfaces: (protocol, interface index) pairs to send on.
+        :param presign_depth: Amount of upcoming sequence numbers signed in advance.
+        """
+        if not interfaces:
+            raise ValueError("At least one interface is required.")
+
+        self._servers: List[AvailablePayloadServer] = []
+        for proto, scope_id in interfaces:
+            server = AvailablePayloadServer(signing_key if not self._servers else None, proto=proto,
+                                            presign_depth=presign_depth if not self._servers else 0)
+            if scope_id and proto == 6:
+                server._socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_MULTICAST_IF, scope_id)
+            elif scope_id:
+                # struct ip_mreqn, which selects the interface by index (Linux).
+                server._socket.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF,
+                                          struct.pack('=4s4si', bytes(4), bytes(4), scope_id))
+            self._servers.append(server)
+
+    @property
+    def seq_num(self) -> int:
+        """ Sequence number of the next message.
+        """
+        return self._servers[0].seq_num
+
+    def send_message(self, msg: AvailablePayloadMessage):
+        """ Sign a message once and send it on every path.
+
+        :param msg: An unsigned message ready to be sent.
+        :return: None
+        """
+        datagram = self._servers[0].engine.encode_message(msg)
+        for server in self._servers:
+            server._socket.sendto(datagram, server.destination)
+
+    def close_connection(self):
+        """ Close every socket.
+        """
+        for server in self._servers:
+            server.close_connection()
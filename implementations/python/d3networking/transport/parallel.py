@@ -0,0 +1,254 @@
+import multiprocessing
+import os
+import struct
+import time
+from multiprocessing import shared_memory
+from typing import Dict, List, Literal, Optional, Union
+
+from nacl.signing import VerifyKey
+
+from .transport import AvailablePayloadClient
+from ..crypto.signature.schemes import CheckKey, MacKey
+from ..message.digest import DIGEST_MARKER
+from ..message.message import AvailablePayloadMessage, HEADER_SIZE, MAX_MESSAGE_SIZE
+
+_COUNTERS = struct.Struct('=QQQ')
+_LENGTH = struct.Struct('=I')
+_SLOT_SIZE = _LENGTH.size + MAX_MESSAGE_SIZE
+
+
+class SharedRing:
+    """ Single producer, single consumer ring of datagrams in shared memory.
+
+    The segment starts with three 64 bit counters: the amount of datagrams written, the amount read and the amount
+    dropped because the ring was full. Fixed size slots follow, each holding a 32 bit length and up to 508 bytes.
+
+    Writes to shared memory from Python come with no ordering guarantee between processes, so the consumer could see
+    the write counter before the bytes of the slot it publishes. Each push and pop therefore runs under a lock shared
+    by both processes, whose acquire and release order the slot's bytes with the counters. The lock is never
+    contended for long: it is held for a single copy of at most 508 bytes.
+    """
+    def __init__(self, capacity: int = 4096, name: Optional[str] = None, lock=None):
+        """ Create a ring, or attach to an existing one.
+
+        :param capacity: Amount of slots. Must match the existing ring's capacity when attaching.
+        :param name: Name of an existing shared memory segment. A new segment is created if this is None.
+        :param lock: The lock of the existing ring, see the lock attribute. Required when attaching.
+        """
+        if name is not None and lock is None:
+            raise ValueError("The lock of the existing ring must be given to attach to it.")
+        self.capacity = capacity
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        """ Lock ordering the slots with the counters, to give to the process attaching to the ring.
+        """
+        size = _COUNTERS.size + capacity * _SLOT_SIZE
+        self._owner = name is None
+        self.shm = shared_memory.SharedMemory(name=name, create=self._owner, size=size)
+        self._buf = self.shm.buf
+        if self._owner:
+            _COUNTERS.pack_into(self._buf, 0, 0, 0, 0)
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def dropped(self) -> int:
+        """ Amount of datagrams dropped because the consumer did not keep up.
+        """
+        return _COUNTERS.unpack_from(self._buf, 0)[2]
+
+    def push(self, datagram: Union[bytes, memoryview]) -> bool:
+        """ Append a datagram. Must only be called by the producer.
+
+        :param datagram: A datagram of at most 508 bytes.
+        :return: Whether the datagram was appended. False if the ring is full.
+        """
+        size = len(datagram)
+        if size > MAX_MESSAGE_SIZE:
+            raise ValueError(f"A datagram of {size} bytes does not fit in a slot of the ring.")
+
+        with self.lock:
+            written, read, dropped = _COUNTERS.unpack_from(self._buf, 0)
+            if written - read >= self.capacity:
+                struct.pack_into('=Q', self._buf, 16, dropped + 1)
+                return False
+
+            offset = _COUNTERS.size + (written % self.capacity) * _SLOT_SIZE
+            _LENGTH.pack_into(self._buf, offset, size)
+            self._buf[offset + _LENGTH.size: offset + _LENGTH.size + size] = datagram
+            struct.pack_into('=Q', self._buf, 0, written + 1)
+        return True
+
+    def pop(self) -> Optional[bytes]:
+        """ Remove the oldest datagram. Must only be called by the consumer.
+
+        :return: The datagram, or None if the ring is empty.
+        """
+        with self.lock:
+            written, read, _ = _COUNTERS.unpack_from(self._buf, 0)
+            if read == written:
+                return None
+
+            offset = _COUNTERS.size + (read % self.capacity) * _SLOT_SIZE
+            size = _LENGTH.unpack_from(self._buf, offset)[0]
+            datagram = bytes(self._buf[offset + _LENGTH.size: offset + _LENGTH.size + size])
+            struct.pack_into('=Q', self._buf, 8, read + 1)
+        return datagram
+
+    def close(self):
+        """ Detach from the ring. The ring is destroyed if this instance created it.
+        """
+        self._buf = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _worker(worker_idx: int, workers: int, ring_name: str, ring_capacity: int, ring_lock,
+            keys: Dict[int, Union[bytes, MacKey]], proto: Literal[4, 6], scope_id: int, validate: bool, stop):
+    """ Receive, validate and deduplicate the messages of the teams assigned to a worker.
+
+    Multicast datagrams are delivered to every socket bound to the group, so each worker receives all the traffic.
+    Teams are sharded between workers with team_id % workers, and a worker drops other teams' datagrams by looking
+    at their first byte, before any decoding or cryptography. Digests are handled by every worker, each keeping only
+    the records of its own teams, so a team's messages always go through the replay window of the same worker.
+    """
+    ring = SharedRing(ring_capacity, name=ring_name, lock=ring_lock)
+
+    def owns_team(team_id: int) -> bool:
+        return team_id % workers == worker_idx
+
+    client = AvailablePayloadClient({team_id: key if isinstance(key, MacKey) else VerifyKey(key)
+                                     for team_id, key in keys.items()},
+                                    scope_id=scope_id, proto=proto, reuse_port=True)
+    try:
+        while not stop.is_set():
+            for datagram in client.recv_raw_many(timeout=0.1):
+                if len(datagram) == 0:
+                    continue
+                if datagram[0] == DIGEST_MARKER:
+                    for msg in client.engine.receive_digest(datagram, validate=validate, record_filter=owns_team):
+                        ring.push(msg.as_bytes())
+                elif datagram[0] % workers == worker_idx:
+                    msg = client.engine.receive_message(datagram, validate=validate)
+                    if msg is not None:
+                        # Trailing bytes after the signature are not part of the message.
+                        ring.push(datagram[:HEADER_SIZE + msg.sig_size])
+    finally:
+        client.close_connection()
+        ring.shm.close()
+
+
+class ParallelPayloadReceiver:
+    """ Receives messages on several processes to use several cores.
+
+    Each worker process binds its own SO_REUSEPORT socket to the multicast group and decodes, validates and
+    deduplicates the messages of its share of the teams. Accepted datagrams are passed to the parent through one
+    shared memory ring per worker instead of a pickled queue.
+    """
+    def __init__(self, validate_keys: Dict[int, CheckKey], workers: Optional[int] = None, scope_id: int = 0,
+                 proto: Literal[4, 6] = 6, validate: bool = True, ring_capacity: int = 4096):
+        """ Instantiate a ParallelPayloadReceiver
+
+        :param validate_keys: Mapping between team identifiers and their public keys, or their shared secrets.
+        :param workers: Amount of worker processes. Defaults to the amount of cores.
+        :param scope_id: Scope id of the network interface to use.
+        :param proto: The network protocol to use (IPv4 or IPv6).
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :param ring_capacity: Amount of accepted datagrams each worker can buffer for the parent.
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._keys = {team_id: key if isinstance(key, MacKey) else bytes(key) for team_id, key in validate_keys.items()}
+        self._scope_id = scope_id
+        self._proto = proto
+        self._validate = validate
+        self._ring_capacity = ring_capacity
+        self._rings: List[SharedRing] = []
+        self._processes: List[multiprocessing.Process] = []
+        self._stop = multiprocessing.Event()
+        self._next_ring = 0
+
+    def start(self):
+        """ Start the worker processes.
+        """
+        if self._processes:
+            raise RuntimeError("ParallelPayloadReceiver is already running.")
+        self._stop.clear()
+        for worker_idx in range(self.workers):
+            ring = SharedRing(self._ring_capacity)
+            process = multiprocessing.Process(
+                target=_worker, name=f"d3-receiver-{worker_idx}", daemon=True,
+                args=(worker_idx, self.workers, ring.name, self._ring_capacity, ring.lock, self._keys, self._proto,
+                      self._scope_id, self._validate, self._stop))
+            process.start()
+            self._rings.append(ring)
+            self._processes.append(process)
+
+    def stop(self):
+        """ Stop the worker processes and release the shared memory.
+        """
+        self._stop.set()
+        for process in self._processes:
+            process.join()
+        for ring in self._rings:
+            ring.close()
+        self._processes.clear()
+        self._rings.clear()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _check_workers(self):
+        for process in self._processes:
+            if not process.is_alive():
+                raise RuntimeError(f"Worker process {process.name} exited with code {process.exitcode}.")
+
+    @property
+    def dropped(self) -> int:
+        """ Amount of accepted messages dropped because the parent did not read them fast enough.
+        """
+        return sum(ring.dropped for ring in self._rings)
+
+    def recv_many(self, max_msgs: int = 64, timeout: Optional[float] = None,
+                  poll_interval: float = 0.0005) -> List[AvailablePayloadMessage]:
+        """ Collect the messages accepted by the workers.
+
+        Messages of a given team are returned in order. Messages of different teams may be interleaved differently
+        than they were received.
+
+        :param max_msgs: Maximum amount of messages to return.
+        :param timeout: Maximum amount of seconds to wait for a first message. Waits forever if None.
+        :param poll_interval: Amount of seconds slept between two polls of the rings while they are empty.
+        :return: The accepted messages. Empty if the timeout expired.
+        """
+        if not self._rings:
+            raise RuntimeError("ParallelPayloadReceiver is not running.")
+        deadline = None if timeout is None else time.monotonic() + timeout
+        msgs: List[AvailablePayloadMessage] = []
+        while True:
+            for _ in range(len(self._rings)):
+                ring = self._rings[self._next_ring]
+                self._next_ring = (self._next_ring + 1) % len(self._rings)
+                while len(msgs) < max_msgs:
+                    datagram = ring.pop()
+                    if datagram is None:
+                        break
+                    msgs.append(AvailablePayloadMessage.from_bytes(datagram))
+            if msgs or (deadline is not None and time.monotonic() >= deadline):
+                return msgs
+            self._check_workers()
+            time.sleep(poll_interval)
+
+    def recv_message(self, timeout: Optional[float] = None) -> Optional[AvailablePayloadMessage]:
+        """ Collect a single message accepted by the workers.
+
+        :param timeout: Maximum amount of seconds to wait. Waits forever if None.
+        :return: The message, or None if the timeout expired.
+        """
+        msgs = self.recv_many(max_msgs=1, timeout=timeout)
+        return msgs[0] if msgs else None
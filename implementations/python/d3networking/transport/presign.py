@@ -0,0 +1,104 @@
+import threading
+from typing import Dict, Optional, Tuple
+
+from ..crypto.signature.schemes import SignKey, scheme_for_key
+from ..message.message import _UNSIGNED_HEADER
+from ..processing.processing import INT_MAX_VAL
+
+
+class Presigner:
+    """ Signs upcoming sequence numbers ahead of time on a background thread.
+
+    Cranes broadcast the same payload size many times in a row and only the sequence number changes. While the team
+    and the payload size stay the same, the signatures of the next sequence numbers are computed in advance so that
+    sending a message does not wait on Ed25519. Changing the payload discards the signatures computed so far.
+    """
+    def __init__(self, signing_key: SignKey, depth: int = 16):
+        """ Instantiate a Presigner and start its thread.
+
+        :param signing_key: The key used to sign messages.
+        :param depth: Amount of sequence numbers signed ahead of the next one to send.
+        """
+        self.signing_key = signing_key
+        self._scheme = scheme_for_key(signing_key)
+        self.depth = depth
+        self.hits = 0
+        """ Amount of signatures served from the precomputed signatures.
+        """
+        self.misses = 0
+        """ Amount of signatures that had to be computed when sending.
+        """
+        self._cond = threading.Condition()
+        self._header: Optional[Tuple[int, int]] = None
+        self._next_seq_num = 0
+        self._signatures: Dict[int, bytes] = {}
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="d3-presign", daemon=True)
+        self._thread.start()
+
+    def _wanted(self) -> Optional[int]:
+        """ The next sequence number to sign in advance, if any.
+        """
+        if self._header is None:
+            return None
+        for offset in range(self.depth):
+            seq_num = (self._next_seq_num + offset) % (INT_MAX_VAL + 1)
+            if seq_num not in self._signatures:
+                return seq_num
+        return None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                seq_num = self._wanted()
+                while not self._closed and seq_num is None:
+                    self._cond.wait()
+                    seq_num = self._wanted()
+                if self._closed:
+                    return
+                header = self._header
+
+            signature = self._scheme.sign(self.signing_key, _UNSIGNED_HEADER.pack(header[0], header[1], seq_num))
+
+            with self._cond:
+                if self._header == header:
+                    self._signatures[seq_num] = signature
+
+    def signature(self, team_id: int, payload_size: int, seq_num: int) -> bytes:
+        """ Signature of the unsigned bytes of a message.
+
+        The precomputed signature is used if available. The following sequence numbers are then signed in advance
+        for the same team and payload size.
+
+        :param team_id: The message's team identifier.
+        :param payload_size: The message's payload size.
+        :param seq_num: The message's sequence number.
+        :return: The signature of the message.
+        """
+        with self._cond:
+            if self._header != (team_id, payload_size):
+                self._header = (team_id, payload_size)
+                self._signatures.clear()
+            signature = self._signatures.pop(seq_num, None)
+            self._next_seq_num = (seq_num + 1) % (INT_MAX_VAL + 1)
+            for stale in [cached for cached in self._signatures if self._wanted_offset(cached) >= self.depth]:
+                del self._signatures[stale]
+            self._cond.notify()
+
+        if signature is not None:
+            self.hits += 1
+            return signature
+
+        self.misses += 1
+        return self._scheme.sign(self.signing_key, _UNSIGNED_HEADER.pack(team_id, payload_size, seq_num))
+
+    def _wanted_offset(self, seq_num: int) -> int:
+        return (seq_num - self._next_seq_num) % (INT_MAX_VAL + 1)
+
+    def close(self):
+        """ Stop the background thread.
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
@@ -0,0 +1,163 @@
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from .transport import AvailablePayloadServer
+from ..message.message import AvailablePayloadMessage
+
+
+class _Source:
+    __slots__ = ("team_id", "server", "payload_size", "interval", "deadline", "generation")
+
+    def __init__(self, team_id: int, server: AvailablePayloadServer, payload_size: int):
+        self.team_id = team_id
+        self.server = server
+        self.payload_size = payload_size
+        self.interval = 0.0
+        self.deadline = 0.0
+        self.generation = 0
+
+
+class BroadcastScheduler:
+    """ Sends the payload of several teams at a rate adapted to how often it changes.
+
+    A team's message is sent as soon as its payload size changes. It is then repeated after min_interval, and the
+    interval is multiplied by backoff after each repetition until it reaches max_interval, the heartbeat. Vehicles
+    therefore see changes immediately, while unchanged payloads use little airtime.
+
+    The next send of every team is kept in a hashed timer wheel driven by a monotonic clock: scheduling and
+    cancelling a send are O(1), and each tick only looks at the sends due in its slot.
+    """
+    def __init__(self, min_interval: float = 0.1, max_interval: float = 5.0, backoff: float = 2.0,
+                 tick: float = 0.01, wheel_size: int = 512, clock: Callable[[], float] = time.monotonic):
+        """ Instantiate a BroadcastScheduler
+
+        :param min_interval: Seconds between the first send of a new payload and its first repetition.
+        :param max_interval: Seconds between two heartbeats of an unchanged payload.
+        :param backoff: Factor applied to the interval after each repetition.
+        :param tick: Resolution of the timer wheel in seconds.
+        :param wheel_size: Amount of slots in the timer wheel.
+        :param clock: Monotonic clock, in seconds.
+        """
+        if not 0 < min_interval <= max_interval:
+            raise ValueError("min_interval must be positive and at most max_interval.")
+        if backoff < 1:
+            raise ValueError("backoff must be at least 1.")
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.backoff = backoff
+        self.tick = tick
+        self._clock = clock
+        self._wheel: List[Set[Tuple[int, int]]] = [set() for _ in range(wheel_size)]
+        self._sources: Dict[int, _Source] = {}
+        self._cursor = int(clock() / tick)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.sent = 0
+        """ Amount of messages sent.
+        """
+
+    def _schedule(self, source: _Source, deadline: float):
+        source.generation += 1
+        source.deadline = deadline
+        slot = max(int(deadline / self.tick), self._cursor)
+        self._wheel[slot % len(self._wheel)].add((source.team_id, source.generation))
+
+    def _send(self, source: _Source, now: float):
+        source.server.send_message(AvailablePayloadMessage(team_id=source.team_id, payload_size=source.payload_size))
+        self.sent += 1
+        self._schedule(source, now + source.interval)
+        source.interval = min(source.interval * self.backoff, self.max_interval)
+
+    def add_source(self, team_id: int, server: AvailablePayloadServer, payload_size: int):
+        """ Start broadcasting the payload of a team. The first message is sent immediately.
+
+        :param team_id: The team's identifier.
+        :param server: The server signing and sending the team's messages.
+        :param payload_size: The team's current payload size.
+        :return: None
+        """
+        with self._lock:
+            if team_id in self._sources:
+                raise ValueError(f"Team {team_id} already has a source.")
+            source = self._sources[team_id] = _Source(team_id, server, payload_size)
+            source.interval = self.min_interval
+            self._send(source, self._clock())
+
+    def remove_source(self, team_id: int):
+        """ Stop broadcasting the payload of a team.
+
+        :param team_id: The team's identifier.
+        :return: None
+        """
+        with self._lock:
+            self._sources.pop(team_id, None)
+
+    def update(self, team_id: int, payload_size: int):
+        """ Report the current payload size of a team.
+
+        The message is sent immediately if the payload size changed, and the interval goes back to min_interval.
+        Nothing happens if it did not change.
+
+        :param team_id: The team's identifier.
+        :param payload_size: The team's current payload size.
+        :return: None
+        """
+        with self._lock:
+            source = self._sources[team_id]
+            if source.payload_size == payload_size:
+                return
+            source.payload_size = payload_size
+            source.interval = self.min_interval
+            self._send(source, self._clock())
+
+    def poll(self) -> int:
+        """ Send every message that is due.
+
+        :return: The amount of messages sent.
+        """
+        now = self._clock()
+        current = int(now / self.tick)
+        sent = self.sent
+        with self._lock:
+            # Look at every slot elapsed since the last poll, at most one full turn of the wheel.
+            first = max(self._cursor, current - len(self._wheel) + 1)
+            # Advanced before sending, so repeats due within this tick land in the next slot instead of a slot
+            # already polled, which would only be looked at again a full turn of the wheel later.
+            self._cursor = current + 1
+            for slot_idx in range(first, current + 1):
+                slot = self._wheel[slot_idx % len(self._wheel)]
+                for entry in list(slot):
+                    team_id, generation = entry
+                    source = self._sources.get(team_id)
+                    if source is None or source.generation != generation:
+                        slot.discard(entry)  # Cancelled or rescheduled
+                    elif int(source.deadline / self.tick) <= current:
+                        slot.discard(entry)
+                        self._send(source, now)
+        return self.sent - sent
+
+    def run(self):
+        """ Send messages when they are due until stop is called. This is a blocking call.
+        """
+        while not self._stop.is_set():
+            self.poll()
+            self._stop.wait(self.tick)
+
+    def start(self):
+        """ Send messages when they are due on a background thread.
+        """
+        if self._thread is not None:
+            raise RuntimeError("BroadcastScheduler is already running.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.run, name="d3-broadcast", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stop the background thread started with start.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
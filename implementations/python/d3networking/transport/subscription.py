@@ -0,0 +1,216 @@
+import logging
+import threading
+import time
+from typing import Callable, Dict, FrozenSet, Iterable, List, Optional
+
+from ..message.message import AvailablePayloadMessage
+
+_logger = logging.getLogger(__name__)
+
+Callback = Callable[[AvailablePayloadMessage], None]
+
+
+class Subscription:
+    """ A callback registered on a client with AvailablePayloadClient.subscribe.
+
+    Messages of the subscribed teams are folded per team while a coalescing window is open: only the latest message
+    of each team is delivered when the window closes. With on_change_only, a message is only delivered if its payload
+    size differs from the last one delivered for its team, so steady heartbeats do not reach the callback.
+    """
+    def __init__(self, callback: Callback, teams: Optional[Iterable[int]] = None, on_change_only: bool = True,
+                 coalesce_ms: float = 0.0):
+        """ Instantiate a Subscription
+
+        :param callback: Called on the dispatcher's thread with each delivered message.
+        :param teams: Teams to deliver messages of. Every team if None.
+        :param on_change_only: Whether to skip messages whose payload size did not change.
+        :param coalesce_ms: Amount of milliseconds during which messages of a team are folded into the latest one.
+        """
+        self.callback = callback
+        self.teams: Optional[FrozenSet[int]] = frozenset(teams) if teams is not None else None
+        self.on_change_only = on_change_only
+        self.coalesce = coalesce_ms / 1000
+        self.delivered = 0
+        """ Amount of messages given to the callback.
+        """
+        self.coalesced = 0
+        """ Amount of messages replaced by a newer message of the same team before being delivered.
+        """
+        self.unchanged = 0
+        """ Amount of messages skipped because their payload size did not change.
+        """
+        self.active = True
+        self._pending: Dict[int, AvailablePayloadMessage] = {}
+        self._flush_at: Optional[float] = None
+        self._last_payload: Dict[int, int] = {}
+
+    @property
+    def flush_at(self) -> Optional[float]:
+        """ When the pending messages are due, on the dispatcher's clock. None if nothing is pending.
+        """
+        return self._flush_at
+
+    def offer(self, msg: AvailablePayloadMessage, now: float):
+        """ Queue a received message, replacing the pending message of its team.
+
+        :param msg: A validated message.
+        :param now: Current time on the dispatcher's clock.
+        :return: None
+        """
+        if self.teams is not None and msg.team_id not in self.teams:
+            return
+        if msg.team_id in self._pending:
+            self.coalesced += 1
+        self._pending[msg.team_id] = msg
+        if self._flush_at is None:
+            self._flush_at = now + self.coalesce
+
+    def flush(self, now: float):
+        """ Deliver the pending messages if the coalescing window is over.
+
+        :param now: Current time on the dispatcher's clock.
+        :return: None
+        """
+        if self._flush_at is None or now < self._flush_at:
+            return
+
+        pending, self._pending, self._flush_at = self._pending, {}, None
+        for team_id, msg in pending.items():
+            if self.on_change_only and self._last_payload.get(team_id) == msg.payload_size:
+                self.unchanged += 1
+                continue
+            self._last_payload[team_id] = msg.payload_size
+            self.delivered += 1
+            try:
+                self.callback(msg)
+            except Exception:
+                _logger.exception("Subscription callback failed.")
+
+    def cancel(self):
+        """ Stop delivering messages to the callback.
+        """
+        self.active = False
+
+
+class SubscriptionDispatcher:
+    """ Runs a client's receive loop on a background thread and feeds its subscriptions.
+
+    The thread sleeps in the client's select until a datagram arrives, the next coalescing window closes or the poll
+    interval expires, so an idle client costs no CPU.
+    """
+    def __init__(self, client, validate: bool = True, poll_interval: float = 0.2,
+                 clock: Callable[[], float] = time.monotonic):
+        """ Instantiate a SubscriptionDispatcher
+
+        :param client: The AvailablePayloadClient to receive with. It must not be used by another thread.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :param poll_interval: Maximum amount of seconds between two checks of the stop flag.
+        :param clock: Monotonic clock, in seconds, used for the coalescing windows.
+        """
+        self.client = client
+        self.validate = validate
+        self.poll_interval = poll_interval
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._subscriptions: List[Subscription] = []
+        # Each thread has its own stop flag, so a thread that is still finishing never picks up a restart.
+        self._thread: Optional[threading.Thread] = None
+        self._stop: Optional[threading.Event] = None
+        self._retired: Optional[threading.Thread] = None
+
+    def add(self, subscription: Subscription, validate: Optional[bool] = None):
+        """ Feed a subscription, starting the thread if needed.
+
+        :param subscription: The subscription to feed.
+        :param validate: Whether to drop messages that have no valid signature or not. Can only differ from the
+        current value while no subscription is fed. The current value is kept if None.
+        :return: None
+        """
+        with self._lock:
+            if validate is not None and validate != self.validate:
+                if self._subscriptions:
+                    raise ValueError("Every subscription of a client must use the same validate value.")
+                self.validate = validate
+            self._subscriptions.append(subscription)
+            if self._thread is None:
+                self._start()
+
+    def remove(self, subscription: Subscription) -> bool:
+        """ Stop feeding a subscription, and stop the thread once no subscription is left.
+
+        :return: Whether the dispatcher stopped, so that the client can receive on its own again.
+        """
+        subscription.cancel()
+        with self._lock:
+            if subscription in self._subscriptions:
+                self._subscriptions.remove(subscription)
+            if self._subscriptions:
+                return False
+            thread = self._retire()
+        self._join(thread)
+        return True
+
+    def _timeout(self, subscriptions: List[Subscription]) -> float:
+        timeout = self.poll_interval
+        now = self._clock()
+        for subscription in subscriptions:
+            if subscription.flush_at is not None:
+                timeout = min(timeout, max(subscription.flush_at - now, 0.0))
+        return timeout
+
+    def _run(self, stop: threading.Event, previous: Optional[threading.Thread]):
+        # A thread stopped from a callback is only told to stop, wait for it to be done with the client.
+        if previous is not None:
+            previous.join()
+        while not stop.is_set():
+            with self._lock:
+                subscriptions = [subscription for subscription in self._subscriptions if subscription.active]
+
+            msgs = self.client.recv_many(timeout=self._timeout(subscriptions), validate=self.validate)
+            now = self._clock()
+            for subscription in subscriptions:
+                for msg in msgs:
+                    subscription.offer(msg, now)
+                if subscription.active:
+                    subscription.flush(now)
+
+    def _start(self):
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, args=(self._stop, self._retired), name="d3-subscriptions",
+                                        daemon=True)
+        self._thread.start()
+
+    def _retire(self) -> Optional[threading.Thread]:
+        thread = self._thread
+        if thread is not None:
+            self._stop.set()
+            self._retired = thread
+            self._thread = self._stop = None
+        return thread
+
+    @staticmethod
+    def _join(thread: Optional[threading.Thread]):
+        # A thread stopping itself, from a callback, exits once the callback returns.
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+
+    @property
+    def running(self) -> bool:
+        """ Whether the background thread is running, or about to.
+        """
+        return self._thread is not None
+
+    def start(self):
+        """ Start the background thread.
+        """
+        with self._lock:
+            if self._thread is not None:
+                raise RuntimeError("SubscriptionDispatcher is already running.")
+            self._start()
+
+    def stop(self):
+        """ Stop the background thread.
+        """
+        with self._lock:
+            thread = self._retire()
+        self._join(thread)
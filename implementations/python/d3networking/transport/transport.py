@@ -1,26 +1,52 @@
+import select
 import socket
 import struct
-from typing import Literal, Union, Dict
+import sys
+import time
+from collections import deque
+from typing import Deque, Literal, Union, Dict, Optional, List, Sequence
 
-from ..message.message import AvailablePayloadMessage, _append_bytes
-from ..processing.processing import validate_msg, validate_seq_num
+from ..crypto.signature.schemes import CheckKey, SignKey
+from ..metrics.metrics import Metrics, RateLimitedLogger
+from ..message.message import AvailablePayloadMessage
+from ..processing.engine import ProtocolEngine
+from ..processing.processing import INT_MAX_VAL  # Re-exported, earlier versions defined it here.
+from ..processing.replay import ReplayProtectionTable
+from ..processing.verification import VerificationEngine
+from .mmsg import send_datagrams
+from .presign import Presigner
+from .subscription import Callback, Subscription, SubscriptionDispatcher
 
-from nacl.signing import VerifyKey, SigningKey, SignedMessage
 
 V6_MULTICAST_GRP = "ff12::e01"
 V4_MULTICAST_GRP = "224.0.0.70"
 PORT = 36868
-INT_MAX_VAL = 2_147_483_647
+RECV_BUFFER_SIZE = 1500
+SO_RXQ_OVFL = getattr(socket, "SO_RXQ_OVFL", 40)  # Linux only, not exposed by every Python build.
+
+_MSG_DONTWAIT = getattr(socket, "MSG_DONTWAIT", 0)
+_OVFL_COUNTER = struct.Struct('=I')
 
 
 class AvailablePayloadServer:
     """ Server implementation for D3 networking.
+
+    Sends the datagrams produced by its ProtocolEngine on the multicast group.
     """
-    def __init__(self, signing_key: Union[SigningKey, None], proto: Literal[4, 6] = 6):
+    def __init__(self, signing_key: Union[SignKey, None], proto: Literal[4, 6] = 6, presign_depth: int = 0,
+                 sock: Optional[socket.socket] = None, metrics: Optional[Metrics] = None,
+                 gateway_id: Optional[int] = None):
         """ Instantiate an AvailablePayloadServer
 
-        :param signing_key: The key used to sign messages. Messages won't be signed if this is set to None.
+        :param signing_key: The key used to sign messages: an Ed25519 SigningKey, or a MacKey to use a cheaper shared
+        secret scheme. Messages won't be signed if this is set to None.
         :param proto: The network protocol to use (IPv4 or IPv6).
+        :param presign_depth: Amount of upcoming sequence numbers signed in advance on a background thread while the
+        payload does not change. Set to 0 to sign each message when it is sent.
+        :param sock: Socket to send on instead of a new UDP socket. Used to run the server over an in-process network.
+        :param metrics: Where to count sent messages and time signing. A new Metrics is created if this is None.
+        :param gateway_id: Identifier to relay other teams' messages under with send_digest. Vehicles verify digests
+        with the key registered under this identifier. The server cannot send digests if this is None.
         """
         self._port = PORT
         if proto == 6:
@@ -29,9 +55,43 @@ class AvailablePayloadServer:
             self._addr = V4_MULTICAST_GRP
 
         self._addr_info = socket.getaddrinfo(self._addr, None)[0]
-        self._socket = socket.socket(self._addr_info[0], socket.SOCK_DGRAM)  # Use UDP
-        self.signing_key = signing_key
-        self.seq_num = 0
+        self._socket = sock or socket.socket(self._addr_info[0], socket.SOCK_DGRAM)  # Use UDP
+
+        self._presigner: Optional[Presigner] = None
+        if signing_key is not None and presign_depth > 0:
+            self._presigner = Presigner(signing_key, depth=presign_depth)
+        self.engine = ProtocolEngine(signing_key=signing_key, gateway_id=gateway_id, metrics=metrics,
+                                     presigner=self._presigner)
+        """ Signs the messages and numbers them. The server only sends the datagrams it produces.
+        """
+
+    @property
+    def signing_key(self) -> Union[SignKey, None]:
+        """ The key used to sign messages, None if messages are not signed.
+        """
+        return self.engine.signing_key
+
+    @property
+    def gateway_id(self) -> Optional[int]:
+        """ Identifier digests are sent under, None if the server is not a gateway.
+        """
+        return self.engine.gateway_id
+
+    @property
+    def seq_num(self) -> int:
+        """ Sequence number of the next message.
+        """
+        return self.engine.seq_num
+
+    @seq_num.setter
+    def seq_num(self, seq_num: int):
+        self.engine.seq_num = seq_num
+
+    @property
+    def metrics(self) -> Metrics:
+        """ Counts sent messages and times signing.
+        """
+        return self.engine.metrics
 
     def send_message(self, msg: AvailablePayloadMessage):
         """ Send a message to the UDP socket.
@@ -40,28 +100,94 @@ class AvailablePayloadServer:
         key length attribute before sending.
         :return: None.
         """
-        msg.seq_num = self.seq_num
-        if self.signing_key is not None:
-            signed_msg: SignedMessage = self.signing_key.sign(msg.as_unsigned_bytes())
-            sig_length: int = len(bytearray(len(signed_msg.signature)))
-            assert (sig_length <= INT_MAX_VAL)
-            msg.sig_size = sig_length
-            msg.signature = bytearray(signed_msg.signature)
-        self._socket.sendto(msg.as_bytes(), (self._addr_info[4][0], self._port))
-        self.seq_num += 1
-        self.seq_num %= INT_MAX_VAL + 1
+        self._socket.sendto(self.engine.encode_message(msg), self.destination)
+
+    def send_many(self, msgs: Sequence[AvailablePayloadMessage], destinations: Optional[Sequence[tuple]] = None) -> int:
+        """ Send a group of messages to a group of destinations in a single system call when possible.
+
+        Each message gets its own sequence number and is sent to every destination. The datagrams are handed to
+        sendmmsg on Linux.
+
+        :param msgs: Unsigned messages ready to be sent, in order.
+        :param destinations: (address, port) tuples to send each message to. Every destination must use the same
+        address family as the server. Defaults to the server's multicast group.
+        :return: The amount of datagrams sent.
+        """
+        if destinations is None:
+            destinations = [self.destination]
+
+        datagrams = [self.engine.encode_message(msg) for msg in msgs]
+        return send_datagrams(self._socket, [
+            (datagram, destination) for datagram in datagrams for destination in destinations
+        ])
+
+    def send_digest(self, msgs: Sequence[AvailablePayloadMessage],
+                    destinations: Optional[Sequence[tuple]] = None) -> int:
+        """ Relay the latest state of several teams in as few datagrams as possible. Gateway mode only.
+
+        The messages are packed by groups of up to 40 in digests signed once by the gateway. Each message keeps the
+        team and sequence number it was received with, so vehicles apply the same replay protection to relayed and
+        direct messages. Vehicles unpack digests into the same messages as recv_message would return.
+
+        :param msgs: Validated messages of other teams, e.g. the latest message of each team.
+        :param destinations: (address, port) tuples to send each digest to. Defaults to the server's multicast group.
+        :return: The amount of datagrams sent.
+        """
+        if self.gateway_id is None:
+            raise RuntimeError("The server is not a gateway.")
+        if destinations is None:
+            destinations = [self.destination]
+
+        return send_datagrams(self._socket, [
+            (datagram, destination) for datagram in self.engine.encode_digests(msgs) for destination in destinations
+        ])
+
+    @property
+    def destination(self) -> tuple:
+        """ Address of the multicast group messages are sent to.
+        """
+        return self._addr_info[4][0], self._port
+
+    def close_connection(self):
+        """ Stop signing in advance and close the socket.
+        """
+        if self._presigner is not None:
+            self._presigner.close()
+        self._socket.close()
 
 
 class AvailablePayloadClient:
     """ Client implementation of D3 networking.
+
+    Receives datagrams on the multicast group and hands them to its ProtocolEngine, which parses and validates them.
     """
-    def __init__(self, validate_keys: Dict[int, VerifyKey], scope_id: int = 0, proto: Literal[4, 6] = 6):
+    def __init__(self, validate_keys: Dict[int, CheckKey], scope_id: int = 0, proto: Literal[4, 6] = 6,
+                 verification_engine: Optional[VerificationEngine] = None, rcvbuf_size: Optional[int] = None,
+                 ring_size: int = 64, replay_window: int = 64, sock: Optional[socket.socket] = None,
+                 metrics: Optional[Metrics] = None, reuse_port: bool = False,
+                 engine: Optional[ProtocolEngine] = None):
         """ Instantiate an AvailablePayloadClient
 
-        :param validate_keys: Mapping between team identifiers and their public keys. This is used to validate
-        message signatures.
-        :param scope_id: Scope id of the network interface to use.
+        :param validate_keys: Mapping between team identifiers and their public keys, or their shared secrets for
+        teams using a MAC scheme. This is used to validate message signatures, and sets the scheme of each team.
+        :param scope_id: Scope id of the network interface to use. With IPv4, 0 lets the system pick the interface and
+        other values are interface indexes (Linux only).
         :param proto: The network protocol to use (IPv4 or IPv6).
+        :param verification_engine: Engine used to verify signatures. A default engine with a cache of verified
+        messages is created if this is None.
+        :param rcvbuf_size: Size of the kernel receive buffer (SO_RCVBUF) in bytes. The system default is kept if
+        this is None.
+        :param ring_size: Amount of preallocated receive buffers. This is the largest batch recv_many can return.
+        :param replay_window: Amount of sequence numbers remembered for each team to detect replayed messages.
+        :param sock: Datagram socket to receive on instead of joining the multicast group. The socket must already
+        receive the group's traffic. Used to run the client over an in-process network.
+        :param metrics: Where to count accepted and dropped messages and time the receive path. A new Metrics is
+        created if this is None.
+        :param reuse_port: Whether to set SO_REUSEPORT, on platforms that support it, so that several processes can
+        bind the port.
+        :param engine: Engine to process the received datagrams with, e.g. one shared with clients on other paths so
+        that they share replay windows. Created from validate_keys, verification_engine, replay_window and metrics if
+        this is None, otherwise these are ignored.
         """
         self._port = PORT
         if proto == 6:
@@ -70,13 +196,40 @@ class AvailablePayloadClient:
             self._addr = V4_MULTICAST_GRP
 
         self._addr_info = socket.getaddrinfo(self._addr, None)[0]
-        self._socket = socket.socket(self._addr_info[0], socket.SOCK_DGRAM)  # Use UDP
+        if sock is None:
+            self._socket = socket.socket(self._addr_info[0], socket.SOCK_DGRAM)  # Use UDP
+            # Let several clients on the same host listen to the group.
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            if reuse_port and hasattr(socket, "SO_REUSEPORT"):
+                self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        else:
+            self._socket = sock
 
-        self._socket.bind(("", self._port))
-        self.validate_keys = validate_keys
+        if rcvbuf_size is not None:
+            self._socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf_size)
+        self._track_drops = sys.platform.startswith("linux")
+        if self._track_drops:
+            try:
+                self._socket.setsockopt(socket.SOL_SOCKET, SO_RXQ_OVFL, 1)
+            except OSError:
+                self._track_drops = False
+        self.kernel_drops = 0
+        """ Amount of datagrams dropped by the kernel because the receive buffer was full. Only updated by recv_many
+        on Linux.
+        """
+        self._recv_ring = [memoryview(bytearray(RECV_BUFFER_SIZE)) for _ in range(ring_size)]
+        self._ancbufsize = socket.CMSG_SPACE(_OVFL_COUNTER.size) if self._track_drops else 0
 
-        self._join_multicast_grp(proto, scope_id)
-        self.prev_seq_num = -1
+        self.engine = engine or ProtocolEngine(validate_keys, verification_engine=verification_engine,
+                                               replay_window=replay_window, metrics=metrics)
+        """ Parses and validates the received datagrams. The client only receives them.
+        """
+
+        if sock is None:
+            self._socket.bind(("", self._port))
+            self._join_multicast_grp(proto, scope_id)
+        self._pending: Deque[AvailablePayloadMessage] = deque()
+        self._dispatcher: Optional[SubscriptionDispatcher] = None
 
     def _join_multicast_grp(self, proto: Literal[4, 6], scope_id: int):
         grp = socket.inet_pton(self._addr_info[0], self._addr_info[4][0])
@@ -86,21 +239,100 @@ class AvailablePayloadClient:
             self._socket.setsockopt(socket.IPPROTO_IPV6, socket.IPV6_JOIN_GROUP, mreq)
         else:
             mreq = grp + struct.pack('=I', socket.INADDR_ANY)
+            if scope_id:
+                # struct ip_mreqn, which selects the interface by index (Linux).
+                mreq += struct.pack('=i', scope_id)
             self._socket.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
 
-    @staticmethod
-    def _validate_data(data: bytes) -> bool:
-        if len(data) < 10:
-            return False
+    @property
+    def validate_keys(self) -> Dict[int, CheckKey]:
+        """ Mapping between team identifiers and the keys their messages are verified with.
+        """
+        return self.engine.validate_keys
+
+    @property
+    def verification_engine(self) -> VerificationEngine:
+        """ Engine used to verify signatures.
+        """
+        return self.engine.verification_engine
 
-        return True
+    @property
+    def replay_protection(self) -> ReplayProtectionTable:
+        """ Replay window of each team.
+        """
+        return self.engine.replay_protection
+
+    @property
+    def prev_seq_num(self) -> int:
+        """ Sequence number of the latest message accepted, whatever its team. -1 if nothing was accepted yet.
+
+        Kept for compatibility: messages are checked against the replay window of their own team, see
+        replay_protection.
+        """
+        return self.engine.replay_protection.last_seq_num
+
+    @property
+    def metrics(self) -> Metrics:
+        """ Counts accepted and dropped messages and times the receive path.
+        """
+        return self.engine.metrics
+
+    @property
+    def drop_logger(self) -> RateLimitedLogger:
+        """ Logs dropped messages. Each drop reason is logged at most once per interval.
+        """
+        return self.engine.drop_logger
+
+    @property
+    def rcvbuf_size(self) -> int:
+        """ Size of the kernel receive buffer in bytes, as reported by the system.
+        """
+        return self._socket.getsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF)
 
     def close_connection(self):
-        """ Close the connection to the multicast group.
+        """ Stop dispatching to subscriptions and close the connection to the multicast group.
         """
-        self._socket.shutdown()
+        if self._dispatcher is not None:
+            self._dispatcher.stop()
         self._socket.close()
 
+    def subscribe(self, callback: Callback, teams: Optional[Sequence[int]] = None, on_change_only: bool = True,
+                  coalesce_ms: float = 0.0, validate: bool = True) -> Subscription:
+        """ Call a function with the messages received, on a background thread.
+
+        The first subscription starts a thread running the receive loop; the client must then not be used to
+        receive from other threads. Bursts of messages of a team are folded into the latest one, and messages that
+        do not change a team's payload size are skipped.
+
+        :param callback: Called with each delivered message.
+        :param teams: Teams to deliver messages of. Every team if None.
+        :param on_change_only: Whether to skip messages whose payload size did not change since the last delivered
+        message of their team.
+        :param coalesce_ms: Amount of milliseconds during which messages of a team are folded into the latest one.
+        0 only folds the messages received together.
+        :param validate: Whether to drop messages that have no valid signature or not. Must be the same for every
+        active subscription of the client.
+        :return: The subscription, to cancel it with unsubscribe.
+        """
+        if self._dispatcher is None:
+            self._dispatcher = SubscriptionDispatcher(self, validate=validate)
+
+        subscription = Subscription(callback, teams=teams, on_change_only=on_change_only, coalesce_ms=coalesce_ms)
+        self._dispatcher.add(subscription, validate)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """ Stop calling a subscription's callback.
+
+        Removing the last subscription stops the background thread, after which the client can receive with
+        recv_message and recv_many again.
+
+        :param subscription: A subscription returned by subscribe.
+        :return: None
+        """
+        if self._dispatcher is not None:
+            self._dispatcher.remove(subscription)
+
     def recv_message(self, validate: bool = True) -> Union[AvailablePayloadMessage, None]:
         """ Receive a message on the UDP socket.
 
@@ -109,31 +341,106 @@ class AvailablePayloadClient:
         :param validate: Whether to drop the message if it has no valid signature or not.
         :return: The message if it is valid, None otherwise.
         """
-        data, _ = self._socket.recvfrom(1500)
-        data.rstrip()
+        if self._pending:
+            return self._pending.popleft()
 
-        if not AvailablePayloadClient._validate_data(data):
-            print("Message dropped because of invalid message format.")
+        nbytes = self._socket.recv_into(self._recv_ring[0])
+        msgs = self.engine.receive(self._recv_ring[0][:nbytes], time.monotonic_ns(), validate)
+        if not msgs:
             return None
 
-        parsed_message = AvailablePayloadMessage.from_bytes(data)
+        # The other messages of a digest are returned by the next calls.
+        self._pending.extend(msgs[1:])
+        return msgs[0]
 
-        if not parsed_message.is_signed() and validate:
-            print("Message dropped because it was not signed.")
-            return None
+    def fileno(self) -> int:
+        """ File descriptor of the socket, to wait for datagrams with select or an event loop.
+        """
+        return self._socket.fileno()
 
-        if parsed_message.team_id in self.validate_keys.keys():
-            validate_key = self.validate_keys[parsed_message.team_id]
-        else:
-            validate_key = None
+    def wait_readable(self, timeout: Optional[float] = None) -> bool:
+        """ Wait for a datagram to be available on the socket.
 
-        if validate and not validate_msg(parsed_message.as_unsigned_bytes(), bytes(parsed_message.signature), validate_key):
-            print("Message dropped because the signature was not valid.")
-            return None
+        :param timeout: Maximum amount of seconds to wait. Waits forever if None.
+        :return: Whether a datagram is available.
+        """
+        return bool(select.select([self._socket], [], [], timeout)[0])
+
+    def _recv_into_ring(self, idx: int) -> int:
+        """ Receive a datagram in a buffer of the ring without blocking.
+
+        :param idx: Index of the buffer to fill.
+        :return: The size of the received datagram, or -1 if no datagram was waiting.
+        """
+        if not _MSG_DONTWAIT and not select.select([self._socket], [], [], 0)[0]:
+            return -1
+
+        try:
+            if self._track_drops:
+                nbytes, ancdata, _, _ = self._socket.recvmsg_into([self._recv_ring[idx]], self._ancbufsize,
+                                                                  _MSG_DONTWAIT)
+                for level, cmsg_type, cmsg_data in ancdata:
+                    if level == socket.SOL_SOCKET and cmsg_type == SO_RXQ_OVFL:
+                        self.kernel_drops = _OVFL_COUNTER.unpack_from(cmsg_data)[0]
+            else:
+                nbytes = self._socket.recv_into(self._recv_ring[idx], RECV_BUFFER_SIZE, _MSG_DONTWAIT)
+        except BlockingIOError:
+            return -1
+
+        return nbytes
+
+    def recv_many(self, max_msgs: int = 64, timeout: Optional[float] = None,
+                  validate: bool = True) -> List[AvailablePayloadMessage]:
+        """ Receive every waiting datagram, up to a maximum, in a single call.
+
+        Waits for a first datagram, then drains the socket into preallocated buffers without blocking and decodes
+        and validates the whole batch at once. No buffer is allocated to receive the datagrams.
+
+        :param max_msgs: Maximum amount of datagrams to receive. Capped to the ring size given at instantiation.
+        :param timeout: Maximum amount of seconds to wait for a first datagram. Waits forever if None.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :return: The valid messages, in the order they were received. Empty if the timeout expired.
+        """
+        msgs: List[AvailablePayloadMessage] = list(self._pending)
+        self._pending.clear()
+        if not self.wait_readable(0 if msgs else timeout):
+            return msgs
 
-        if not validate_seq_num(seq_num=parsed_message.seq_num, old_seq_num=self.prev_seq_num):
-            print("Message dropped because it was expired.")
-            return None  # Expired message
+        now = time.monotonic_ns()
+        for datagram in self._drain(max_msgs):
+            msgs += self.engine.receive(datagram, now, validate)
+
+        return msgs
+
+    def recv_raw_many(self, max_datagrams: Optional[int] = None,
+                      timeout: Optional[float] = None) -> List[memoryview]:
+        """ Receive every waiting datagram, up to a maximum, without parsing or validating them.
+
+        Waits for a first datagram, then drains the socket like recv_many does. The returned views point into the
+        client's receive buffers: they are only valid until the next call to a receive method, copy them to keep them.
+
+        :param max_datagrams: Maximum amount of datagrams to receive. Capped to the ring size given at instantiation,
+        which is the default.
+        :param timeout: Maximum amount of seconds to wait for a first datagram. Waits forever if None.
+        :return: Views on the received datagrams, in the order they were received. Empty if the timeout expired.
+        """
+        if not self.wait_readable(timeout):
+            return []
+        return self._drain(len(self._recv_ring) if max_datagrams is None else max_datagrams)
+
+    def _drain(self, max_msgs: int) -> List[memoryview]:
+        """ Receive every waiting datagram, up to a maximum, into the ring without blocking.
+
+        The returned views are only valid until the next call, as the ring's buffers are reused.
+
+        :param max_msgs: Maximum amount of datagrams to receive. Capped to the ring size.
+        :return: Views on the received datagrams, in the order they were received.
+        """
+        datagrams: List[memoryview] = []
+        for idx in range(min(max_msgs, len(self._recv_ring))):
+            nbytes = self._recv_into_ring(idx)
+            if nbytes < 0:
+                break
+            datagrams.append(self._recv_ring[idx][:nbytes])
 
-        self.prev_seq_num = parsed_message.seq_num
-        return parsed_message
+        return datagrams
@@ -0,0 +1,8 @@
+from .._lazy import lazy_exports
+
+__getattr__, __dir__, __all__ = lazy_exports(__name__, {
+    "DropPointTable": ".drop_points",
+    "listen_for_drop_point_infos": ".vehicle",
+    "SharedDropPointPublisher": ".shared_state",
+    "SharedDropPointReader": ".shared_state",
+})
@@ -0,0 +1,161 @@
+import heapq
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from ..message.message import AvailablePayloadMessage
+from ..transport.transport import AvailablePayloadClient
+
+
+class DropPointTable:
+    """ Latest drop point information of each team, kept up to date from a long-lived client.
+
+    Each team's latest message is kept for a limited time (TTL). Drop points are ranked by payload size in a heap
+    with lazy deletion, so the best drop point is answered in O(log n) amortized and the k best in O(k log n).
+    Ties are broken by team identifier.
+
+    The table is thread safe. It can be fed manually with update or by a background thread with start.
+    """
+    def __init__(self, ttl: float = 3.0, clock: Callable[[], float] = time.monotonic):
+        """ Instantiate a DropPointTable
+
+        :param ttl: Amount of seconds a team's message is considered up to date.
+        :param clock: Monotonic clock, in seconds, used to expire messages.
+        """
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: Dict[int, Tuple[AvailablePayloadMessage, float, int]] = {}
+        self._heap: List[Tuple[int, int, int]] = []
+        self._version = 0
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def __len__(self) -> int:
+        return len(self.snapshot())
+
+    def update(self, msg: AvailablePayloadMessage, received_at: Optional[float] = None):
+        """ Record the latest message of a team.
+
+        :param msg: A validated message.
+        :param received_at: When the message was received, on the table's clock. Defaults to now.
+        :return: None
+        """
+        if received_at is None:
+            received_at = self._clock()
+
+        with self._lock:
+            entry = self._entries.get(msg.team_id)
+            if entry is not None and entry[0].payload_size == msg.payload_size:
+                # The ranking did not change, the heap entry stays valid.
+                self._entries[msg.team_id] = (msg, received_at, entry[2])
+                return
+
+            self._version += 1
+            self._entries[msg.team_id] = (msg, received_at, self._version)
+            heapq.heappush(self._heap, (-msg.payload_size, msg.team_id, self._version))
+
+            if len(self._heap) > 2 * len(self._entries) + 16:
+                self._compact()
+
+    def _compact(self):
+        self._heap = [
+            (-msg.payload_size, team_id, version) for team_id, (msg, _, version) in self._entries.items()
+        ]
+        heapq.heapify(self._heap)
+
+    def _is_live(self, heap_entry: Tuple[int, int, int], now: float) -> bool:
+        """ Check a heap entry, forgetting its team if its message expired.
+        """
+        _, team_id, version = heap_entry
+        entry = self._entries.get(team_id)
+        if entry is None or entry[2] != version:
+            return False
+        if now - entry[1] > self.ttl:
+            del self._entries[team_id]
+            return False
+        return True
+
+    def best(self) -> Optional[AvailablePayloadMessage]:
+        """ The up to date drop point with the largest payload.
+
+        :return: The message of the best drop point, or None if no team is up to date.
+        """
+        now = self._clock()
+        with self._lock:
+            while self._heap:
+                if self._is_live(self._heap[0], now):
+                    return self._entries[self._heap[0][1]][0]
+                heapq.heappop(self._heap)
+        return None
+
+    def top_k(self, k: int) -> List[AvailablePayloadMessage]:
+        """ The up to date drop points with the largest payloads.
+
+        :param k: Maximum amount of drop points to return.
+        :return: The messages of the best drop points, best first.
+        """
+        now = self._clock()
+        with self._lock:
+            live: List[Tuple[int, int, int]] = []
+            while self._heap and len(live) < k:
+                heap_entry = heapq.heappop(self._heap)
+                if self._is_live(heap_entry, now):
+                    live.append(heap_entry)
+            for heap_entry in live:
+                heapq.heappush(self._heap, heap_entry)
+
+            return [self._entries[team_id][0] for _, team_id, _ in live]
+
+    def snapshot(self) -> Dict[int, AvailablePayloadMessage]:
+        """ Every up to date drop point.
+
+        :return: A mapping between each team identifier and its latest message.
+        """
+        now = self._clock()
+        with self._lock:
+            return {
+                team_id: msg for team_id, (msg, received_at, _) in self._entries.items()
+                if now - received_at <= self.ttl
+            }
+
+    def clear(self):
+        """ Forget every drop point.
+        """
+        with self._lock:
+            self._entries.clear()
+            self._heap.clear()
+
+    def feed(self, client: AvailablePayloadClient, validate: bool = True, poll_interval: float = 0.2):
+        """ Update the table from a client until stop is called. This is a blocking call.
+
+        :param client: A client joined to the multicast group.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :param poll_interval: Maximum amount of seconds between two checks of the stop flag.
+        :return: None
+        """
+        while not self._stop.is_set():
+            for msg in client.recv_many(timeout=poll_interval, validate=validate):
+                self.update(msg)
+
+    def start(self, client: AvailablePayloadClient, validate: bool = True):
+        """ Update the table from a client on a background thread.
+
+        :param client: A client joined to the multicast group. The client must not be used by another thread.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :return: None
+        """
+        if self._thread is not None:
+            raise RuntimeError("DropPointTable is already running.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.feed, args=(client, validate), name="d3-drop-points",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stop the background thread started with start.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
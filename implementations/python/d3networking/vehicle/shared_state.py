@@ -0,0 +1,258 @@
+import logging
+import struct
+import sys
+import threading
+import time
+from multiprocessing import shared_memory
+from typing import Dict, Optional, Tuple
+
+from ..message.message import AvailablePayloadMessage, MAX_MESSAGE_SIZE
+from ..transport.transport import AvailablePayloadClient
+
+DEFAULT_SEGMENT_NAME = "d3networking-drop-points"
+SEGMENT_MAGIC = b"D3SM"
+SEGMENT_VERSION = 1
+TEAM_SLOTS = 256
+
+_SEGMENT_HEADER = struct.Struct('<4sHHQ')
+_SEGMENT_HEADER_SIZE = 64
+_GENERATION_OFFSET = 8
+_SLOT_HEADER = struct.Struct('<QqH')
+_SLOT_SIZE = 576  # Slot header and largest message, rounded up to a multiple of 64 bytes.
+_SEQLOCK = struct.Struct('<Q')
+_PEEK = struct.Struct('<BBI')
+SEGMENT_SIZE = _SEGMENT_HEADER_SIZE + TEAM_SLOTS * _SLOT_SIZE
+
+_logger = logging.getLogger(__name__)
+
+_published_names = set()
+""" Segments created by this process, which the resource tracker already knows about.
+"""
+
+
+def _slot_offset(team_id: int) -> int:
+    return _SEGMENT_HEADER_SIZE + team_id * _SLOT_SIZE
+
+
+def _attach(name: str) -> shared_memory.SharedMemory:
+    """ Attach to an existing segment without letting this process destroy it when it exits.
+    """
+    if sys.version_info >= (3, 13):
+        return shared_memory.SharedMemory(name=name, track=False)
+
+    shm = shared_memory.SharedMemory(name=name)
+    if sys.platform != "win32" and shm._name not in _published_names:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedDropPointPublisher:
+    """ Publishes the latest validated message of each team in shared memory.
+
+    A single receiving process validates the traffic once and any amount of local processes read the result with
+    SharedDropPointReader. The segment starts with a 64 bytes header: the magic ``D3SM``, a 16 bit version, the
+    amount of slots and a 64 bit generation incremented on every publication. One 576 bytes slot per team
+    identifier follows, holding a 64 bit seqlock counter, the reception time in CLOCK_MONOTONIC nanoseconds, the
+    length of the message and the signed message as received.
+
+    Each slot is protected by a seqlock: the counter is odd while the slot is written. Readers never write to the
+    segment and retry when the counter changed during their read, so the publisher is never blocked.
+    """
+    def __init__(self, name: str = DEFAULT_SEGMENT_NAME):
+        """ Create the shared memory segment.
+
+        :param name: Name of the segment. Readers attach to it with the same name.
+        """
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=SEGMENT_SIZE)
+        _published_names.add(self.shm._name)
+        self._buf = self.shm.buf
+        self._buf[:SEGMENT_SIZE] = bytes(SEGMENT_SIZE)
+        _SEGMENT_HEADER.pack_into(self._buf, 0, SEGMENT_MAGIC, SEGMENT_VERSION, TEAM_SLOTS, 0)
+        self._generation = 0
+        self._scratch = bytearray(MAX_MESSAGE_SIZE)
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def publish(self, msg: AvailablePayloadMessage, received_ns: Optional[int] = None):
+        """ Publish the latest message of a team.
+
+        :param msg: A validated message.
+        :param received_ns: When the message was received, from time.monotonic_ns. Defaults to now.
+        :return: None
+        """
+        if received_ns is None:
+            received_ns = time.monotonic_ns()
+
+        offset = _slot_offset(msg.team_id)
+        with self._lock:
+            # Encoding may fail on a malformed message, it must happen before the slot is marked as being written.
+            size = msg.pack_into(self._scratch)
+            sequence = _SEQLOCK.unpack_from(self._buf, offset)[0]
+            _SEQLOCK.pack_into(self._buf, offset, sequence + 1)
+            start = offset + _SLOT_HEADER.size
+            self._buf[start: start + size] = memoryview(self._scratch)[:size]
+            _SLOT_HEADER.pack_into(self._buf, offset, sequence + 1, received_ns, size)
+            _SEQLOCK.pack_into(self._buf, offset, sequence + 2)
+
+            self._generation += 1
+            struct.pack_into('<Q', self._buf, _GENERATION_OFFSET, self._generation)
+
+    def feed(self, client: AvailablePayloadClient, validate: bool = True, poll_interval: float = 0.2):
+        """ Publish the messages received by a client until stop is called. This is a blocking call.
+
+        :param client: A client joined to the multicast group.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :param poll_interval: Maximum amount of seconds between two checks of the stop flag.
+        :return: None
+        """
+        while not self._stop.is_set():
+            for msg in client.recv_many(timeout=poll_interval, validate=validate):
+                try:
+                    self.publish(msg)
+                except (ValueError, struct.error):
+                    _logger.exception("Could not publish the message of team %d.", msg.team_id)
+
+    def start(self, client: AvailablePayloadClient, validate: bool = True):
+        """ Publish the messages received by a client on a background thread.
+
+        :param client: A client joined to the multicast group. The client must not be used by another thread.
+        :param validate: Whether to drop messages that have no valid signature or not.
+        :return: None
+        """
+        if self._thread is not None:
+            raise RuntimeError("SharedDropPointPublisher is already running.")
+        self._stop.clear()
+        self._thread = threading.Thread(target=self.feed, args=(client, validate), name="d3-shared-drop-points",
+                                        daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stop the background thread started with start.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def close(self):
+        """ Stop publishing and destroy the segment.
+        """
+        self.stop()
+        self._buf = None
+        self.shm.close()
+        self.shm.unlink()
+        _published_names.discard(self.shm._name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class SharedDropPointReader:
+    """ Lock-free reader of the segment written by a SharedDropPointPublisher.
+
+    Reads never block the publisher nor other readers. Small fields are read in place; full messages are copied out
+    of the slot, as a consistent snapshot cannot outlive the next publication.
+    """
+    def __init__(self, name: str = DEFAULT_SEGMENT_NAME, retries: int = 1000):
+        """ Attach to a publisher's segment.
+
+        :param name: Name of the segment.
+        :param retries: Maximum amount of attempts to read a slot that is being written.
+        """
+        self.shm = _attach(name)
+        self._buf = self.shm.buf
+        magic, version, slots, _ = _SEGMENT_HEADER.unpack_from(self._buf, 0)
+        if magic != SEGMENT_MAGIC or version != SEGMENT_VERSION or slots != TEAM_SLOTS:
+            self.shm.close()
+            raise IOError("Unsupported shared drop point segment.")
+        self.retries = retries
+
+    @property
+    def generation(self) -> int:
+        """ Amount of messages published so far. Compare it between calls to detect new messages cheaply.
+        """
+        return struct.unpack_from('<Q', self._buf, _GENERATION_OFFSET)[0]
+
+    def peek(self, team_id: int) -> Optional[Tuple[int, int, int]]:
+        """ Read the payload size and sequence number of a team without copying its message.
+
+        :param team_id: A team identifier.
+        :return: A (payload size, sequence number, reception time in monotonic nanoseconds) tuple, or None if the
+        team never published or the slot could not be read consistently.
+        """
+        offset = _slot_offset(team_id)
+        for _ in range(self.retries):
+            sequence, received_ns, size = _SLOT_HEADER.unpack_from(self._buf, offset)
+            if sequence & 1:
+                continue
+            _, payload_size, seq_num = _PEEK.unpack_from(self._buf, offset + _SLOT_HEADER.size)
+            if _SEQLOCK.unpack_from(self._buf, offset)[0] == sequence:
+                return (payload_size, seq_num, received_ns) if size else None
+        return None
+
+    def read(self, team_id: int) -> Optional[Tuple[AvailablePayloadMessage, int]]:
+        """ Read the latest message of a team.
+
+        :param team_id: A team identifier.
+        :return: A (message, reception time in monotonic nanoseconds) tuple, or None if the team never published or
+        the slot could not be read consistently.
+        """
+        offset = _slot_offset(team_id)
+        start = offset + _SLOT_HEADER.size
+        for _ in range(self.retries):
+            sequence, received_ns, size = _SLOT_HEADER.unpack_from(self._buf, offset)
+            if sequence & 1:
+                continue
+            data = bytes(self._buf[start: start + min(size, MAX_MESSAGE_SIZE)])
+            if _SEQLOCK.unpack_from(self._buf, offset)[0] == sequence:
+                return (AvailablePayloadMessage.from_bytes(data), received_ns) if size else None
+        return None
+
+    def snapshot(self, max_age: Optional[float] = None) -> Dict[int, AvailablePayloadMessage]:
+        """ The latest message of every team.
+
+        :param max_age: Ignore messages received more than this amount of seconds ago. Every message is returned
+        if None.
+        :return: A mapping between each team identifier and its latest message.
+        """
+        oldest = None if max_age is None else time.monotonic_ns() - int(max_age * 1e9)
+        msgs: Dict[int, AvailablePayloadMessage] = {}
+        for team_id in range(TEAM_SLOTS):
+            if not _SLOT_HEADER.unpack_from(self._buf, _slot_offset(team_id))[2]:
+                continue
+            entry = self.read(team_id)
+            if entry is not None and (oldest is None or entry[1] >= oldest):
+                msgs[team_id] = entry[0]
+        return msgs
+
+    def best(self, max_age: Optional[float] = None) -> Optional[AvailablePayloadMessage]:
+        """ The drop point with the largest payload. Ties are broken by team identifier.
+
+        :param max_age: Ignore messages received more than this amount of seconds ago.
+        :return: The message of the best drop point, or None if no team published.
+        """
+        msgs = self.snapshot(max_age)
+        if not msgs:
+            return None
+        return min(msgs.values(), key=lambda msg: (-msg.payload_size, msg.team_id))
+
+    def close(self):
+        """ Detach from the segment.
+        """
+        self._buf = None
+        self.shm.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
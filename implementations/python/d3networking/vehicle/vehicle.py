@@ -1,39 +1,66 @@
-import datetime
-
-from ..transport.transport import AvailablePayloadClient, AvailablePayloadMessage
-
-
-def listen_for_drop_point_infos(nb_seconds: int) -> list[AvailablePayloadMessage]:
-    """
-    Listen for drop point infos from the server for a given amount of time.
-
-    :param nb_seconds: The number of seconds to listen for drop point infos.
-    """
-
-    # Start client on IPv6
-    validate_keys = []
-    client = AvailablePayloadClient(validate_keys, proto=6)
-
-    received_infos: dict[int, AvailablePayloadMessage] = {}
-
-    end_time = datetime.datetime.now() + datetime.timedelta(seconds=nb_seconds)
-    while datetime.datetime.now() <= end_time:
-        msg: AvailablePayloadMessage = client.recv_message(validate=False)
-        
-        # Check if message was received properly
-        if msg is None:
-            continue
-
-        # Check if message content is valid
-        if msg.team_id < 0 or msg.team_id > 99:
-            print("Invalid message content received")
-            continue
-        
-        received_infos[msg.team_id] = msg
-    
-    client.close_connection()
-
-    return list(received_infos.values())
-        
-
-        
\ No newline at end of file
+import time
+from typing import Dict, Iterable, List, Mapping, Optional
+
+from ..crypto.signature.schemes import CheckKey
+from ..transport.transport import AvailablePayloadClient, AvailablePayloadMessage
+
+MAX_TEAM_ID = 99
+""" Largest team identifier considered valid drop point information.
+"""
+
+
+def listen_for_drop_point_infos(nb_seconds: float, expected_teams: Optional[Iterable[int]] = None,
+                                validate_keys: Optional[Mapping[int, CheckKey]] = None, quorum: Optional[int] = None,
+                                client: Optional[AvailablePayloadClient] = None,
+                                validate: Optional[bool] = None) -> List[AvailablePayloadMessage]:
+    """
+    Listen for drop point infos from the server for at most a given amount of time.
+
+    The deadline is kept on the monotonic clock and enforced while waiting for datagrams, so the call returns on time
+    even when nothing is received. It returns early as soon as enough of the expected teams have reported.
+
+    :param nb_seconds: The maximum number of seconds to listen for drop point infos.
+    :param expected_teams: Teams expected to report. Without a quorum, the call returns as soon as all of them have
+    reported. The call always waits for the deadline if this and quorum are None.
+    :param validate_keys: Mapping between team identifiers and their keys, used to create a client when none is given.
+    :param quorum: Amount of teams that must report before returning early. Counts expected teams only when
+    expected_teams is given, any team otherwise.
+    :param client: A client joined to the multicast group, reused across calls to avoid joining the group again.
+    A client is created, and closed before returning, if this is None.
+    :param validate: Whether to drop messages that have no valid signature or not. Defaults to True when the client
+    has keys.
+    :return: The latest message of each team that reported.
+    """
+    deadline = time.monotonic() + nb_seconds
+    expected = set(expected_teams) if expected_teams is not None else None
+    needed = quorum if quorum is not None else (len(expected) if expected is not None else None)
+
+    owns_client = client is None
+    if owns_client:
+        # Start client on IPv6
+        client = AvailablePayloadClient(dict(validate_keys or {}), proto=6)
+    if validate is None:
+        validate = len(client.validate_keys) > 0
+
+    received_infos: Dict[int, AvailablePayloadMessage] = {}
+    reported = 0
+    try:
+        while needed is None or reported < needed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+
+            for msg in client.recv_many(timeout=remaining, validate=validate):
+                # Check if message content is valid
+                if msg.team_id > MAX_TEAM_ID:
+                    client.metrics.count("invalid_team", msg.team_id)
+                    continue
+
+                if msg.team_id not in received_infos and (expected is None or msg.team_id in expected):
+                    reported += 1
+                received_infos[msg.team_id] = msg
+    finally:
+        if owns_client:
+            client.close_connection()
+
+    return list(received_infos.values())
@@ -1,10 +1,11 @@
 """ Client implementation for D3 networking
 
 Receives messages, validates their signatures and prints message information
-on the standard output.
+on the standard output when a team's payload changes.
 """
 
 from pathlib import Path
+from time import sleep
 
 from d3networking.crypto.key_storage.storage import load_keymap
 from d3networking.transport.transport import AvailablePayloadClient, AvailablePayloadMessage
@@ -16,7 +17,13 @@ validate_keys = load_keymap(store_path=Path("./demo.keys"), keys_amount=1)
 # Start client on IPv6
 client = AvailablePayloadClient(validate_keys, proto=6)
 
+
+def print_drop_point(msg: AvailablePayloadMessage):
+    print(f"Team {msg.team_id} has {msg.payload_size} containers available.")
+
+
+# Print each team's payload when it changes. Messages with no valid signature are dropped.
+client.subscribe(print_drop_point, on_change_only=True, coalesce_ms=100, validate=True)
+
 while True:
-    msg: AvailablePayloadMessage = client.recv_message(validate=True)  # Drops messages with no valid signature
-    if msg is not None:
-        print(f"Team {msg.team_id} has {msg.payload_size} containers available.")
+    sleep(1)
@@ -3,23 +3,29 @@
 Sends dummy data to a multicast group. The dummy data is signed using a pre-generated
 private key.
 
+The message is sent as soon as the payload changes, then repeated less and less often
+until it is only sent every 5 seconds.
+
 DO NOT USE THE SAME KEY FOR YOUR IMPLEMENTATION.
 """
 from nacl.signing import SigningKey
 from nacl.encoding import HexEncoder
 from time import sleep
-from d3networking.transport.transport import AvailablePayloadServer, AvailablePayloadMessage
+from d3networking.transport.transport import AvailablePayloadServer
+from d3networking.transport.scheduler import BroadcastScheduler
 
 SIGNING_KEY = b'd3d0ad95d720c6cf564210a3531d329577c72f763675adbd7dfd3ce2b23208c8'
+TEAM_ID = 1
 
 server = AvailablePayloadServer(SigningKey(SIGNING_KEY, encoder=HexEncoder), proto=6)
 
-seq_num: int = 0
-while True:
-    message = AvailablePayloadMessage(
-        team_id=1,
-        payload_size=2
-    )
+scheduler = BroadcastScheduler(min_interval=0.1, max_interval=5)
+scheduler.add_source(TEAM_ID, server, payload_size=2)
+scheduler.start()
 
-    server.send_message(message)
-    sleep(5)
+payload_size: int = 2
+while True:
+    # Replace with the actual amount of containers on the scale.
+    sleep(30)
+    payload_size = (payload_size + 1) % 4
+    scheduler.update(TEAM_ID, payload_size)
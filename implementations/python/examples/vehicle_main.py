@@ -2,23 +2,31 @@
 
 Example of a vehicle implementation using the D3 networking library.
 """
-from d3networking.message.message import AvailablePayloadMessage
-from d3networking.vehicle.vehicle import listen_for_drop_point_infos
+from time import sleep
 
-NB_SECONDS_TO_LISTEN = 3
+from d3networking.transport.transport import AvailablePayloadClient
+from d3networking.vehicle.drop_points import DropPointTable
+
+DROP_POINT_TTL = 3
+
+# Start client on IPv6 and keep the drop point table up to date in the background
+client = AvailablePayloadClient({}, proto=6)
+drop_points = DropPointTable(ttl=DROP_POINT_TTL)
+drop_points.start(client, validate=False)
 
 decision_picked = False
 while not decision_picked:
-    received_infos: list[AvailablePayloadMessage] = listen_for_drop_point_infos(NB_SECONDS_TO_LISTEN)
-    
-    if len(received_infos) == 0:
+    # Example of a simple decision making process, we take the one with the max payload size
+    chosen_msg = drop_points.best()
+
+    if chosen_msg is None:
+        sleep(0.1)
         continue
 
-    # Example of a simple decision making process, we take the one with the max payload size
-    chosen_msg = max(received_infos, key=lambda msg: msg.payload_size)
     print(f"Chosen drop point: ZC{chosen_msg.team_id}")
-    
+
     # Exit the loop and let the vehicle go to the chosen drop point
     decision_picked = True
-    
 
+drop_points.stop()
+client.close_connection()
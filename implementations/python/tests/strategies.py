@@ -0,0 +1,45 @@
+""" Hypothesis strategies building messages, digests and damaged datagrams.
+"""
+from hypothesis import strategies as st
+
+from d3networking.message.digest import DigestMessage, MAX_DIGEST_RECORDS
+from d3networking.message.message import AvailablePayloadMessage, MAX_MESSAGE_SIZE, MAX_SIGNATURE_SIZE
+from d3networking.processing.processing import INT_MAX_VAL
+
+team_ids = st.integers(0, 254)
+payload_sizes = st.integers(0, 255)
+seq_nums = st.integers(0, INT_MAX_VAL)
+signatures = st.one_of(st.sampled_from([b""]), st.binary(min_size=8, max_size=64),
+                       st.binary(max_size=MAX_SIGNATURE_SIZE))
+datagrams = st.binary(max_size=1500)
+""" Anything a socket can return.
+"""
+
+
+@st.composite
+def messages(draw, signature=signatures) -> AvailablePayloadMessage:
+    sig = draw(signature)
+    return AvailablePayloadMessage(draw(team_ids), draw(payload_sizes), draw(seq_nums), len(sig), bytearray(sig))
+
+
+@st.composite
+def digests(draw) -> DigestMessage:
+    records = draw(st.lists(messages(signature=st.just(b"")), max_size=MAX_DIGEST_RECORDS))
+    sig = draw(st.binary(max_size=64))
+    return DigestMessage(draw(team_ids), records, draw(seq_nums), len(sig), bytearray(sig))
+
+
+@st.composite
+def damaged(draw, datagram: bytes) -> bytes:
+    """ A datagram truncated, extended, or with some of its bits flipped.
+    """
+    kind = draw(st.sampled_from(["truncate", "extend", "flip"]))
+    if kind == "truncate":
+        return datagram[:draw(st.integers(0, max(len(datagram) - 1, 0)))]
+    if kind == "extend":
+        return datagram + draw(st.binary(min_size=1, max_size=MAX_MESSAGE_SIZE))
+
+    flipped = bytearray(datagram)
+    for position in draw(st.lists(st.integers(0, len(datagram) - 1), min_size=1, max_size=4, unique=True)):
+        flipped[position] ^= 1 << draw(st.integers(0, 7))
+    return bytes(flipped)
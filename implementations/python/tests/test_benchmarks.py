@@ -0,0 +1,113 @@
+""" Benchmarks of the hot paths, run with pytest-benchmark, and the allocation budgets of bench.regression.
+
+Compare runs with ``pytest tests/test_benchmarks.py --benchmark-autosave --benchmark-compare``.
+"""
+import logging
+
+import pytest
+from nacl.signing import SigningKey
+
+from d3networking.bench import regression
+from d3networking.crypto.signature.schemes import KEY_TYPE_BLAKE2B, MacKey
+from d3networking.message.batch import MessageBatch
+from d3networking.message.message import AvailablePayloadMessage
+from d3networking.processing.engine import ProtocolEngine
+
+SIGNING_KEY = SigningKey(bytes(range(32)))
+MAC_KEY = MacKey(KEY_TYPE_BLAKE2B, bytes(32))
+
+
+@pytest.fixture(autouse=True, scope="module")
+def quiet_drops():
+    logger = logging.getLogger("d3networking")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    yield
+    logger.setLevel(level)
+
+
+@pytest.fixture
+def datagram() -> bytes:
+    return ProtocolEngine(signing_key=SIGNING_KEY).encode_message(AvailablePayloadMessage(3, 2))
+
+
+@pytest.fixture
+def receiver() -> ProtocolEngine:
+    return ProtocolEngine({3: SIGNING_KEY.verify_key, 4: MAC_KEY})
+
+
+def test_encode_message(benchmark):
+    sender = ProtocolEngine(signing_key=MAC_KEY)
+    msg = AvailablePayloadMessage(4, 2)
+    benchmark(sender.encode_message, msg)
+
+
+def test_encode_into(benchmark):
+    msg = AvailablePayloadMessage(3, 2, 1, 64, bytearray(64))
+    buffer = bytearray(600)
+    benchmark(msg.pack_into, buffer)
+
+
+def test_decode(benchmark, datagram):
+    benchmark(AvailablePayloadMessage.from_bytes, datagram)
+
+
+def test_receive_accepted(benchmark, receiver):
+    sender = ProtocolEngine(signing_key=MAC_KEY)
+    datagrams = iter([sender.encode_message(AvailablePayloadMessage(4, 2)) for _ in range(20_000)])
+    result = benchmark.pedantic(receiver.receive_message, setup=lambda: ((next(datagrams),), {}), rounds=10_000)
+    assert result is not None
+
+
+def test_receive_cached_signature(benchmark, receiver):
+    sender = ProtocolEngine(signing_key=SIGNING_KEY)
+    template = sender.encode_message(AvailablePayloadMessage(3, 2))
+    receiver.receive_message(template)
+
+    def setup():
+        # Same signed header, so the signature is found in the verification cache, with a fresh replay window.
+        receiver.replay_protection.reset(3)
+        return (template,), {}
+
+    assert benchmark.pedantic(receiver.receive_message, setup=setup, rounds=2_000) is not None
+
+
+def test_reject_junk(benchmark, receiver):
+    assert benchmark(receiver.receive_message, b"\x03" * 9) is None
+
+
+def test_reject_unknown_team(benchmark, receiver, datagram):
+    assert benchmark(receiver.receive_message, bytes([9]) + datagram[1:]) is None
+
+
+def test_reject_replayed(benchmark, receiver, datagram):
+    receiver.receive_message(datagram)
+    assert benchmark(receiver.receive_message, datagram) is None
+
+
+def test_receive_digest(benchmark, receiver):
+    gateway = ProtocolEngine(signing_key=MAC_KEY, gateway_id=4)
+    records = [AvailablePayloadMessage(team_id, 2, 1) for team_id in range(40)]
+    datagrams = iter([gateway.encode_digest(records) for _ in range(5_000)])
+    benchmark.pedantic(receiver.receive_digest, setup=lambda: ((next(datagrams),), {}), rounds=2_000)
+
+
+def test_filter_teams(benchmark):
+    batch = MessageBatch.from_datagrams(
+        AvailablePayloadMessage(seq_num % 40, 2, seq_num, 64, bytearray(64)).as_bytes() for seq_num in range(10_000))
+    filtered = benchmark(batch.filter_teams, range(0, 40, 2))
+    assert len(filtered) == 5_000
+
+
+@pytest.mark.parametrize("operation", sorted(regression.BUDGETS))
+def test_allocation_budget(operation, allocations):
+    """ Memory blocks per message are machine independent, unlike the time budgets, so they gate every run.
+    """
+    result = allocations[operation]
+    assert result["blocks_per_msg"] <= result["blocks_budget"] + 0.05, result
+
+
+@pytest.fixture(scope="module")
+def allocations():
+    # Time budgets vary with the machine, only the allocations are checked here.
+    return regression.run(time_scale=float("inf"))
@@ -0,0 +1,44 @@
+import socket
+
+import pytest
+
+from d3networking.capture.capture import CaptureWriter, read_capture, record
+from d3networking.transport.transport import AvailablePayloadClient
+
+
+@pytest.fixture
+def loopback():
+    receiver = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    receiver.bind(("127.0.0.1", 0))
+    sender = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    yield sender, receiver
+    sender.close()
+    receiver.close()
+
+
+def test_raw_receive_returns_datagrams_without_validating(loopback):
+    sender, receiver = loopback
+    client = AvailablePayloadClient({}, sock=receiver, ring_size=4)
+    assert client.recv_raw_many(timeout=0) == []
+
+    datagrams = [bytes([idx]) * (idx + 1) for idx in range(6)]
+    for datagram in datagrams:
+        sender.sendto(datagram, receiver.getsockname())
+    first = [bytes(view) for view in client.recv_raw_many(timeout=1.0)]
+    second = [bytes(view) for view in client.recv_raw_many(max_datagrams=1, timeout=1.0)]
+    third = [bytes(view) for view in client.recv_raw_many(timeout=1.0)]
+    assert (first, second, third) == (datagrams[:4], datagrams[4:5], datagrams[5:])
+
+
+@pytest.mark.parametrize("capture_format", ["d3cap", "pcap"])
+def test_record_writes_every_datagram(loopback, tmp_path, capture_format):
+    sender, receiver = loopback
+    client = AvailablePayloadClient({}, sock=receiver)
+    datagrams = [b"", b"junk", bytes(range(40))]
+    for datagram in datagrams:
+        sender.sendto(datagram, receiver.getsockname())
+
+    path = tmp_path / f"capture.{capture_format}"
+    with CaptureWriter(path, capture_format, proto=4) as writer:
+        assert record(client, writer, duration=1.0, max_datagrams=len(datagrams)) == len(datagrams)
+    assert [datagram for _, datagram in read_capture(path)] == datagrams
@@ -0,0 +1,91 @@
+import pytest
+from click.testing import CliRunner
+from nacl.encoding import HexEncoder
+from nacl.signing import SigningKey
+
+from d3networking.cli.cli import app
+from d3networking.crypto.key_storage.keystore import KeyStore
+from d3networking.crypto.key_storage.storage import load_keymap
+
+
+def _generate(tmp_path, *options):
+    return CliRunner().invoke(app, ["generate-keypairs", "3", "--out-dir", str(tmp_path / "keys"),
+                                    "--keystore", str(tmp_path / "keys.d3ks"), *options])
+
+
+def test_generate_keypairs_writes_matching_private_and_public_keys(tmp_path):
+    result = _generate(tmp_path, "--first-team", "5")
+    assert result.exit_code == 0, result.output
+
+    keystore = KeyStore(tmp_path / "keys.d3ks", poll_interval=None)
+    assert sorted(keystore) == [5, 6, 7]
+    for team_id in keystore:
+        key_path = tmp_path / "keys" / f"team_{team_id}.key"
+        assert key_path.stat().st_mode & 0o777 == 0o600
+        assert SigningKey(key_path.read_bytes(), encoder=HexEncoder).verify_key == keystore[team_id]
+    keystore.close()
+
+
+def test_generate_keypairs_checks_every_destination_before_writing(tmp_path):
+    (tmp_path / "keys").mkdir()
+    (tmp_path / "keys" / "team_3.key").write_text("existing")
+    result = _generate(tmp_path)
+    assert result.exit_code != 0
+    assert sorted(path.name for path in (tmp_path / "keys").iterdir()) == ["team_3.key"]
+    assert not (tmp_path / "keys.d3ks").exists()
+
+
+def test_generate_keypairs_removes_written_keys_on_failure(tmp_path):
+    (tmp_path / "keys" / "team_2.key").mkdir(parents=True)
+    result = _generate(tmp_path, "--overwrite")
+    assert result.exit_code != 0
+    assert "team_2.key" in result.output
+    assert sorted(path.name for path in (tmp_path / "keys").iterdir()) == ["team_2.key"]
+    assert not (tmp_path / "keys.d3ks").exists()
+
+
+def _public_hex(team_id: int) -> str:
+    return SigningKey(bytes([team_id]) * 32).verify_key.encode(encoder=HexEncoder).decode()
+
+
+def test_generate_keypair_prints_a_keypair():
+    result = CliRunner().invoke(app, ["generate-keypair"])
+    assert result.exit_code == 0, result.output
+    assert result.output.strip()
+
+
+@pytest.mark.parametrize("source_name, contents", [
+    ("keys.csv", "team_id,public_key\n1,KEY_1\n# Spare crane\n9,KEY_9\n"),
+    ("keys.json", '{"1": "KEY_1", "9": "KEY_9"}'),
+    ("list.json", '[{"team_id": 1, "public_key": "KEY_1"}, {"team_id": 9, "public_key": "KEY_9"}]'),
+])
+def test_import_keymap(tmp_path, source_name, contents):
+    source = tmp_path / source_name
+    source.write_text(contents.replace("KEY_1", _public_hex(1)).replace("KEY_9", _public_hex(9)))
+    keystore_path = tmp_path / "keys.d3ks"
+
+    result = CliRunner().invoke(app, ["import-keymap", str(source), str(keystore_path)])
+    assert result.exit_code == 0, result.output
+    assert {team_id: key.encode(encoder=HexEncoder).decode() for team_id, key in load_keymap(keystore_path).items()} \
+        == {1: _public_hex(1), 9: _public_hex(9)}
+
+    result = CliRunner().invoke(app, ["import-keymap", str(source), str(keystore_path)])
+    assert result.exit_code != 0 and "--overwrite" in result.output
+
+
+@pytest.mark.parametrize("contents", ["1,nothex\n", "300,KEY_1\n", "1,KEY_1\n1,KEY_1\n", "1\n"])
+def test_import_keymap_rejects_bad_sources(tmp_path, contents):
+    source = tmp_path / "keys.csv"
+    source.write_text(contents.replace("KEY_1", _public_hex(1)))
+    result = CliRunner().invoke(app, ["import-keymap", str(source), str(tmp_path / "keys.d3ks")])
+    assert result.exit_code != 0
+    assert "Traceback" not in result.output
+    assert not (tmp_path / "keys.d3ks").exists()
+
+
+def test_store_sign_keys_reads_keys_from_the_prompt(tmp_path):
+    keystore_path = tmp_path / "keys.d3ks"
+    result = CliRunner().invoke(app, ["store-sign-keys", "--amount", "2", str(keystore_path)],
+                                input=f"{_public_hex(1)}\n{_public_hex(2)}\n")
+    assert result.exit_code == 0, result.output
+    assert sorted(load_keymap(keystore_path)) == [1, 2]
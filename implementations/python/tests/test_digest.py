@@ -0,0 +1,34 @@
+from hypothesis import given
+
+from d3networking.exceptions.exceptions import InvalidMessageException
+from d3networking.message.digest import DigestMessage, unpack_digest_header
+
+from .strategies import damaged, datagrams, digests
+
+
+@given(digests())
+def test_round_trip(digest):
+    datagram = digest.as_bytes()
+    assert DigestMessage.from_bytes(datagram) == digest
+
+    header = unpack_digest_header(datagram)
+    assert (header.gateway_id, header.count, header.seq_num, header.sig_size) == \
+        (digest.gateway_id, len(digest.records), digest.seq_num, digest.sig_size)
+    assert datagram[:header.signed_size] == digest.as_unsigned_bytes()
+
+
+@given(datagrams)
+def test_decoder_only_raises_invalid_message(data):
+    try:
+        digest = DigestMessage.from_bytes(data)
+    except InvalidMessageException:
+        return
+    assert digest.as_bytes() == data
+
+
+@given(digests().flatmap(lambda digest: damaged(digest.as_bytes())))
+def test_damaged_digests_only_raise_invalid_message(data):
+    try:
+        DigestMessage.from_bytes(data)
+    except InvalidMessageException:
+        pass
@@ -0,0 +1,67 @@
+from d3networking.message.message import AvailablePayloadMessage
+from d3networking.vehicle.drop_points import DropPointTable
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def _table(ttl: float = 3.0):
+    clock = FakeClock()
+    return DropPointTable(ttl=ttl, clock=clock), clock
+
+
+def test_best_and_top_k_rank_by_payload_then_team():
+    table, _ = _table()
+    for team_id, payload_size in ((4, 2), (1, 5), (3, 5), (2, 0)):
+        table.update(AvailablePayloadMessage(team_id, payload_size))
+
+    assert table.best().team_id == 1
+    assert [msg.team_id for msg in table.top_k(3)] == [1, 3, 4]
+    assert [msg.team_id for msg in table.top_k(10)] == [1, 3, 4, 2]
+    assert table.best().team_id == 1
+
+
+def test_messages_expire_after_the_ttl():
+    table, clock = _table(ttl=3.0)
+    table.update(AvailablePayloadMessage(1, 9))
+    clock.now = 2.0
+    table.update(AvailablePayloadMessage(2, 1))
+
+    clock.now = 3.0
+    assert table.best().team_id == 1
+    clock.now = 3.5
+    assert table.best().team_id == 2
+    assert set(table.snapshot()) == {2}
+    clock.now = 5.5
+    assert table.best() is None and table.top_k(5) == [] and len(table) == 0
+
+
+def test_unchanged_payload_refreshes_the_team():
+    table, clock = _table(ttl=3.0)
+    table.update(AvailablePayloadMessage(1, 9, seq_num=0))
+    clock.now = 2.5
+    table.update(AvailablePayloadMessage(1, 9, seq_num=1))
+    clock.now = 5.0
+    assert table.best().seq_num == 1
+
+
+def test_payload_change_replaces_the_ranking():
+    table, _ = _table()
+    table.update(AvailablePayloadMessage(1, 9))
+    table.update(AvailablePayloadMessage(2, 5))
+    table.update(AvailablePayloadMessage(1, 0))
+    assert [msg.team_id for msg in table.top_k(2)] == [2, 1]
+
+
+def test_heap_stays_bounded_under_churn():
+    table, _ = _table()
+    for step in range(10_000):
+        table.update(AvailablePayloadMessage(step % 4, step % 7))
+    assert len(table._heap) <= 2 * 4 + 16
+    table.clear()
+    assert table.best() is None
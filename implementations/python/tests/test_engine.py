@@ -0,0 +1,137 @@
+import logging
+
+import pytest
+from hypothesis import given, settings, strategies as st
+from nacl.signing import SigningKey
+
+from d3networking.bench import fuzz
+from d3networking.crypto.signature.schemes import KEY_TYPE_BLAKE2B, KEY_TYPE_HMAC_SHA256, MacKey
+from d3networking.message.message import AvailablePayloadMessage
+from d3networking.processing.engine import ProtocolEngine
+from d3networking.processing.processing import INT_MAX_VAL
+
+from .strategies import damaged, datagrams, payload_sizes, seq_nums, team_ids
+
+GATEWAY_ID = 200
+KEYS = {
+    "ed25519": SigningKey(bytes(range(32))),
+    "hmac-sha256": MacKey(KEY_TYPE_HMAC_SHA256, bytes(32)),
+    "blake2b": MacKey(KEY_TYPE_BLAKE2B, bytes(range(32))),
+}
+schemes = st.sampled_from(sorted(KEYS))
+
+
+def _check_key(scheme: str):
+    key = KEYS[scheme]
+    return key if isinstance(key, MacKey) else key.verify_key
+
+
+def _receiver(scheme: str, **options) -> ProtocolEngine:
+    check_key = _check_key(scheme)
+    return ProtocolEngine({**{team_id: check_key for team_id in range(255)}, GATEWAY_ID: check_key}, **options)
+
+
+@pytest.fixture(autouse=True, scope="module")
+def quiet_drops():
+    logger = logging.getLogger("d3networking")
+    level = logger.level
+    logger.setLevel(logging.CRITICAL)
+    yield
+    logger.setLevel(level)
+
+
+@given(schemes, team_ids, st.lists(payload_sizes, min_size=1, max_size=20), seq_nums)
+def test_signed_messages_are_accepted_in_order(scheme, team_id, payloads, first_seq_num):
+    sender = ProtocolEngine(signing_key=KEYS[scheme])
+    sender.seq_num = first_seq_num
+    receiver = _receiver(scheme)
+
+    for payload_size in payloads:
+        msg = AvailablePayloadMessage(team_id, payload_size)
+        accepted = receiver.receive(sender.encode_message(msg), timestamp=1)
+        assert accepted == [msg]
+    assert sender.seq_num == (first_seq_num + len(payloads)) % (INT_MAX_VAL + 1)
+    assert receiver.last_accepted == {team_id: 1}
+
+
+@given(schemes, team_ids, payload_sizes, st.data())
+def test_damaged_messages_are_rejected(scheme, team_id, payload_size, data):
+    datagram = ProtocolEngine(signing_key=KEYS[scheme]).encode_message(AvailablePayloadMessage(team_id, payload_size))
+    tampered = data.draw(damaged(datagram))
+    accepted = _receiver(scheme).receive(tampered)
+    if tampered[:len(datagram)] == datagram:
+        # Only trailing bytes were added, the message itself is intact.
+        assert len(accepted) == 1
+    else:
+        assert accepted == []
+
+
+@given(schemes, datagrams, st.booleans())
+def test_arbitrary_datagrams_never_raise(scheme, data, validate):
+    receiver = _receiver(scheme, event_log_size=4)
+    msgs = receiver.receive(data, timestamp=0, validate=validate)
+    assert all(isinstance(msg, AvailablePayloadMessage) for msg in msgs)
+    if validate:
+        assert msgs == []
+    assert len(receiver.events()) <= 4
+
+
+@given(schemes, team_ids, payload_sizes)
+def test_replayed_messages_are_rejected(scheme, team_id, payload_size):
+    datagram = ProtocolEngine(signing_key=KEYS[scheme]).encode_message(AvailablePayloadMessage(team_id, payload_size))
+    receiver = _receiver(scheme, event_log_size=8)
+
+    assert len(receiver.receive(datagram)) == 1
+    assert receiver.receive(datagram, timestamp=5) == []
+    assert [(event.kind, event.team_id, event.timestamp) for event in receiver.events()] == \
+        [("expired", team_id, 5)]
+
+
+def test_wrong_scheme_is_rejected():
+    datagram = ProtocolEngine(signing_key=KEYS["hmac-sha256"]).encode_message(AvailablePayloadMessage(1, 2))
+    assert _receiver("blake2b").receive(datagram) == []
+    assert _receiver("ed25519").receive(datagram) == []
+
+
+@given(schemes, st.lists(st.tuples(team_ids, payload_sizes, seq_nums), max_size=60, unique_by=lambda r: r[0]))
+def test_digest_records_are_accepted_once(scheme, records):
+    gateway = ProtocolEngine(signing_key=KEYS[scheme], gateway_id=GATEWAY_ID)
+    msgs = [AvailablePayloadMessage(*record) for record in records]
+    receiver = _receiver(scheme)
+
+    accepted = []
+    for datagram in gateway.encode_digests(msgs):
+        accepted += receiver.receive(datagram)
+        assert receiver.receive(datagram) == []
+    assert accepted == msgs
+
+
+@given(schemes, st.lists(st.tuples(team_ids, payload_sizes, seq_nums), min_size=1, max_size=40,
+                         unique_by=lambda r: r[0]), st.data())
+def test_damaged_digests_are_rejected(scheme, records, data):
+    gateway = ProtocolEngine(signing_key=KEYS[scheme], gateway_id=GATEWAY_ID)
+    datagram = gateway.encode_digest([AvailablePayloadMessage(*record) for record in records])
+    tampered = data.draw(damaged(datagram))
+    assert _receiver(scheme).receive(tampered) == []
+
+
+@given(st.lists(st.tuples(team_ids, seq_nums), min_size=1, max_size=40, unique_by=lambda r: r[0]),
+       st.integers(2, 4))
+def test_digest_record_filter_leaves_other_teams_untouched(records, workers):
+    gateway = ProtocolEngine(signing_key=KEYS["blake2b"], gateway_id=GATEWAY_ID)
+    datagram = gateway.encode_digest([AvailablePayloadMessage(team_id, 1, seq_num) for team_id, seq_num in records])
+
+    for worker_idx in range(workers):
+        receiver = _receiver("blake2b")
+        accepted = receiver.receive_digest(datagram, record_filter=lambda team_id: team_id % workers == worker_idx)
+        assert [msg.team_id for msg in accepted] == \
+            [team_id for team_id, _ in records if team_id % workers == worker_idx]
+        for team_id, _ in records:
+            if team_id % workers != worker_idx:
+                assert receiver.replay_protection.window(team_id) is None
+
+
+@settings(max_examples=10, deadline=None)
+@given(st.integers(0, 2 ** 32 - 1))
+def test_fuzz_harness_finds_nothing(seed):
+    assert fuzz.run(iterations=200, seed=seed)["failures"] == []
@@ -0,0 +1,150 @@
+import os
+import struct
+import zlib
+
+import pytest
+from nacl.signing import SigningKey
+
+from d3networking.crypto.key_storage.keystore import KEYSTORE_MAGIC, KEYSTORE_VERSION, KeyStore, write_keystore
+from d3networking.crypto.key_storage.storage import load_keymap
+from d3networking.crypto.signature.schemes import KEY_TYPE_BLAKE2B, KEY_TYPE_ED25519, KEY_TYPE_HMAC_SHA256, MacKey
+
+_HEADER = struct.Struct('<4sBBHII')
+_INDEX = struct.Struct('<256I')
+UNKNOWN_KEY_TYPE = 0xEE
+
+
+def _raw_keystore(path, entries):
+    """ Write a keystore with arbitrary entries and a valid checksum, bypassing write_keystore's checks.
+    """
+    offsets = [0] * 256
+    body = bytearray()
+    for team_id, (key_type, key_bytes) in entries.items():
+        offsets[team_id] = _HEADER.size + _INDEX.size + len(body)
+        body += bytes([key_type, len(key_bytes)]) + key_bytes
+    body = _INDEX.pack(*offsets) + body
+    path.write_bytes(_HEADER.pack(KEYSTORE_MAGIC, KEYSTORE_VERSION, 0, len(entries), zlib.crc32(body), len(body))
+                     + body)
+
+
+def test_wrong_size_ed25519_key_fails_validation(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    _raw_keystore(path, {1: (KEY_TYPE_ED25519, bytes(31))})
+    with pytest.raises(IOError):
+        KeyStore(path)
+
+
+def test_entry_outside_the_file_fails_validation(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    _raw_keystore(path, {1: (KEY_TYPE_HMAC_SHA256, bytes(32))})
+    data = bytearray(path.read_bytes())
+    struct.pack_into('<I', data, _HEADER.size + 4, len(data) - 1)
+    body = bytes(data[_HEADER.size:])
+    struct.pack_into('<I', data, 8, zlib.crc32(body))
+    path.write_bytes(data)
+    with pytest.raises(IOError):
+        KeyStore(path)
+
+
+def test_unknown_key_types_are_skipped(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    verify_key = SigningKey(bytes(32)).verify_key
+    _raw_keystore(path, {1: (KEY_TYPE_ED25519, verify_key.encode()), 2: (UNKNOWN_KEY_TYPE, bytes(16))})
+
+    keystore = KeyStore(path, poll_interval=None)
+    assert list(keystore) == [1] and len(keystore) == 1
+    assert keystore.key_type(2) == UNKNOWN_KEY_TYPE
+    with pytest.raises(KeyError):
+        keystore[2]
+    keystore.close()
+    assert load_keymap(path) == {1: verify_key}
+
+
+def test_write_rejects_keys_that_do_not_fit(tmp_path):
+    with pytest.raises(ValueError):
+        write_keystore({1: MacKey(KEY_TYPE_HMAC_SHA256, bytes(256))}, tmp_path / "long.d3ks")
+    with pytest.raises(ValueError):
+        write_keystore({1: bytes(31)}, tmp_path / "short.d3ks")
+    assert not list(tmp_path.iterdir())
+
+
+def _keymap(*team_ids):
+    return {team_id: SigningKey(bytes([team_id]) * 32).verify_key for team_id in team_ids}
+
+
+def _replace(path, keymap):
+    """ Rewrite a keystore, making sure its modification time changes even on coarse clocks.
+    """
+    mtime_ns = path.stat().st_mtime_ns
+    write_keystore(keymap, path, overwrite=True)
+    os.utime(path, ns=(mtime_ns + 1_000_000, mtime_ns + 1_000_000))
+
+
+def test_round_trip_with_every_key_type(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    keymap = {**_keymap(1, 200), 7: MacKey(KEY_TYPE_HMAC_SHA256, b"secret"), 8: MacKey(KEY_TYPE_BLAKE2B, bytes(64))}
+    write_keystore(keymap, path)
+    keystore = KeyStore(path, poll_interval=None)
+    assert dict(keystore) == keymap
+    assert keystore.raw_key(7) == b"secret" and keystore.key_type(8) == KEY_TYPE_BLAKE2B
+    assert keystore.raw_key(3) is None and 3 not in keystore and 300 not in keystore
+    keystore.close()
+
+
+@pytest.mark.parametrize("offset", [0, 4, _HEADER.size + 8, -1])
+def test_damaged_file_is_rejected(tmp_path, offset):
+    path = tmp_path / "keys.d3ks"
+    write_keystore(_keymap(1, 2), path)
+    data = bytearray(path.read_bytes())
+    data[offset] ^= 0xFF
+    path.write_bytes(data)
+    with pytest.raises(IOError):
+        KeyStore(path)
+
+
+def test_truncated_file_is_rejected(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    write_keystore(_keymap(1), path)
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(IOError):
+        KeyStore(path)
+
+
+def test_changed_file_is_reloaded(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    write_keystore(_keymap(1), path)
+    keystore = KeyStore(path, poll_interval=0)
+    assert keystore[1] == _keymap(1)[1]
+
+    _replace(path, _keymap(2))
+    assert keystore[2] == _keymap(2)[2]
+    assert 1 not in keystore
+    assert keystore.reloads == 1
+    assert not keystore.reload_if_changed()
+    keystore.close()
+
+
+def test_invalid_replacement_keeps_the_previous_keys(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    write_keystore(_keymap(1), path)
+    keystore = KeyStore(path, poll_interval=0)
+    _replace(path, _keymap(2))
+    data = bytearray(path.read_bytes())
+    data[-1] ^= 0xFF
+    path.write_bytes(data)
+    os.utime(path, ns=(path.stat().st_mtime_ns + 1_000_000,) * 2)
+
+    assert not keystore.reload_if_changed()
+    assert list(keystore) == [1] and keystore.reloads == 0
+    keystore.close()
+
+
+def test_poll_interval_limits_checks(tmp_path):
+    path = tmp_path / "keys.d3ks"
+    write_keystore(_keymap(1), path)
+    keystore = KeyStore(path, poll_interval=3600)
+    keystore[1]
+    _replace(path, _keymap(2))
+    assert list(keystore) == [1]
+    assert keystore.reload_if_changed() and list(keystore) == [2]
+    keystore.close()
@@ -0,0 +1,99 @@
+import pytest
+from hypothesis import given, strategies as st
+
+from d3networking.exceptions.exceptions import InvalidMessageException
+from d3networking.message import batch as batch_module
+from d3networking.message.batch import MessageBatch
+from d3networking.message.message import AvailablePayloadMessage, HEADER_SIZE, MAX_SIGNATURE_SIZE
+from d3networking.processing.processing import INT_MAX_VAL
+
+from .strategies import datagrams, messages, seq_nums, team_ids
+
+
+@given(messages())
+def test_round_trip(msg):
+    datagram = msg.as_bytes()
+    assert AvailablePayloadMessage.from_bytes(datagram) == msg
+    assert AvailablePayloadMessage.from_buffer(datagram) == msg
+
+
+@given(messages(), st.integers(0, 16))
+def test_pack_into_matches_as_bytes(msg, offset):
+    buffer = bytearray(offset + 600)
+    size = msg.pack_into(buffer, offset)
+    assert buffer[offset: offset + size] == msg.as_bytes()
+
+
+@given(datagrams)
+def test_decoders_only_raise_invalid_message(data):
+    for decoder in (AvailablePayloadMessage.from_bytes, AvailablePayloadMessage.from_buffer):
+        try:
+            msg = decoder(data)
+        except InvalidMessageException:
+            continue
+        assert msg.sig_size <= MAX_SIGNATURE_SIZE
+        assert data[:HEADER_SIZE + msg.sig_size] == msg.as_bytes()
+
+
+def test_oversized_signature_is_rejected():
+    msg = AvailablePayloadMessage(1, 2, 3, MAX_SIGNATURE_SIZE + 1, bytearray(MAX_SIGNATURE_SIZE + 1))
+    datagram = msg.as_unsigned_bytes() + (MAX_SIGNATURE_SIZE + 1).to_bytes(4, "little") + bytes(msg.signature)
+    with pytest.raises(InvalidMessageException):
+        AvailablePayloadMessage.from_bytes(datagram)
+    assert not MessageBatch().append_datagram(datagram)
+
+
+@given(st.lists(messages()))
+def test_batch_round_trip(msgs):
+    batch = MessageBatch.from_datagrams([msg.as_bytes() for msg in msgs], strict=True)
+    assert list(batch.messages()) == msgs
+
+
+@given(st.lists(datagrams, max_size=20))
+def test_batch_skips_malformed_datagrams(data):
+    batch = MessageBatch.from_datagrams(data)
+    assert len(batch) <= len(data)
+
+
+def _without_numpy(func):
+    numpy, batch_module.numpy = batch_module.numpy, None
+    try:
+        return func()
+    finally:
+        batch_module.numpy = numpy
+
+
+@given(st.lists(messages()), st.sets(team_ids, max_size=5))
+def test_filter_teams(msgs, wanted):
+    batch = MessageBatch.from_datagrams([msg.as_bytes() for msg in msgs])
+    expected = [msg for msg in msgs if msg.team_id in wanted]
+    assert list(batch.filter_teams(wanted).messages()) == expected
+    assert list(_without_numpy(lambda: batch.filter_teams(wanted)).messages()) == expected
+
+
+@given(team_ids, st.integers(0, INT_MAX_VAL), st.lists(st.integers(0, 1000), min_size=1))
+def test_latest_seq_by_team_wraps_around(team_id, start, steps):
+    batch = MessageBatch()
+    for step in steps:
+        batch.append(AvailablePayloadMessage(team_id, 0, (start + step) % (INT_MAX_VAL + 1)))
+
+    expected = {team_id: (start + max(steps)) % (INT_MAX_VAL + 1)}
+    assert batch.latest_seq_by_team() == expected
+    assert _without_numpy(batch.latest_seq_by_team) == expected
+
+
+@given(st.lists(st.tuples(st.integers(0, 3), seq_nums), min_size=1))
+def test_latest_seq_by_team_same_with_and_without_numpy(entries):
+    # Numbers span the whole sequence space, beyond what the comparison is meant for.
+    batch = MessageBatch()
+    for team_id, seq_num in entries:
+        batch.append(AvailablePayloadMessage(team_id, 0, seq_num))
+    assert batch.latest_seq_by_team() == _without_numpy(batch.latest_seq_by_team)
+
+
+def test_latest_seq_by_team_across_half_the_space():
+    half = (INT_MAX_VAL + 1) // 2
+    batch = MessageBatch()
+    for seq_num in (0, half // 2, half + 10, 3 * half // 2):
+        batch.append(AvailablePayloadMessage(1, 0, seq_num))
+    assert batch.latest_seq_by_team() == _without_numpy(batch.latest_seq_by_team) == {1: half // 2}
@@ -0,0 +1,25 @@
+import re
+
+from d3networking.metrics.metrics import Metrics
+
+
+def _buckets(exposition: str):
+    return [(match[0], int(match[1])) for match in re.findall(r'_ns_bucket\{le="([^"]+)"\} (\d+)', exposition)]
+
+
+def test_prometheus_histogram_exports_a_fixed_cumulative_bucket_set():
+    metrics = Metrics(sample_every=1)
+    empty = _buckets(metrics.to_prometheus())
+    metrics.histograms["receive"].record(1_000)
+    metrics.histograms["receive"].record(3_000_000)
+    metrics.histograms["receive"].record(1 << 70)
+    first = _buckets(metrics.to_prometheus())
+    metrics.histograms["receive"].record(5)
+    second = _buckets(metrics.to_prometheus())
+
+    assert empty == []
+    assert [le for le, _ in first] == [le for le, _ in second]
+    assert first[-1] == ("+Inf", 3) and second[-1] == ("+Inf", 4)
+    counts = [count for _, count in second]
+    assert counts == sorted(counts)
+    assert dict(second)["7"] == 1 and dict(second)["1023"] == 2 and dict(second)[str((1 << 22) - 1)] == 3
@@ -0,0 +1,29 @@
+import socket
+
+import pytest
+
+from d3networking.transport.mmsg import send_datagrams
+
+
+@pytest.fixture
+def receiver():
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    sock.settimeout(1.0)
+    yield sock
+    sock.close()
+
+
+@pytest.mark.parametrize("host", ["127.0.0.1", "localhost"])
+def test_batch_reaches_numeric_and_named_destinations(receiver, host):
+    port = receiver.getsockname()[1]
+    payloads = [bytes([idx]) * (idx + 1) for idx in range(8)]
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        assert send_datagrams(sender, [(payload, (host, port)) for payload in payloads]) == len(payloads)
+    assert [receiver.recv(64) for _ in payloads] == payloads
+
+
+def test_unresolvable_destination_raises_like_sendto():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sender:
+        with pytest.raises(OSError):
+            send_datagrams(sender, [(b"a", ("invalid.invalid", 1)), (b"b", ("invalid.invalid", 1))])
@@ -0,0 +1,69 @@
+import multiprocessing
+
+import pytest
+
+from d3networking.message.message import MAX_MESSAGE_SIZE
+from d3networking.transport.parallel import ParallelPayloadReceiver, SharedRing
+
+
+def _produce(name: str, capacity: int, lock, count: int):
+    ring = SharedRing(capacity, name=name, lock=lock)
+    seq = 0
+    while seq < count:
+        if ring.push(seq.to_bytes(4, "little") * (1 + seq % 127)):
+            seq += 1
+    ring.shm.close()
+
+
+def test_ring_across_processes_keeps_order_and_contents():
+    ring = SharedRing(capacity=8)
+    count = 2000
+    producer = multiprocessing.Process(target=_produce, args=(ring.name, ring.capacity, ring.lock, count))
+    producer.start()
+    received = []
+    while len(received) < count:
+        datagram = ring.pop()
+        if datagram is not None:
+            received.append(datagram)
+    producer.join()
+    ring.close()
+
+    assert received == [seq.to_bytes(4, "little") * (1 + seq % 127) for seq in range(count)]
+
+
+def test_attaching_requires_the_lock():
+    ring = SharedRing(capacity=2)
+    try:
+        with pytest.raises(ValueError):
+            SharedRing(capacity=2, name=ring.name)
+    finally:
+        ring.close()
+
+
+def test_receiving_requires_running_workers():
+    receiver = ParallelPayloadReceiver({}, workers=1)
+    with pytest.raises(RuntimeError):
+        receiver.recv_many(timeout=None)
+
+
+def test_ring_wraps_around_and_counts_drops():
+    ring = SharedRing(capacity=4)
+    try:
+        for round_idx in range(5):
+            datagrams = [bytes([round_idx, idx]) for idx in range(6)]
+            assert [ring.push(datagram) for datagram in datagrams] == [True] * 4 + [False] * 2
+            assert [ring.pop() for _ in range(5)] == datagrams[:4] + [None]
+        assert ring.dropped == 10
+    finally:
+        ring.close()
+
+
+def test_ring_slots_hold_the_largest_message_only():
+    ring = SharedRing(capacity=2)
+    try:
+        assert ring.push(bytes(MAX_MESSAGE_SIZE))
+        with pytest.raises(ValueError):
+            ring.push(bytes(MAX_MESSAGE_SIZE + 1))
+        assert ring.pop() == bytes(MAX_MESSAGE_SIZE)
+    finally:
+        ring.close()
@@ -0,0 +1,64 @@
+import time
+
+import pytest
+from nacl.signing import SigningKey
+
+from d3networking.crypto.signature.schemes import KEY_TYPE_HMAC_SHA256, MacKey, scheme_for_key
+from d3networking.message.message import _UNSIGNED_HEADER
+from d3networking.processing.processing import INT_MAX_VAL
+from d3networking.transport.presign import Presigner
+
+KEYS = [SigningKey(bytes(range(32))), MacKey(KEY_TYPE_HMAC_SHA256, bytes(32))]
+
+
+def _expected(key, team_id: int, payload_size: int, seq_num: int) -> bytes:
+    return scheme_for_key(key).sign(key, _UNSIGNED_HEADER.pack(team_id, payload_size, seq_num))
+
+
+def _wait_for_ahead(presigner: Presigner, amount: int):
+    deadline = time.monotonic() + 5
+    while len(presigner._signatures) < amount:
+        assert time.monotonic() < deadline, "Timed out."
+        time.sleep(0.001)
+
+
+@pytest.fixture(params=KEYS, ids=["ed25519", "hmac-sha256"])
+def presigner(request):
+    presigner = Presigner(request.param, depth=4)
+    yield presigner
+    presigner.close()
+
+
+def test_signatures_match_signing_when_sent(presigner):
+    key = presigner.signing_key
+    for seq_num in range(20):
+        assert presigner.signature(3, 1, seq_num) == _expected(key, 3, 1, seq_num)
+    assert presigner.hits + presigner.misses == 20
+
+
+def test_next_numbers_are_signed_ahead(presigner):
+    presigner.signature(3, 1, 0)
+    _wait_for_ahead(presigner, 4)
+    hits = presigner.hits
+    for seq_num in range(1, 5):
+        assert presigner.signature(3, 1, seq_num) == _expected(presigner.signing_key, 3, 1, seq_num)
+        _wait_for_ahead(presigner, 4)
+    assert presigner.hits == hits + 4
+
+
+def test_payload_change_discards_signatures_ahead(presigner):
+    presigner.signature(3, 1, 0)
+    _wait_for_ahead(presigner, 4)
+    misses = presigner.misses
+    assert presigner.signature(3, 2, 1) == _expected(presigner.signing_key, 3, 2, 1)
+    assert presigner.misses == misses + 1
+
+
+def test_signing_ahead_wraps_around(presigner):
+    presigner.signature(3, 1, INT_MAX_VAL - 1)
+    _wait_for_ahead(presigner, 4)
+    assert presigner.signature(3, 1, INT_MAX_VAL) == _expected(presigner.signing_key, 3, 1, INT_MAX_VAL)
+    _wait_for_ahead(presigner, 4)
+    hits = presigner.hits
+    assert presigner.signature(3, 1, 0) == _expected(presigner.signing_key, 3, 1, 0)
+    assert presigner.hits == hits + 1
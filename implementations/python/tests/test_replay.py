@@ -0,0 +1,106 @@
+import pytest
+from hypothesis import given, strategies as st
+
+from d3networking.processing.processing import INT_MAX_VAL
+from d3networking.processing.replay import ReplayProtectionTable, ReplayVerdict, ReplayWindow, SEQ_MODULUS
+
+from .strategies import seq_nums
+
+HALF = SEQ_MODULUS // 2
+
+
+def _window(size: int, *seen: int) -> ReplayWindow:
+    window = ReplayWindow(size)
+    for seq_num in seen:
+        window.update(seq_num)
+    return window
+
+
+def test_first_number_is_accepted():
+    assert ReplayWindow().check(12345) is ReplayVerdict.ACCEPTED
+
+
+@given(seq_nums, st.integers(1, 64))
+def test_verdicts_around_the_newest_number(newest, size):
+    window = _window(size, newest)
+    assert window.check(newest) is ReplayVerdict.DUPLICATE
+    assert window.check((newest + 1) % SEQ_MODULUS) is ReplayVerdict.ACCEPTED
+    assert window.check((newest + HALF - 1) % SEQ_MODULUS) is ReplayVerdict.ACCEPTED
+    assert window.check((newest - size) % SEQ_MODULUS) is ReplayVerdict.TOO_OLD
+    if size > 1:
+        assert window.check((newest - size + 1) % SEQ_MODULUS) is ReplayVerdict.REORDERED
+
+
+@given(seq_nums, st.lists(st.integers(1, 100), min_size=1, max_size=20))
+def test_window_edges_survive_the_wrap(start, steps):
+    size = 32
+    window = ReplayWindow(size)
+    seen = [start]
+    window.update(start)
+    for step in steps:
+        seen.append((seen[-1] + step) % SEQ_MODULUS)
+        assert window.check(seen[-1]) is ReplayVerdict.ACCEPTED
+        window.update(seen[-1])
+
+    newest = seen[-1]
+    assert window.newest == newest
+    for seq_num in seen:
+        behind = (newest - seq_num) % SEQ_MODULUS
+        assert window.check(seq_num) is (ReplayVerdict.DUPLICATE if behind < size else ReplayVerdict.TOO_OLD)
+    for behind in range(1, size):
+        seq_num = (newest - behind) % SEQ_MODULUS
+        if seq_num not in seen:
+            assert window.check(seq_num) is ReplayVerdict.REORDERED
+
+
+def test_wrap_from_largest_number_to_zero():
+    window = _window(8, INT_MAX_VAL - 1, INT_MAX_VAL)
+    assert window.check(0) is ReplayVerdict.ACCEPTED
+    window.update(0)
+    assert window.check(INT_MAX_VAL) is ReplayVerdict.DUPLICATE
+    assert window.check(INT_MAX_VAL - 2) is ReplayVerdict.REORDERED
+    assert window.check(INT_MAX_VAL - 7) is ReplayVerdict.TOO_OLD
+
+
+def test_jump_beyond_the_window_forgets_older_numbers():
+    window = _window(4, 10, 11, 100)
+    assert window.check(99) is ReplayVerdict.REORDERED
+    assert window.check(11) is ReplayVerdict.TOO_OLD
+
+
+def test_window_size_must_be_positive():
+    with pytest.raises(ValueError):
+        ReplayWindow(0)
+
+
+def test_table_keeps_teams_apart_and_counts_each_verdict():
+    table = ReplayProtectionTable(window_size=8)
+    assert table.accept(1, 10)
+    assert table.accept(2, 5)
+    assert not table.accept(1, 10)
+    assert not table.accept(1, 9)
+    assert not table.accept(1, 1)
+    assert table.check(1, 11) and not table.check(1, 10)
+    assert (table.accepted, table.duplicate, table.reordered, table.too_old) == (2, 1, 1, 1)
+    assert table.window(2).newest == 5 and table.window(3) is None
+    assert table.last_seq_num == 5
+
+
+def test_table_accepts_reordered_numbers_when_asked():
+    table = ReplayProtectionTable(window_size=8, accept_reordered=True)
+    assert table.accept(1, 10)
+    assert table.accept(1, 8)
+    assert not table.accept(1, 8)
+    assert table.reordered == 1 and table.duplicate == 1
+
+
+def test_table_reset():
+    table = ReplayProtectionTable()
+    table.accept(1, 10)
+    table.accept(2, 10)
+    table.reset(1)
+    assert table.accept(1, 3)
+    assert not table.accept(2, 3)
+    table.reset()
+    assert table.last_seq_num == -1
+    assert table.accept(2, 3)
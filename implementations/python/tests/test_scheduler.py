@@ -0,0 +1,100 @@
+import pytest
+
+from d3networking.transport.scheduler import BroadcastScheduler
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class FakeServer:
+    def __init__(self, clock: FakeClock):
+        self.clock = clock
+        self.sent = []
+
+    def send_message(self, msg):
+        self.sent.append((self.clock.now, msg.team_id, msg.payload_size))
+
+
+def _run(scheduler: BroadcastScheduler, clock: FakeClock, duration: float, step: float):
+    for tick in range(1, int(round(duration / step)) + 1):
+        clock.now = tick * step
+        scheduler.poll()
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_first_send_is_immediate_then_backs_off_to_heartbeat(clock):
+    server = FakeServer(clock)
+    scheduler = BroadcastScheduler(min_interval=0.1, max_interval=0.8, tick=0.01, clock=clock)
+    scheduler.add_source(3, server, 2)
+    _run(scheduler, clock, 3.0, 0.01)
+
+    times = [now for now, _, _ in server.sent]
+    assert times[0] == 0.0
+    gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+    assert gaps[:4] == pytest.approx([0.1, 0.2, 0.4, 0.8], abs=0.011)
+    assert all(gap == pytest.approx(0.8, abs=0.011) for gap in gaps[3:])
+
+
+def test_interval_shorter_than_tick_repeats_every_tick(clock):
+    server = FakeServer(clock)
+    scheduler = BroadcastScheduler(min_interval=0.005, max_interval=0.005, tick=0.01, clock=clock)
+    scheduler.add_source(1, server, 0)
+    _run(scheduler, clock, 2.0, 0.01)
+
+    assert len(server.sent) == pytest.approx(200, abs=2)
+    assert scheduler.sent == len(server.sent)
+
+
+def test_change_is_sent_immediately_and_resets_the_interval(clock):
+    server = FakeServer(clock)
+    scheduler = BroadcastScheduler(min_interval=0.1, max_interval=1.0, tick=0.01, clock=clock)
+    scheduler.add_source(5, server, 0)
+    _run(scheduler, clock, 2.0, 0.01)
+    sent = len(server.sent)
+
+    scheduler.update(5, 0)
+    assert len(server.sent) == sent
+    scheduler.update(5, 1)
+    assert server.sent[-1] == (clock.now, 5, 1)
+
+    changed_at = clock.now
+    while clock.now < changed_at + 0.105:
+        clock.now += 0.01
+        scheduler.poll()
+    assert server.sent[-1][0] == pytest.approx(changed_at + 0.1, abs=0.011)
+
+
+def test_removed_source_is_not_sent(clock):
+    server = FakeServer(clock)
+    scheduler = BroadcastScheduler(min_interval=0.1, max_interval=0.1, tick=0.01, clock=clock)
+    scheduler.add_source(7, server, 0)
+    scheduler.remove_source(7)
+    _run(scheduler, clock, 1.0, 0.01)
+    assert len(server.sent) == 1
+
+
+def test_sparse_polls_catch_up_once(clock):
+    server = FakeServer(clock)
+    scheduler = BroadcastScheduler(min_interval=0.1, max_interval=0.1, tick=0.01, wheel_size=16, clock=clock)
+    scheduler.add_source(0, server, 0)
+    clock.now = 10.0
+    assert scheduler.poll() == 1
+    assert scheduler.poll() == 0
+
+
+def test_rejects_invalid_intervals():
+    with pytest.raises(ValueError):
+        BroadcastScheduler(min_interval=0.0)
+    with pytest.raises(ValueError):
+        BroadcastScheduler(min_interval=2.0, max_interval=1.0)
+    with pytest.raises(ValueError):
+        BroadcastScheduler(backoff=0.5)
@@ -0,0 +1,75 @@
+import struct
+import threading
+import uuid
+
+import pytest
+
+from d3networking.message.message import AvailablePayloadMessage
+from d3networking.vehicle.shared_state import SharedDropPointPublisher, SharedDropPointReader
+
+
+@pytest.fixture
+def segment():
+    publisher = SharedDropPointPublisher(name=f"d3test-{uuid.uuid4().hex[:12]}")
+    reader = SharedDropPointReader(publisher.name)
+    yield publisher, reader
+    reader.close()
+    publisher.close()
+
+
+def _msg(team_id: int, seq_num: int) -> AvailablePayloadMessage:
+    # Every field is derived from the sequence number, so a torn read cannot go unnoticed.
+    signature = bytearray(seq_num.to_bytes(4, "little") * 16)
+    return AvailablePayloadMessage(team_id, seq_num % 256, seq_num, len(signature), signature)
+
+
+def test_reader_sees_published_messages(segment):
+    publisher, reader = segment
+    assert reader.read(3) is None and reader.peek(3) is None and reader.best() is None
+    publisher.publish(_msg(3, 7), received_ns=100)
+    publisher.publish(_msg(9, 9), received_ns=200)
+
+    assert reader.read(3) == (_msg(3, 7), 100)
+    assert reader.peek(9) == (9, 9, 200)
+    assert reader.snapshot() == {3: _msg(3, 7), 9: _msg(9, 9)}
+    assert reader.best().team_id == 9
+    assert reader.generation == 2
+
+
+def test_failed_publish_leaves_the_slot_readable(segment):
+    publisher, reader = segment
+    publisher.publish(_msg(3, 7), received_ns=100)
+    with pytest.raises(struct.error):
+        publisher.publish(AvailablePayloadMessage(3, 300, 8))
+    assert reader.read(3) == (_msg(3, 7), 100)
+    publisher.publish(_msg(3, 8), received_ns=300)
+    assert reader.read(3) == (_msg(3, 8), 300)
+
+
+def test_reads_are_never_torn_while_publishing(segment):
+    publisher, reader = segment
+    publisher.publish(_msg(1, 0))
+    done = threading.Event()
+
+    def publish():
+        seq_num = 0
+        while not done.is_set():
+            seq_num += 1
+            publisher.publish(_msg(1, seq_num))
+
+    thread = threading.Thread(target=publish)
+    thread.start()
+    try:
+        reads = 0
+        for _ in range(20_000):
+            entry = reader.read(1)
+            if entry is not None:
+                assert entry[0] == _msg(1, entry[0].seq_num)
+                reads += 1
+            peeked = reader.peek(1)
+            if peeked is not None:
+                assert peeked[0] == peeked[1] % 256
+    finally:
+        done.set()
+        thread.join()
+    assert reads > 0
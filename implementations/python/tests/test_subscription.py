@@ -0,0 +1,108 @@
+import queue
+import threading
+import time
+
+import pytest
+
+from d3networking.message.message import AvailablePayloadMessage
+from d3networking.transport.subscription import Subscription, SubscriptionDispatcher
+
+
+class FakeClient:
+    """ Hands out queued messages, and records how many threads receive at once.
+    """
+    def __init__(self):
+        self.queue: "queue.Queue[AvailablePayloadMessage]" = queue.Queue()
+        self.receiving = 0
+        self.max_receiving = 0
+        self._lock = threading.Lock()
+
+    def recv_many(self, timeout=None, validate=True):
+        with self._lock:
+            self.receiving += 1
+            self.max_receiving = max(self.max_receiving, self.receiving)
+        try:
+            return [self.queue.get(timeout=min(timeout, 0.01))]
+        except queue.Empty:
+            return []
+        finally:
+            with self._lock:
+                self.receiving -= 1
+
+
+def _wait_for(condition, timeout: float = 2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "Timed out."
+        time.sleep(0.001)
+
+
+def test_subscription_skips_unchanged_payloads_and_folds_bursts():
+    delivered = []
+    subscription = Subscription(delivered.append, teams=[1, 2], coalesce_ms=10)
+    for payload_size in (0, 1, 2):
+        subscription.offer(AvailablePayloadMessage(1, payload_size), 0.0)
+    subscription.offer(AvailablePayloadMessage(3, 0), 0.0)
+    subscription.flush(0.005)
+    assert delivered == []
+
+    subscription.flush(0.01)
+    assert [(msg.team_id, msg.payload_size) for msg in delivered] == [(1, 2)]
+    assert subscription.coalesced == 2
+
+    subscription.offer(AvailablePayloadMessage(1, 2), 0.02)
+    subscription.flush(0.05)
+    assert subscription.unchanged == 1 and len(delivered) == 1
+
+
+def test_dispatcher_stops_with_last_subscription():
+    client = FakeClient()
+    dispatcher = SubscriptionDispatcher(client)
+    delivered = []
+    first, second = Subscription(delivered.append), Subscription(lambda msg: None)
+    dispatcher.add(first)
+    dispatcher.add(second)
+    assert dispatcher.running
+
+    client.queue.put(AvailablePayloadMessage(4, 1))
+    _wait_for(lambda: delivered)
+    assert not dispatcher.remove(second)
+    assert dispatcher.running
+    assert dispatcher.remove(first)
+    assert not dispatcher.running
+    assert client.receiving == 0
+
+
+def test_dispatcher_restarted_from_a_callback_never_receives_twice():
+    client = FakeClient()
+    dispatcher = SubscriptionDispatcher(client)
+    delivered = []
+
+    def resubscribe(msg):
+        dispatcher.remove(subscriptions[-1])
+        subscriptions.append(Subscription(resubscribe, on_change_only=False))
+        dispatcher.add(subscriptions[-1])
+        delivered.append(msg)
+
+    subscriptions = [Subscription(resubscribe, on_change_only=False)]
+    dispatcher.add(subscriptions[0])
+    for payload_size in range(20):
+        client.queue.put(AvailablePayloadMessage(0, payload_size))
+        _wait_for(lambda: len(delivered) > payload_size)
+
+    dispatcher.stop()
+    assert client.max_receiving == 1
+    assert not dispatcher.running
+
+
+def test_validate_can_only_change_while_idle():
+    dispatcher = SubscriptionDispatcher(FakeClient())
+    subscription = Subscription(lambda msg: None)
+    dispatcher.add(subscription, validate=True)
+    with pytest.raises(ValueError):
+        dispatcher.add(Subscription(lambda msg: None), validate=False)
+    dispatcher.remove(subscription)
+
+    dispatcher.add(Subscription(lambda msg: None), validate=False)
+    assert dispatcher.validate is False
+    dispatcher.stop()